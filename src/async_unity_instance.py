@@ -0,0 +1,201 @@
+"""
+@author William Erignac
+@version 2026-10-16
+
+This script contains AsyncUnityInstance, a version of UnityInstance for asyncio. Instead of a ConnectionReader thread,
+lines are read from a non-blocking transport by the coroutine awaiting them, so several simulators (and anything else,
+e.g. an inference server) can be driven from one event loop.
+
+The task classes of unity_instance are reused to track the simulator's state and to handle warnings, errors, END and
+QUIT the same way UnityInstance does.
+
+Usage:
+    instance = await AsyncUnityInstance.create(pipe_path_and_name, executable_args)
+    await instance.run_experiment("falling_rectangular_prism")
+    await instance.send_sessions(session_init_data)
+    async for line in instance.lines():
+        ...
+    await instance.quit()
+"""
+
+import asyncio
+import subprocess
+import time
+
+from line_framer import LineFramer
+from pipe_transport import Transport, create_transport
+from unity_instance import SimulationTask, SimulationTaskType, IdleTask, ExperimentTask, QuitTask
+
+
+class AsyncUnityInstance:
+    """
+    A class that wraps an instance of Unity set up for performing reinforcement learning experiments, for use with
+    asyncio. Create with AsyncUnityInstance.create.
+    """
+    def __init__(self, transport: Transport, simulation_exec: subprocess.Popen = None, **kwargs):
+        """
+        transport = connection to a simulator that has already been accepted.
+        simulation_exec = the simulator's process, if it was launched from Python.
+        """
+        self.transport = transport
+        self.simulation_exec = simulation_exec
+        self._framer = LineFramer(transport.line_delimiter)
+
+        # Extra arguments for controlling behaviour. e.g. no_timeout.
+        self.meta_args = kwargs
+
+        # The read that a timed out read_line left running, which writes into the framer when it completes.
+        self._pending_read = None
+
+        # The tasks are only used to track the state of the simulator; they have no writer nor ConnectionReader.
+        self.task: SimulationTask = self._create_task(IdleTask)
+
+    @classmethod
+    async def create(cls, pipe_path_and_name: str, executable_args: dict = None, transport: Transport = None,
+                     **kwargs):
+        """
+        pipe_and_path_name = name + path of pipe to use for communication
+        executable_args = {simulator_path:str, simulator_args:list[str]}
+        transport = connection to use instead of the default for this platform (see pipe_transport.create_transport)
+
+        If executable_args is not None, a Unity build with be executed using the provided args.
+        Otherwise, no executable will be run. Useful for when running directly in the Unity editor.
+        """
+        transport = create_transport(pipe_path_and_name) if transport is None else transport
+
+        simulation_exec = None
+        if not (executable_args is None):
+            simulation_exec = subprocess.Popen([executable_args['simulator_path']] + executable_args['simulator_args'])
+
+        await transport.accept_async()
+
+        return cls(transport, simulation_exec, **kwargs)
+
+    def _create_task(self, task_type, *args) -> SimulationTask:
+        return task_type(self.transport, None, *args, **self.meta_args)
+
+    async def run_experiment(self, experiment_name: str):
+        """
+        Open an environment corresponding to the given experiment name.
+        """
+        if self.task.get_task_type() != SimulationTaskType.IDLE:
+            raise Exception(f"Cannot start another task while task {self.task.get_task_type()} is running.")
+
+        self.task = self._create_task(ExperimentTask, experiment_name)
+
+        await self.write_line(f"run {experiment_name}")
+        assert(await self.read_line() == "SUCCESS")
+
+    async def send_sessions(self, session_init_data, end: bool = True):
+        """
+        session_init_data = iterable list of json strings representing session initialization data.
+        end = whether to signal that all the initialization data has been sent, starting session simulation.
+        """
+        if self.task.get_task_type() != SimulationTaskType.SIMULATING:
+            raise Exception("Cannot simulate sessions before starting an experiment.")
+
+        if self.task.get_has_sent_end():
+            raise Exception("Cannot send sessions. Already sent END for this simulation.")
+
+        if type(session_init_data) == str or not hasattr(session_init_data, "__iter__"):
+            session_init_data = [session_init_data]
+
+        lines = list(session_init_data)
+        if end:
+            lines.append("END")
+
+        await self.write_lines(lines)
+
+        if end:
+            self.task.on_has_sent_end()
+
+    async def end_sessions(self):
+        """
+        Call once all initialization data has finished sending to start session simulation.
+        """
+        await self.send_sessions([], end=True)
+
+    async def quit(self):
+        """
+        Call to close the Unity instance and communication pipe.
+        """
+        if self.task.get_task_type() != SimulationTaskType.IDLE:
+            raise Exception("Cannot set quit whilst simulation is running.")
+
+        self.task = self._create_task(QuitTask)
+        await self.write_line("quit")
+        await self.transport.flush_async()
+        assert(await self.read_line() is None)
+        self.task = None
+        self.transport.close()
+        if (not (self.simulation_exec is None)) and (not (self.simulation_exec.poll() is None)):
+            self.simulation_exec.terminate()
+
+    async def write_line(self, to_write: str):
+        await self.transport.write_async(f"{to_write}\n".encode())
+
+    async def write_lines(self, lines):
+        """
+        Writes each line in lines with a single write.
+        """
+        await self.transport.write_async("".join(f"{line}\n" for line in lines).encode())
+
+    async def read_line(self, timeout=10.0):
+        """
+        Returns a line written by the simulator, waiting until a complete line has been read,
+        or until timeout seconds have passed (never if timeout < 0 or no_timeout is set).
+        Returns None if the simulator has reported that it has finished.
+        """
+        deadline = None
+        if timeout >= 0 and not self.task.get_meta_arg("no_timeout"):
+            deadline = time.monotonic() + timeout
+
+        while True:
+            if len(self.task.read_buffer) > 0:
+                return self.task.read_buffer.popleft()
+
+            if self.task._get_finished_pipe_reading():
+                if self.task.get_task_type() == SimulationTaskType.SIMULATING:
+                    self.task = self._create_task(IdleTask)
+                return None
+
+            # Reads that run on a thread can't be cancelled, so a read that timed out is awaited again instead of
+            # starting another one into the same buffer.
+            if self._pending_read is None:
+                self._pending_read = asyncio.ensure_future(
+                    self.transport.read_into_async(self._framer.get_read_view()))
+            try:
+                if deadline is None:
+                    bytes_read = await self._pending_read
+                else:
+                    bytes_read = await asyncio.wait_for(asyncio.shield(self._pending_read),
+                                                        deadline - time.monotonic())
+            except asyncio.TimeoutError:
+                raise Exception(f"Timeout for {timeout} seconds when reading line.")
+            finally:
+                # Only a read that timed out is kept, so a failed one isn't raised again by every later call.
+                if self._pending_read.done():
+                    self._pending_read = None
+            self._framer.commit(bytes_read)
+
+            # Every line read is buffered before raising for one of them (e.g. an error from the simulator), so the
+            # lines after it aren't lost.
+            exception = None
+            for line in self._framer.lines():
+                try:
+                    self.task._add_line_to_buffer(line)
+                except Exception as e:
+                    if exception is None:
+                        exception = e
+            if not (exception is None):
+                raise exception
+
+    async def lines(self):
+        """
+        Yields each line written by the simulator until it reports that it has finished.
+        """
+        while True:
+            line = await self.read_line()
+            if line is None:
+                return
+            yield line
@@ -0,0 +1,191 @@
+"""
+@author William Erignac
+@version 2026-10-16
+
+This script runs the benchmarks of the Python side of the communication with the simulator. They run against
+stand_in_simulator.py, so no Unity build is needed, and are split by area:
+
+benchmarks_protocol.py: framing, decoding and serializing messages, the frame protocols, round trips and replays.
+benchmarks_scheduling.py: streaming sessions and splitting them across a pool of instances.
+benchmarks_evolution.py: the genetic algorithms, the fitness cache and the surrogate model.
+benchmarks_learning.py: the trajectory store, REINFORCE updates, the learner process and the training scripts' epochs.
+
+Run with the name of the benchmark to run, e.g. python benchmarks.py read_line_latency -n 10000
+
+Run python benchmarks.py suite to run the benchmarks of the hot path (SUITE) with their usual sizes. With -json, the
+results are also written to a file. The results are compared with those of an earlier run (benchmarks_baseline.json,
+or the file passed as -baseline): every rate and duration that changed by more than -tolerance is reported, and the
+exit code is 1 if any got worse. The rates depend on the machine, so the baseline isn't part of the repository: the
+first run of the suite writes its results to it, and it is updated by writing the results of the suite to it with -json.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+from benchmarks_evolution import benchmark_fitness_cache, benchmark_reproduction, benchmark_steady_state, \
+    benchmark_surrogate
+from benchmarks_learning import benchmark_epochs, benchmark_learner_process, benchmark_reinforce_update, \
+    benchmark_trajectory_store
+from benchmarks_protocol import benchmark_frame_protocol, benchmark_frame_round_trip, benchmark_line_framing, \
+    benchmark_message_decoding, benchmark_read_line_latency, benchmark_replay, benchmark_session_encoding, \
+    benchmark_stand_in, benchmark_task_switches
+from benchmarks_scheduling import benchmark_pool, benchmark_session_streaming
+
+
+BENCHMARKS = {
+    "epochs": benchmark_epochs,
+    "fitness_cache": benchmark_fitness_cache,
+    "frame_protocol": benchmark_frame_protocol,
+    "frame_round_trip": benchmark_frame_round_trip,
+    "learner_process": benchmark_learner_process,
+    "line_framing": benchmark_line_framing,
+    "message_decoding": benchmark_message_decoding,
+    "pool": benchmark_pool,
+    "read_line_latency": benchmark_read_line_latency,
+    "reinforce_update": benchmark_reinforce_update,
+    "replay": benchmark_replay,
+    "reproduction": benchmark_reproduction,
+    "session_encoding": benchmark_session_encoding,
+    "session_streaming": benchmark_session_streaming,
+    "stand_in": benchmark_stand_in,
+    "steady_state": benchmark_steady_state,
+    "surrogate": benchmark_surrogate,
+    "task_switches": benchmark_task_switches,
+    "trajectory_store": benchmark_trajectory_store,
+}
+
+
+# The benchmarks of the hot path run by "suite", with their sizes (-n): line throughput and latency, serialization
+# of 1k sessions, GA generations, REINFORCE updates and the epochs of every experiment.
+SUITE = {
+    "line_framing": 100000,
+    "read_line_latency": 2000,
+    "frame_round_trip": 2000,
+    "frame_protocol": 256,
+    "message_decoding": 1000,
+    "session_encoding": 1000,
+    "reproduction": 1000,
+    "reinforce_update": 256,
+    "epochs": 256,
+}
+
+# The results of an earlier run of the suite on this machine, which runs are compared with by default (see
+# compare_results). Written by the first run of the suite, or with python benchmarks.py suite -json <path>.
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks_baseline.json")
+
+# Metrics compared with a baseline, by suffix: rates are better higher, durations lower. The others (counts, sizes,
+# scores and speedups between the modes of a benchmark) aren't compared, nor are maximum latencies.
+HIGHER_IS_BETTER = ("_per_sec",)
+LOWER_IS_BETTER = ("_us", "_ms", "_seconds")
+NOT_COMPARED = ("max_",)
+# Results are only compared with a baseline run with the same size.
+SIZE_METRICS = ("count", "sessions")
+
+
+def run_suite() -> dict:
+    """
+    Runs every benchmark of SUITE, returning their results by name.
+    """
+    results = dict()
+    for name, count in SUITE.items():
+        print(f"Running {name} -n {count}", file=sys.stderr)
+        results[name] = BENCHMARKS[name](count)
+    return results
+
+
+def make_report(results: dict) -> dict:
+    """
+    Wraps the results of benchmarks (by name) with a description of the machine they ran on.
+    """
+    return {"created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "results": results}
+
+
+def compare_results(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Compares the results of benchmarks (by name) with those of a baseline report. Prints every metric that changed
+    by more than tolerance (relative) and returns the names of those that got worse.
+    """
+    regressions = []
+    for name, metrics in results.items():
+        if not (name in baseline["results"]):
+            print(f"{name}: not compared, the baseline has no results for it.")
+            continue
+        old_metrics = baseline["results"][name]
+        sizes = [size for size in SIZE_METRICS if size in metrics]
+        if any(metrics[size] != old_metrics.get(size) for size in sizes):
+            print(f"{name}: not compared, the baseline was run with another size.")
+            continue
+
+        for metric, value in metrics.items():
+            old_value = old_metrics.get(metric)
+            if not isinstance(value, float) or not isinstance(old_value, (int, float)) or old_value == 0 or \
+                    any(part in metric for part in NOT_COMPARED):
+                continue
+            if metric.endswith(HIGHER_IS_BETTER):
+                change = value / old_value - 1
+            elif metric.endswith(LOWER_IS_BETTER):
+                change = old_value / value - 1
+            else:
+                continue
+
+            if abs(change) > tolerance:
+                verdict = "better" if change > 0 else "WORSE"
+                print(f"{name}.{metric}: {old_value:.1f} -> {value:.1f} ({verdict} by {abs(change) * 100:.0f}%)")
+                if change < 0:
+                    regressions.append(f"{name}.{metric}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("benchmark", help="which benchmark to run, or suite to run those of SUITE.",
+                        choices=["suite"] + list(BENCHMARKS.keys()))
+    parser.add_argument("-n", help="number of lines / iterations to run (not used by suite).", type=int, default=10000)
+    parser.add_argument("-json", help="file to write the results to as json.", type=str, default=None)
+    parser.add_argument("-baseline", help="json results of an earlier run to compare the results with "
+                        "(benchmarks_baseline.json by default, which the suite writes if it doesn't exist; "
+                        "pass none to not compare).", type=str, default=BASELINE_PATH)
+    parser.add_argument("-tolerance", help="relative change of a metric from the baseline that is reported.",
+                        type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.benchmark == "suite":
+        results = run_suite()
+    else:
+        results = {args.benchmark: BENCHMARKS[args.benchmark](args.n)}
+
+    for name, metrics in results.items():
+        if args.benchmark == "suite":
+            print(f"\n{name}")
+        for metric, value in metrics.items():
+            print(f"{metric}: {value:.1f}" if isinstance(value, float) else f"{metric}: {value}")
+
+    # Read before the results are written, as they can replace the baseline.
+    baseline = None
+    if args.baseline != "none" and os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+    if not (args.json is None):
+        with open(args.json, "w") as file:
+            json.dump(make_report(results), file, indent=2)
+
+    if baseline is None and args.benchmark == "suite" and args.baseline != "none":
+        with open(args.baseline, "w") as file:
+            json.dump(make_report(results), file, indent=2)
+        print(f"\nNo baseline yet: wrote the results to {args.baseline}, which later runs are compared with.")
+
+    if not (baseline is None):
+        print(f"\nCompared with {args.baseline} ({baseline['created']}, tolerance {args.tolerance * 100:.0f}%):")
+        regressions = compare_results(results, baseline, args.tolerance)
+        if len(regressions) > 0:
+            print(f"{len(regressions)} regressions: {', '.join(regressions)}")
+            sys.exit(1)
@@ -0,0 +1,112 @@
+"""
+@author William Erignac
+@version 2026-10-16
+
+This script contains what the benchmarks (see benchmarks.py) share: launching stand-in simulators, running cart pole
+and prism sessions on them, and summarizing latencies.
+"""
+
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from binary_protocol import COMMAND_LAYOUTS, MessageType
+from unity_instance import Message, MessageDecoder, UnityInstance
+from unity_instance_pool import UnityInstancePool
+
+PIPE_PATH = '\\\\.\\pipe\\'
+PIPE_NAME = "PipeBenchmark"
+STAND_IN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stand_in_simulator.py")
+
+
+def launch_stand_in(stand_in_args: list = (), **kwargs) -> UnityInstance:
+    """
+    Runs the stand-in simulator and connects to it.
+    stand_in_args = extra arguments for the stand-in (e.g. ["-frames", "100"]).
+    """
+    exec_args = dict()
+    exec_args["simulator_path"] = sys.executable
+    exec_args["simulator_args"] = [STAND_IN_PATH, "-p", PIPE_NAME] + list(stand_in_args)
+    return UnityInstance(os.path.join(PIPE_PATH, PIPE_NAME), exec_args, **kwargs)
+
+
+def launch_stand_in_pool(instance_count: int, stand_in_args: list = (), **kwargs) -> UnityInstancePool:
+    """
+    Runs instance_count stand-in simulators and connects to them with a pool.
+    """
+    exec_args = dict()
+    exec_args["simulator_path"] = sys.executable
+    exec_args["simulator_args"] = [STAND_IN_PATH, "-p", PIPE_NAME] + list(stand_in_args)
+    return UnityInstancePool(PIPE_PATH, [f"{PIPE_NAME}{i}" for i in range(instance_count)], exec_args, **kwargs)
+
+
+def summarize_latencies(latencies: list) -> dict:
+    """
+    Converts a list of durations in seconds into percentiles in microseconds.
+    """
+    percentiles = statistics.quantiles(latencies, n=100)
+    return {"count": len(latencies),
+            "mean_us": statistics.fmean(latencies) * 1e6,
+            "p50_us": percentiles[49] * 1e6,
+            "p90_us": percentiles[89] * 1e6,
+            "p99_us": percentiles[98] * 1e6,
+            "max_us": max(latencies) * 1e6}
+
+
+# The genes mutated by falling_rectangular_prism (see MUTABLE_GENES there).
+PRISM_MUTABLE_GENES = np.array([0, 1])
+
+
+def run_cart_pole_frames(sim_inst: UnityInstance, session_count: int, binary: bool) -> int:
+    """
+    Runs cart pole sessions on the stand-in, answering every frame with a command. Returns the number of frames.
+    """
+    sim_inst.run_experiment("cart_pole", binary)
+    assert(sim_inst.is_binary_mode() == binary)
+    sim_inst.send_session_initialization_data(['{"WindSeed": 1, "InitialAngle": 0.0}'] * session_count)
+    sim_inst.end_send_session_initialization_data()
+
+    frame_count = 0
+    command_size = len(COMMAND_LAYOUTS["cart_pole"])
+
+    def on_frame(message: Message):
+        nonlocal frame_count
+        frame_count += 1
+        if binary:
+            sim_inst.write_record(message.index, [float(message.data[0] > 0)] * command_size)
+        else:
+            sim_inst.write_line(f"{message.index} {json.dumps({'MoveRight': message.data['CartPosition'] > 0})}")
+
+    sim_inst.begin_batch()
+    MessageDecoder().dispatch(sim_inst, {MessageType.FRAME: on_frame})
+    sim_inst.commit()
+
+    return frame_count
+
+
+def serialize_genomes(genomes: np.ndarray) -> list:
+    return [json.dumps({"Genome": genome}) for genome in genomes.tolist()]
+
+
+def run_prism_sessions(sim_inst, sessions, on_score, chunk_size: int = 16) -> float:
+    """
+    Runs sessions (json strings, or a generator of them) on the stand-in's cart pole experiment (whose sessions have
+    frames), answering each frame, and calls on_score(index, score) for each score. Returns the seconds it took.
+    """
+    def on_frame(message: Message):
+        sim_inst.write_line(f"{message.index} {json.dumps({'MoveRight': True})}")
+
+    def on_score_message(message: Message):
+        on_score(message.index, float(message.data))
+
+    start = time.perf_counter()
+    sim_inst.run_experiment("cart_pole")
+    sim_inst.submit_sessions(sessions, chunk_size)
+    sim_inst.begin_batch()
+    MessageDecoder().dispatch(sim_inst, {MessageType.FRAME: on_frame, MessageType.SCORE: on_score_message})
+    sim_inst.commit()
+    return time.perf_counter() - start
@@ -0,0 +1,271 @@
+"""
+@author William Erignac
+@version 2026-10-16
+
+This script contains the benchmarks of the genetic algorithms (see benchmarks.py): breeding generations (against the
+per-prism operators genetic_operators replaced), steady state evolution, the fitness cache and the surrogate model.
+"""
+
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks_common import PRISM_MUTABLE_GENES, launch_stand_in, launch_stand_in_pool, run_prism_sessions, \
+    serialize_genomes
+from fitness_cache import FitnessCache
+from genetic_operators import reproduce
+from population import Population
+from steady_state_ga import SteadyStateGA
+from surrogate import KNNSurrogate
+
+
+# Largest population the legacy genetic operators are timed on (they take minutes for millions of members).
+LEGACY_REPRODUCTION_LIMIT = 100000
+
+
+class LegacyRectPrism:
+    """
+    The per-prism genetic operators of falling_rectangular_prism before genetic_operators.
+    """
+    def __init__(self, scale_vector, rotation_vector):
+        self.scale = scale_vector
+        self.rotation = rotation_vector
+
+    def sexual_mutation(self, other):
+        scale = np.empty(3, dtype=float)
+        for i in range(scale.shape[0]):
+            scale[i] = np.random.choice([self.scale[i], other.scale[i]])
+        rotation = np.empty(3, dtype=float)
+        for i in range(rotation.shape[0]):
+            rotation[i] = np.random.choice([self.rotation[i], other.rotation[i]])
+        return LegacyRectPrism(scale, rotation)
+
+    def asexual_mutation(self, switch_chance=0.3, modify_chance=0.6):
+        scale = np.copy(self.scale)
+        rotation = np.copy(self.rotation)
+        attributes = [scale, rotation]
+        while random.random() < modify_chance:
+            attribute = attributes[np.random.randint(0, len(attributes) - 1)]
+            attribute[np.random.randint(0, 2)] *= np.random.rand() * 0.2 + 0.9
+        while random.random() < switch_chance:
+            attribute_1 = attributes[np.random.randint(0, len(attributes) - 1)]
+            index_1 = np.random.randint(0, 2)
+            attribute_2 = attributes[np.random.randint(0, len(attributes) - 1)]
+            index_2 = np.random.randint(0, 2)
+            temp = attribute_1[index_1]
+            attribute_1[index_1] = attribute_2[index_2]
+            attribute_2[index_2] = temp
+        return LegacyRectPrism(scale, rotation)
+
+
+def legacy_reproduction(scored_organisms: pd.DataFrame, sexual_to_asexual_percent=0.5) -> pd.DataFrame:
+    """
+    The reproduction of falling_rectangular_prism before genetic_operators: object columns, np.apply_along_axis /
+    np.vectorize over the prisms, and pd.concat.
+    """
+    scored_organisms = scored_organisms.sort_values("Score", ascending=False)
+    new_population_count = scored_organisms.shape[0]
+    sexual_reproductions = int(new_population_count * sexual_to_asexual_percent)
+    asexual_reproductions = new_population_count - sexual_reproductions
+
+    new_organisms = pd.DataFrame(columns=["Creature", "Score"])
+
+    np_last_organisms = scored_organisms["Creature"].to_numpy()
+    np_scores = scored_organisms["Score"].to_numpy()
+    success_probability_distribution = (np_scores / np.sum(np_scores)).astype(float)
+
+    sexual_pairs = np.random.choice(np_last_organisms, (sexual_reproductions, 2), p=success_probability_distribution)
+    asexual_individuals = np.random.choice(np_last_organisms, asexual_reproductions, p=success_probability_distribution)
+
+    to_add = np.apply_along_axis(lambda row: [row[0].sexual_mutation(row[1]), 0], 1, sexual_pairs)
+    new_organisms = pd.concat([new_organisms, pd.DataFrame(to_add, columns=["Creature", "Score"])])
+
+    to_add = np.vectorize(lambda x: x.asexual_mutation())(asexual_individuals)
+    scores_to_add = np.zeros(asexual_reproductions)
+    new_organisms = pd.concat([new_organisms, pd.DataFrame({"Creature": to_add, "Score": scores_to_add},
+                                                           columns=["Creature", "Score"])])
+
+    return new_organisms.reset_index(drop=True)
+
+
+def benchmark_reproduction(population_count: int) -> dict:
+    """
+    Compares the members/sec of one generation of falling prisms with genetic_operators.reproduce and with the legacy
+    per-prism operators (only timed up to LEGACY_REPRODUCTION_LIMIT members).
+    Run with -n 64, -n 10000 and -n 1000000.
+    """
+    rng = np.random.default_rng()
+    genomes = np.concatenate((rng.random((population_count, 3)), rng.random((population_count, 3)) * 90), axis=1)
+    scores = rng.random(population_count)
+
+    results = {"count": population_count}
+
+    start = time.perf_counter()
+    reproduce(rng, genomes, scores, population_count, mutable_genes=PRISM_MUTABLE_GENES)
+    vectorized_duration = time.perf_counter() - start
+    results["vectorized_members_per_sec"] = population_count / vectorized_duration
+
+    if population_count <= LEGACY_REPRODUCTION_LIMIT:
+        organisms = pd.DataFrame({"Creature": [LegacyRectPrism(genome[:3], genome[3:]) for genome in genomes],
+                                  "Score": scores})
+        start = time.perf_counter()
+        legacy_reproduction(organisms)
+        legacy_duration = time.perf_counter() - start
+        results["legacy_members_per_sec"] = population_count / legacy_duration
+        results["speedup"] = legacy_duration / vectorized_duration
+
+    return results
+
+
+def benchmark_steady_state(population_count: int, epoch_count: int = 10, instance_count: int = 2,
+                           chunk_size: int = 16) -> dict:
+    """
+    Compares how long a pool of stand-ins is idle while evolving prism genomes for epoch_count generations of
+    population_count, and while evolving them with a SteadyStateGA for as many sessions.
+    """
+    rng = np.random.default_rng()
+    genomes = np.concatenate((rng.random((population_count, 3)), rng.random((population_count, 3)) * 90), axis=1)
+    sim_inst = launch_stand_in_pool(instance_count, ["-frames", "20"])
+    results = {"count": population_count, "epochs": epoch_count}
+
+    # Generational: every epoch waits for its last score, then breeds the next generation.
+    start = time.perf_counter()
+    experiment_time = sim_inst.get_experiment_time()
+    population = Population.from_columns({"Genome": genomes})
+    for _ in range(epoch_count):
+        run_prism_sessions(sim_inst, serialize_genomes(population["Genome"]), population.set_scores)
+        population = Population.from_columns({"Genome": reproduce(rng, population["Genome"], population.scores,
+                                                                  population_count, mutable_genes=PRISM_MUTABLE_GENES)})
+    duration = time.perf_counter() - start
+    results["generational_sessions_per_sec"] = population_count * epoch_count / duration
+    results["generational_idle_percent"] = \
+        100 * (1 - (sim_inst.get_experiment_time() - experiment_time) / (instance_count * duration))
+
+    # Steady state: a first scored generation, then one bred session per score.
+    start = time.perf_counter()
+    experiment_time = sim_inst.get_experiment_time()
+    population = Population.from_columns({"Genome": genomes})
+    run_prism_sessions(sim_inst, serialize_genomes(population["Genome"]), population.set_scores)
+    ga = SteadyStateGA(rng, population, mutable_genes=PRISM_MUTABLE_GENES)
+    bred_genomes = []
+    bred_count = population_count * (epoch_count - 1)
+
+    def bred_sessions():
+        while len(bred_genomes) < bred_count:
+            children = ga.breed(min(chunk_size, bred_count - len(bred_genomes)))
+            bred_genomes.extend(children)
+            yield from serialize_genomes(children)
+
+    run_prism_sessions(sim_inst, bred_sessions(), lambda index, score: ga.add_member(bred_genomes[index], score),
+                       chunk_size)
+    duration = time.perf_counter() - start
+    results["steady_state_sessions_per_sec"] = population_count * epoch_count / duration
+    results["steady_state_idle_percent"] = \
+        100 * (1 - (sim_inst.get_experiment_time() - experiment_time) / (instance_count * duration))
+
+    sim_inst.quit()
+    return results
+
+
+def benchmark_fitness_cache(population_count: int, epoch_count: int = 10) -> dict:
+    """
+    Compares evolving prism genomes on a stand-in for epoch_count generations of population_count with and without a
+    FitnessCache. The stand-in's scores are replaced by the product of the x and y scales, so selection keeps elites
+    and breeds duplicates as it would with real scores.
+    """
+    sim_inst = launch_stand_in(["-frames", "20"])
+    results = {"count": population_count, "epochs": epoch_count}
+
+    for mode in ("uncached", "cached"):
+        rng = np.random.default_rng(0)
+        genomes = np.concatenate((rng.random((population_count, 3)), rng.random((population_count, 3)) * 90), axis=1)
+        cache = FitnessCache("falling_rectangular_prism") if mode == "cached" else None
+        simulated = 0
+
+        start = time.perf_counter()
+        for _ in range(epoch_count):
+            scores = np.full(population_count, np.nan)
+            if not (cache is None):
+                keys = cache.get_keys(genomes)
+                scores = cache.lookup(keys)
+            to_simulate = np.flatnonzero(np.isnan(scores))
+
+            if len(to_simulate) > 0:
+                run_prism_sessions(sim_inst, serialize_genomes(genomes[to_simulate]), lambda index, score: None)
+                simulated += len(to_simulate)
+                scores[to_simulate] = genomes[to_simulate, 0] * genomes[to_simulate, 1]
+                if not (cache is None):
+                    cache.store([keys[i] for i in to_simulate], scores[to_simulate])
+
+            genomes = reproduce(rng, genomes, scores, population_count, mutable_genes=PRISM_MUTABLE_GENES)
+        duration = time.perf_counter() - start
+
+        results[f"{mode}_simulated"] = simulated
+        results[f"{mode}_seconds"] = duration
+
+    results["hit_percent"] = 100 * (1 - results["cached_simulated"] / results["uncached_simulated"])
+    results["speedup"] = results["uncached_seconds"] / results["cached_seconds"]
+    sim_inst.quit()
+    return results
+
+
+def synthetic_prism_scores(genomes: np.ndarray) -> np.ndarray:
+    """
+    A smooth stand-in for the scores of prisms, between 0 and 100: highest for an x scale of 0.8, a y scale of 0.2 and
+    no x rotation.
+    """
+    distance = (genomes[:, 0] - 0.8) ** 2 + (genomes[:, 1] - 0.2) ** 2
+    return 100 * np.exp(-distance / 0.01) * (0.5 + 0.5 * np.cos(np.radians(genomes[:, 3])))
+
+
+def evolve_synthetic_prisms(rng: np.random.Generator, population_count: int, epoch_count: int,
+                            surrogate: KNNSurrogate = None, oversample: int = 1) -> np.ndarray:
+    """
+    Evolves prisms scored by synthetic_prism_scores like falling_rectangular_prism does. Returns the best score seen
+    after each epoch.
+    """
+    genomes = np.concatenate((rng.random((population_count, 3)), rng.random((population_count, 3)) * 90), axis=1)
+    best_scores = np.zeros(epoch_count)
+    for epoch in range(epoch_count):
+        scores = synthetic_prism_scores(genomes)
+        best_scores[epoch] = max(scores.max(), best_scores[epoch - 1] if epoch > 0 else 0)
+
+        candidate_count = population_count * (1 if surrogate is None else oversample)
+        genomes_bred = reproduce(rng, genomes, scores, candidate_count, mutable_genes=PRISM_MUTABLE_GENES)
+        if not (surrogate is None):
+            surrogate.add(genomes, scores)
+            genomes_bred = genomes_bred[surrogate.select(genomes_bred, population_count)]
+        genomes = genomes_bred
+    return best_scores
+
+
+def benchmark_surrogate(population_count: int, epoch_count: int = 10, trials: int = 10, oversample: int = 2) -> dict:
+    """
+    Compares evolving prisms on a synthetic score with and without a KNNSurrogate picking which of oversample times
+    as many children to simulate: the best score reached with as many simulations, the simulations needed per unit of
+    that score, and the simulations needed to reach the best score reached without the surrogate.
+    """
+    results = {"count": population_count, "epochs": epoch_count, "oversample": oversample}
+    simulation_count = population_count * epoch_count
+
+    best_scores = dict()
+    for mode in ("baseline", "surrogate"):
+        best_scores[mode] = np.array([
+            evolve_synthetic_prisms(np.random.default_rng(trial), population_count, epoch_count,
+                                    KNNSurrogate() if mode == "surrogate" else None, oversample)
+            for trial in range(trials)])
+        final_score = best_scores[mode][:, -1].mean()
+        results[f"{mode}_final_score"] = final_score
+        results[f"{mode}_simulations_per_score"] = simulation_count / final_score
+
+    # The epoch at which each trial first reached the baseline's final score (every epoch if it never did).
+    target = results["baseline_final_score"]
+    for mode in ("baseline", "surrogate"):
+        reached = best_scores[mode] >= target
+        epochs_needed = np.where(reached.any(axis=1), reached.argmax(axis=1) + 1, epoch_count)
+        results[f"{mode}_simulations_to_target"] = float(epochs_needed.mean() * population_count)
+    results["simulations_saved"] = results["baseline_simulations_to_target"] - \
+        results["surrogate_simulations_to_target"]
+    return results
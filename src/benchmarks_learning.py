@@ -0,0 +1,190 @@
+"""
+@author William Erignac
+@version 2026-10-16
+
+This script contains the benchmarks of the training (see benchmarks.py): keeping the steps of running sessions,
+REINFORCE updates, the learner process, and the epochs of every training script against the stand-in.
+"""
+
+import contextlib
+import copy
+import importlib
+import io
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import torch
+
+from benchmarks_common import launch_stand_in
+from learner_process import LearnerProcess
+from reinforce_learner import ReinforceLearner
+from trajectory_store import TrajectoryStore
+
+
+def benchmark_trajectory_store(session_count: int, steps_per_session: int = 200) -> dict:
+    """
+    Measures the frames/sec of recording the steps of session_count concurrent cart pole sessions in a TrajectoryStore
+    and packing them for a learner's update, with float32 and with float16 (compact) states, and the bytes the states
+    take.
+    """
+    rng = np.random.default_rng()
+    indices = np.arange(session_count)
+    states = rng.random((steps_per_session, session_count, 4), dtype=np.float32)
+    actions = rng.integers(0, 2, (steps_per_session, session_count))
+    scores = np.arange(steps_per_session, dtype=np.float32)
+    frame_count = session_count * steps_per_session
+    results = {"sessions": session_count, "frames": frame_count}
+
+    for compact in (False, True):
+        store = TrajectoryStore(4, compact=compact, initial_capacity=1024)
+        start = time.perf_counter()
+        for index in range(session_count):
+            store.start_session(index)
+        for step in range(steps_per_session):
+            store.add_frames(indices, states[step], actions[step], np.full(session_count, scores[step]))
+        episodes = [store.get_episode(index) for index in range(session_count)]
+        store_packed = [(np.asarray(episode_states, dtype=np.float32), np.asarray(episode_actions, dtype=np.int64),
+                         episode_rewards) for episode_states, episode_actions, episode_rewards in episodes]
+        duration = time.perf_counter() - start
+
+        name = "compact_store" if compact else "store"
+        results[f"{name}_frames_per_sec"] = frame_count / duration
+        results[f"{name}_state_bytes"] = store.get_stats()["capacity"] * 4 * np.dtype(store.state_dtype).itemsize
+        # The reward of a step is the score of the session's next frame, so the last frame isn't a step.
+        assert all(len(rewards) == steps_per_session - 1 for _, _, rewards in store_packed)
+
+    return results
+
+
+def benchmark_reinforce_update(episode_count: int, episodes_per_update: int = 16) -> dict:
+    """
+    Compares the episodes/sec of REINFORCE updates of the cart pole's policy batched by episodes_per_update and per
+    episode, on episode_count episodes of random states and lengths.
+    """
+    rng = np.random.default_rng(0)
+    episodes = []
+    for length in rng.integers(10, 200, episode_count).tolist():
+        episodes.append((rng.standard_normal((length, 4)).astype(np.float32),
+                         rng.integers(0, 2, length).astype(np.int8), np.ones(length, dtype=np.float32)))
+
+    results = {"count": episode_count, "episodes_per_update": episodes_per_update}
+    for mode, per_episode in (("batched", False), ("per_episode", True)):
+        torch.manual_seed(0)
+        # The network of training_cart_pole.py.
+        model = torch.nn.Sequential(torch.nn.Linear(4, 150), torch.nn.LeakyReLU(), torch.nn.Linear(150, 2),
+                                    torch.nn.Softmax(dim=0))
+        learner = ReinforceLearner(model, torch.optim.Adam(model.parameters(), lr=0.009),
+                                   lambda states: torch.softmax(model[:-1](states), dim=1), episodes_per_update,
+                                   per_episode=per_episode)
+
+        start = time.perf_counter()
+        for episode in episodes:
+            learner.add_episode(*episode)
+        learner.flush()
+        duration = time.perf_counter() - start
+
+        results[f"{mode}_episodes_per_sec"] = episode_count / duration
+        results[f"{mode}_update_ms"] = learner.update_time / learner.updates * 1e3
+
+    results["speedup"] = results["batched_episodes_per_sec"] / results["per_episode_episodes_per_sec"]
+    return results
+
+
+def benchmark_learner_process(session_count: int, epoch_count: int = 3, frames_per_session: int = 200) -> dict:
+    """
+    Compares the frames/sec of training_cart_pole.py (against the stand-in with -physics) training in the reading
+    thread and in a LearnerProcess, starting from the same parameters. Frames/sec include waiting for the last
+    updates, but not starting the learner process. Reports how many updates old the episodes the learner process trained on were.
+    """
+    os.environ.setdefault("UNITY_SIMULATOR_PATH", sys.executable)
+    module = importlib.import_module("training_cart_pole")
+    initial_parameters = copy.deepcopy(module.model.state_dict())
+    sim_inst = launch_stand_in(["-physics", "-frames", str(frames_per_session)], no_timeout=True)
+
+    results = {"sessions": session_count, "epochs": epoch_count}
+    for mode in ("in_process", "learner_process"):
+        np.random.seed(0)
+        torch.manual_seed(0)
+        module.model.load_state_dict(initial_parameters)
+        module.trainer.optimizer = torch.optim.Adam(module.model.parameters(), lr=module.learning_rate)
+        sessions = module.create_sessions(session_count)
+
+        # Created before timing, as starting the learner process imports torch and the script again.
+        if mode == "in_process":
+            module.trainer.learner = module.create_learner()
+        else:
+            module.trainer.learner = LearnerProcess(module.model, module.create_learner)
+        start = time.perf_counter()
+        messages_in = sim_inst.get_metrics()["messages_in"]
+        for _ in range(epoch_count):
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                sim_inst.run_experiment("cart_pole")
+                sessions = module.execute_epoch(sessions, sim_inst)
+        module.trainer.learner.close()
+        duration = time.perf_counter() - start
+
+        stats = module.trainer.learner.get_stats()
+        results[f"{mode}_frames"] = sim_inst.get_metrics()["messages_in"] - messages_in
+        results[f"{mode}_frames_per_sec"] = results[f"{mode}_frames"] / duration
+        results[f"{mode}_updates"] = stats["updates"]
+        results[f"{mode}_mean_score"] = float(np.mean(sessions.scores))
+        if mode == "learner_process":
+            results["mean_staleness"] = stats["mean_staleness"]
+            results["max_staleness"] = stats["max_staleness"]
+            results["queue_wait_seconds"] = stats["queue_wait_time"]
+
+    sim_inst.quit()
+    results["speedup"] = results["learner_process_frames_per_sec"] / results["in_process_frames_per_sec"]
+    return results
+
+
+# The training scripts timed by benchmark_epochs: script, experiment (None if execute_epoch runs it), and the
+# function creating the sessions.
+EPOCH_SCRIPTS = {
+    "prism": ("falling_rectangular_prism", None, "create_organisms"),
+    "crawler": ("two_part_crawling_creature", "crawl", "create_organisms"),
+    "cart_pole": ("training_cart_pole", "cart_pole", "create_sessions"),
+    "cart_pole_3d": ("training_cart_pole_3d", "cart_pole_3d", "create_organisms"),
+}
+
+
+def benchmark_epochs(session_count: int, epoch_count: int = 3, frames_per_session: int = 200) -> dict:
+    """
+    Measures the wall time of execute_epoch of each training script with session_count sessions, against the
+    stand-in simulating the experiments (-physics). Reports the median of epoch_count epochs, and for the prisms
+    the time to breed the next generation.
+    """
+    # The scripts read the path of the build when imported, but the stand-in is used here.
+    os.environ.setdefault("UNITY_SIMULATOR_PATH", sys.executable)
+    # The scripts' networks are created when they are imported, and how long the cart poles last depends on how well
+    # they learn, so the runs are seeded for the epochs to have the same frames every time.
+    np.random.seed(0)
+    torch.manual_seed(0)
+    sim_inst = launch_stand_in(["-physics", "-frames", str(frames_per_session)], no_timeout=True)
+
+    results = {"sessions": session_count, "epochs": epoch_count}
+    for name, (script, experiment, create_sessions) in EPOCH_SCRIPTS.items():
+        module = importlib.import_module(script)
+        sessions = getattr(module, create_sessions)(session_count)
+
+        durations = []
+        for _ in range(epoch_count):
+            start = time.perf_counter()
+            # The scripts print their top performers and progress bars every epoch.
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                if not (experiment is None):
+                    sim_inst.run_experiment(experiment)
+                sessions = module.execute_epoch(sessions, sim_inst)
+            durations.append(time.perf_counter() - start)
+        results[f"{name}_epoch_ms"] = statistics.median(durations) * 1e3
+
+        if name == "prism":
+            start = time.perf_counter()
+            module.reproduction(sessions)
+            results["prism_generation_ms"] = (time.perf_counter() - start) * 1e3
+
+    sim_inst.quit()
+    return results
@@ -0,0 +1,350 @@
+"""
+@author William Erignac
+@version 2026-10-16
+
+This script contains the benchmarks of the communication with the simulator (see benchmarks.py): framing and decoding
+lines, serializing sessions, the json and binary frame protocols, round trips, switching tasks, recording and
+replaying, and how fast the stand-in simulator itself is.
+"""
+
+import io
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks_common import PIPE_NAME, PIPE_PATH, launch_stand_in, run_cart_pole_frames, summarize_latencies
+from binary_protocol import RECORD_HEADER, MessageType, pack_record
+from line_framer import LineFramer
+from population import Population
+from recording_transport import ReplayTransport, summarize_recording
+from session_encoder import Constant, SessionEncoder
+from stand_in_simulator import ECHO_EXPERIMENT, StandInSimulator
+from unity_instance import Message, MessageDecoder, UnityInstance
+
+
+def benchmark_read_line_latency(line_count: int) -> dict:
+    """
+    Measures the time between writing a line to the stand-in and read_line returning its echo.
+    """
+    sim_inst = launch_stand_in()
+    sim_inst.run_experiment(ECHO_EXPERIMENT)
+
+    latencies = []
+    for i in range(line_count):
+        start = time.perf_counter()
+        sim_inst.write_line(str(i))
+        sim_inst.flush_pipe()
+        line = sim_inst.read_line()
+        latencies.append(time.perf_counter() - start)
+        assert line == str(i)
+
+    sim_inst.end_send_session_initialization_data()
+    while not (sim_inst.read_line() is None):
+        pass
+    sim_inst.quit()
+
+    return summarize_latencies(latencies)
+
+
+def make_frame_lines(line_count: int) -> list:
+    """
+    Creates lines shaped like the cart pole frame messages.
+    """
+    frame = {"CartPosition": 0.12345678, "CartVelocity": -1.2345678, "PoleAngle": 3.4567891,
+             "PoleAngularVelocity": -0.45678912, "Score": 42.0}
+    return [f"{i % 1024} {json.dumps(frame)}" for i in range(line_count)]
+
+
+def benchmark_line_framing(line_count: int) -> dict:
+    """
+    Measures the lines/sec of LineFramer on in-memory frame messages, read in chunks of the framer's read view.
+    """
+    delimiter = b"\r\n"
+    lines = make_frame_lines(line_count)
+    data = delimiter.join(line.encode() for line in lines) + delimiter
+
+    start = time.perf_counter()
+    framer = LineFramer(delimiter)
+    source = io.BytesIO(data)
+    framer_lines = []
+    while True:
+        bytes_read = source.readinto(framer.get_read_view())
+        if bytes_read == 0:
+            break
+        framer.commit(bytes_read)
+        framer_lines.extend(framer.lines())
+    framer_duration = time.perf_counter() - start
+
+    assert framer_lines == lines
+
+    return {"count": line_count,
+            "framer_lines_per_sec": line_count / framer_duration}
+
+
+def make_session_messages(session_count: int, frames_per_session: int) -> list:
+    """
+    Creates the start, frame and score lines of cart pole sessions, compact like the json written by Unity.
+    """
+    frame = json.dumps({"CartPosition": 0.12345678, "CartVelocity": -1.2345678, "PoleAngle": 3.4567891,
+                        "PoleAngularVelocity": -0.45678912, "Score": 42.0}, separators=(",", ":"))
+    lines = [str(index) for index in range(session_count)]
+    for _ in range(frames_per_session):
+        lines += [f"{index} {frame}" for index in range(session_count)]
+    lines += [f"{index} {frames_per_session + index * 0.5}" for index in range(session_count)]
+    return lines
+
+
+def benchmark_message_decoding(session_count: int, frames_per_session: int = 20) -> dict:
+    """
+    Measures the messages/sec of MessageDecoder on the lines of cart pole sessions, including storing the scores in
+    the sessions' Population the way the training scripts do.
+    """
+    lines = make_session_messages(session_count, frames_per_session)
+
+    sessions = Population(session_count, dict())
+    start = time.perf_counter()
+    decoder = MessageDecoder()
+    for line in lines:
+        decoder.decode(line)
+    sessions.set_scores(*decoder.get_scores())
+    decoder_duration = time.perf_counter() - start
+
+    assert sessions.scores[-1] == frames_per_session + (session_count - 1) * 0.5
+
+    return {"count": len(lines),
+            "decoder_messages_per_sec": len(lines) / decoder_duration}
+
+
+CRAWLER_VECTORS = ("First.Size", "First.Rotation", "First.ConnectionPoint",
+                   "Second.Size", "Second.Rotation", "Second.ConnectionPoint")
+
+
+def benchmark_session_encoding(population_count: int) -> dict:
+    """
+    Measures the members/sec of serializing crawlers with a SessionEncoder, with the encoder on a reordered copy of
+    the same population (as every epoch of the cart pole), and with the encoder's processes (one per CPU).
+    """
+    rng = np.random.default_rng()
+    crawlers = Population.from_columns({name: rng.random((population_count, 3)) for name in CRAWLER_VECTORS})
+    layout = {part: {vector: {axis: (f"{part}.{vector}", i) for i, axis in enumerate("xyz")}
+                     for vector in ("Size", "Rotation", "ConnectionPoint")}
+              for part in ("First", "Second")}
+    layout["PipeName"] = Constant("")
+
+    results = {"count": population_count}
+
+    encoder = SessionEncoder(layout)
+    start = time.perf_counter()
+    expected = encoder.encode(crawlers)
+    results["encoder_members_per_sec"] = population_count / (time.perf_counter() - start)
+
+    reordered = crawlers.take(rng.permutation(population_count))
+    start = time.perf_counter()
+    encoder.encode(reordered)
+    results["memoized_members_per_sec"] = population_count / (time.perf_counter() - start)
+    assert(encoder.get_stats()["members_reused"] == population_count)
+
+    encoder = SessionEncoder(layout, memoize=False, processes=os.cpu_count(), min_process_count=0)
+    # The first call starts the processes.
+    encoder.encode(crawlers.take(np.arange(min(population_count, 16))))
+    start = time.perf_counter()
+    encoded = encoder.encode(crawlers)
+    results["process_members_per_sec"] = population_count / (time.perf_counter() - start)
+    encoder.close()
+    assert(encoded == expected)
+
+    return results
+
+
+def benchmark_frame_protocol(session_count: int, frames_per_session: int = 200) -> dict:
+    """
+    Compares the frames/sec of cart pole sessions on the stand-in with json lines and with the binary protocol.
+    """
+    sim_inst = launch_stand_in(["-frames", str(frames_per_session)])
+
+    results = {"sessions": session_count, "frames_per_session": frames_per_session}
+    for mode, binary in (("json", False), ("binary", True)):
+        start = time.perf_counter()
+        frame_count = run_cart_pole_frames(sim_inst, session_count, binary)
+        results[f"{mode}_frames_per_sec"] = frame_count / (time.perf_counter() - start)
+
+    sim_inst.quit()
+
+    results["speedup"] = results["binary_frames_per_sec"] / results["json_frames_per_sec"]
+    return results
+
+
+def benchmark_frame_round_trip(frame_count: int) -> dict:
+    """
+    Measures the time between writing the command for a frame of a single cart pole session to the stand-in and
+    reading the session's next frame, with json lines and with the binary protocol.
+    """
+    sim_inst = launch_stand_in(["-frames", str(frame_count)])
+
+    results = {"count": frame_count}
+    for mode, binary in (("json", False), ("binary", True)):
+        sim_inst.run_experiment("cart_pole", binary)
+        sim_inst.send_session_initialization_data(['{"WindSeed": 1, "InitialAngle": 0.0}'])
+        sim_inst.end_send_session_initialization_data()
+
+        latencies = []
+        command_time = None
+
+        def on_frame(message: Message):
+            nonlocal command_time
+            if not (command_time is None):
+                latencies.append(time.perf_counter() - command_time)
+            if binary:
+                sim_inst.write_record(message.index, [1.0])
+            else:
+                sim_inst.write_line(f'{message.index} {{"MoveRight": true}}')
+            sim_inst.flush_pipe()
+            command_time = time.perf_counter()
+
+        MessageDecoder().dispatch(sim_inst, {MessageType.FRAME: on_frame})
+        for name, value in summarize_latencies(latencies).items():
+            if name != "count":
+                results[f"{mode}_{name}"] = value
+
+    sim_inst.quit()
+    return results
+
+
+def benchmark_task_switches(epoch_count: int) -> dict:
+    """
+    Runs epoch_count epochs of a single session of an experiment the stand-in scores right away, so each epoch is
+    mostly the switch from the idle task to an experiment and back. Measures the epochs/sec and the time per epoch.
+    """
+    sim_inst = launch_stand_in()
+
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(epoch_count):
+        epoch_start = time.perf_counter()
+        sim_inst.run_experiment("task_switch")
+        sim_inst.send_session_initialization_data("{}")
+        sim_inst.end_send_session_initialization_data()
+        while not (sim_inst.read_line() is None):
+            pass
+        latencies.append(time.perf_counter() - epoch_start)
+    seconds = time.perf_counter() - start
+    sim_inst.quit()
+
+    results = {"epochs_per_sec": epoch_count / seconds}
+    results.update(summarize_latencies(latencies))
+    return results
+
+
+def benchmark_replay(session_count: int, frames_per_session: int = 100) -> dict:
+    """
+    Records cart pole sessions on the stand-in, then replays the recording as fast as possible (checking that the
+    commands match), and compares the frames/sec of both. The replay only runs the Python side, as when profiling it.
+    """
+    results = {"sessions": session_count, "frames_per_session": frames_per_session}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "cart_pole.gz")
+
+        sim_inst = launch_stand_in(["-frames", str(frames_per_session)], recording_path=path)
+        start = time.perf_counter()
+        frame_count = run_cart_pole_frames(sim_inst, session_count, False)
+        results["recorded_frames_per_sec"] = frame_count / (time.perf_counter() - start)
+        sim_inst.quit()
+
+        summary = summarize_recording(path)
+        results["recording_bytes"] = os.path.getsize(path)
+        results["recorded_python_share"] = summary["python_time"] / summary["duration"]
+
+        replay = ReplayTransport(path, strict=True)
+        sim_inst = UnityInstance(os.path.join(PIPE_PATH, PIPE_NAME), transport=replay)
+        start = time.perf_counter()
+        frame_count = run_cart_pole_frames(sim_inst, session_count, False)
+        results["replayed_frames_per_sec"] = frame_count / (time.perf_counter() - start)
+        sim_inst.quit()
+        results["mismatches"] = replay.get_stats()["mismatches"]
+
+    return results
+
+
+class CommandPeer:
+    """
+    The Python side of a cart pole experiment for a StandInSimulator running in this process: it is both the
+    simulator's reader and writer, and answers every frame written with a command. Keeps the time it spends, so it
+    can be told apart from the simulator's.
+    """
+    def __init__(self, session_count: int, binary: bool):
+        self.binary = binary
+        self._in = bytearray(f"run cart_pole{' binary' if binary else ''}\n".encode())
+        self._in += "".join(f'{{"WindSeed": {i % 999 + 1}, "InitialAngle": {(i % 11 - 5) * 0.5}}}\n'
+                            for i in range(session_count)).encode()
+        self._in += b"END\n"
+        self._position = 0
+        self._command = pack_record(MessageType.COMMAND, 0, (1.0,))
+        self._frame_size = RECORD_HEADER.size + 4 * 5
+
+        self.frame_count = 0
+        self.time = 0.0
+
+    def write(self, data: bytes):
+        start = time.perf_counter()
+        if data.startswith(b"SUCCESS") or data.startswith(b"QUIT"):
+            commands = b""
+        elif self.binary:
+            commands = bytearray()
+            offset = 0
+            while offset < len(data):
+                message_type, index, payload_size = RECORD_HEADER.unpack_from(data, offset)
+                offset += RECORD_HEADER.size + payload_size
+                if message_type == MessageType.FRAME:
+                    commands += RECORD_HEADER.pack(MessageType.COMMAND, index, 4) + self._command[RECORD_HEADER.size:]
+                elif message_type == MessageType.END:
+                    commands += b"quit\n"
+            self.frame_count += len(commands) // (RECORD_HEADER.size + 4)
+        else:
+            lines = data.split(b"\n")
+            commands = b"".join(b"%s {\"MoveRight\": true}\n" % line.split(b" ", 1)[0] for line in lines
+                                if line.endswith(b"}") or line.endswith(b"}\r"))
+            self.frame_count += commands.count(b"\n")
+            if b"END" in lines or b"END\r" in lines:
+                commands += b"quit\n"
+        self._in += commands
+        self.time += time.perf_counter() - start
+
+    def flush(self):
+        pass
+
+    def readline(self) -> bytes:
+        end = self._in.find(b"\n", self._position) + 1
+        if end == 0:
+            end = len(self._in)
+        line = bytes(self._in[self._position:end])
+        self._position = end
+        return line
+
+    def read(self, size: int) -> bytes:
+        data = bytes(self._in[self._position:self._position + size])
+        self._position += len(data)
+        return data
+
+
+def benchmark_stand_in(session_count: int, frames_per_session: int = 200) -> dict:
+    """
+    Measures the frames/sec the stand-in simulator can send (not counting the Python side answering them), with
+    scripted frames and with cart pole physics, as json lines and as binary records. With physics, sessions end when
+    their pole falls, and run in 256 slots.
+    """
+    results = {"sessions": session_count, "frames_per_session": frames_per_session}
+    for physics in (False, True):
+        for binary in (False, True):
+            peer = CommandPeer(session_count, binary)
+            simulator = StandInSimulator(peer, peer, frames_per_session, slots=256 if physics else 0, physics=physics)
+            start = time.perf_counter()
+            simulator.run()
+            duration = time.perf_counter() - start - peer.time
+
+            name = f"{'physics' if physics else 'scripted'}_{'binary' if binary else 'json'}"
+            results[f"{name}_frames"] = peer.frame_count
+            results[f"{name}_frames_per_sec"] = peer.frame_count / duration
+    return results
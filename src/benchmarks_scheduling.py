@@ -0,0 +1,101 @@
+"""
+@author William Erignac
+@version 2026-10-16
+
+This script contains the benchmarks of how sessions are scheduled on the simulators (see benchmarks.py): streaming
+sessions as they are generated, and splitting them across a pool of instances.
+"""
+
+import json
+import time
+
+from benchmarks_common import launch_stand_in, launch_stand_in_pool, run_cart_pole_frames
+from binary_protocol import MessageType
+from unity_instance import Message, MessageDecoder
+
+
+def generate_sessions(session_count: int, generation_time: float):
+    """
+    Yields session initialization data for the cart pole, taking generation_time seconds for each session.
+    """
+    for i in range(session_count):
+        time.sleep(generation_time)
+        yield json.dumps({"WindSeed": i, "InitialAngle": 0.0})
+
+
+def run_generated_sessions(sim_inst, session_count: int, generation_time: float, stream: bool,
+                           chunk_size: int) -> dict:
+    """
+    Generates and runs cart pole sessions, either generating all of them before sending them, or streaming them with
+    submit_sessions. Returns the seconds until the first session started and until every session was scored.
+    """
+    start = time.perf_counter()
+    first_start = None
+
+    def on_start(message: Message):
+        nonlocal first_start
+        if first_start is None:
+            first_start = time.perf_counter() - start
+
+    def on_frame(message: Message):
+        sim_inst.write_line(f"{message.index} {json.dumps({'MoveRight': True})}")
+
+    sim_inst.run_experiment("cart_pole")
+    sessions = generate_sessions(session_count, generation_time)
+    if stream:
+        sim_inst.submit_sessions(sessions, chunk_size)
+    else:
+        sim_inst.send_session_initialization_data(list(sessions))
+        sim_inst.end_send_session_initialization_data()
+
+    sim_inst.begin_batch()
+    decoder = MessageDecoder()
+    decoder.dispatch(sim_inst, {MessageType.START: on_start, MessageType.FRAME: on_frame})
+    sim_inst.commit()
+    assert(len(decoder.get_scores()[0]) == session_count)
+
+    return {"first_start": first_start, "total": time.perf_counter() - start}
+
+
+def benchmark_session_streaming(session_count: int, generation_time: float = 0.001, instance_count: int = 2,
+                                chunk_size: int = 16) -> dict:
+    """
+    Compares the time until the first session starts and until the epoch ends when sessions that take generation_time
+    seconds each to generate are all generated before being sent, and when they are streamed, on one stand-in and on
+    a pool of instance_count stand-ins.
+    """
+    results = {"sessions": session_count, "generation_ms": generation_time * 1000}
+
+    for name, sim_inst in (("instance", launch_stand_in(["-frames", "20"])),
+                           ("pool", launch_stand_in_pool(instance_count, ["-frames", "20"]))):
+        for mode, stream in (("batch", False), ("stream", True)):
+            timings = run_generated_sessions(sim_inst, session_count, generation_time, stream, chunk_size)
+            results[f"{name}_{mode}_first_start_ms"] = timings["first_start"] * 1000
+            results[f"{name}_{mode}_total_ms"] = timings["total"] * 1000
+        sim_inst.quit()
+
+    return results
+
+
+def benchmark_pool(session_count: int, instance_count: int = 4, frames_per_session: int = 50, slots: int = 16,
+                   step_time: float = 0.002) -> dict:
+    """
+    Compares the sessions/sec of cart pole sessions on one stand-in and on a pool of instance_count stand-ins, when
+    the simulators run up to slots sessions at once (-slots) and each step takes them step_time seconds (-step_time),
+    like the scene and physics step of a build. Also reports how many chunks (experiments) the pool split the sessions
+    into.
+    """
+    stand_in_args = ["-frames", str(frames_per_session), "-slots", str(slots), "-step_time", str(step_time)]
+    results = {"sessions": session_count, "instances": instance_count}
+
+    for name, sim_inst in (("instance", launch_stand_in(stand_in_args)),
+                           ("pool", launch_stand_in_pool(instance_count, stand_in_args))):
+        start = time.perf_counter()
+        run_cart_pole_frames(sim_inst, session_count, False)
+        results[f"{name}_sessions_per_sec"] = session_count / (time.perf_counter() - start)
+        if name == "pool":
+            results["pool_chunks"] = sim_inst.chunk_count
+        sim_inst.quit()
+
+    results["speedup"] = results["pool_sessions_per_sec"] / results["instance_sessions_per_sec"]
+    return results
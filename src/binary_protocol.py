@@ -0,0 +1,117 @@
+"""
+@author William Erignac
+@version 2026-10-16
+
+This script contains the binary frame protocol, an opt-in alternative to sending frames and commands as
+"<index> <json>" lines.
+
+The mode is negotiated when an experiment is run: Python sends "run <experiment name> binary", and a simulator that
+supports the mode answers "SUCCESS binary" instead of "SUCCESS" (simulators that don't just answer "SUCCESS", and the
+experiment runs with json lines as usual). In binary mode:
+- Everything the simulator writes after "SUCCESS binary" up to and including the END record is made of records.
+- Python keeps sending session initialization data and END as lines, and sends commands as records after END.
+
+Each record is a header (message type, session index, payload size in bytes) followed by the payload:
+- START, END: no payload.
+- FRAME, COMMAND: float32 values laid out as in FRAME_LAYOUTS / COMMAND_LAYOUTS for the experiment.
+- SCORE: one float32.
+- TEXT: a utf-8 line (e.g. a warning or error).
+Float32 payloads can be read with np.frombuffer(record.payload, dtype=np.float32).
+"""
+
+import struct
+from array import array
+from enum import IntEnum
+from typing import NamedTuple
+
+
+# Word added to the run command to request binary mode, and to SUCCESS to accept it.
+BINARY_MODE_ARGUMENT = "binary"
+
+# Type, session index, payload size in bytes.
+RECORD_HEADER = struct.Struct("<BiI")
+
+
+class MessageType(IntEnum):
+    """
+    The kinds of messages exchanged during an experiment.
+    """
+    START = 1
+    FRAME = 2
+    SCORE = 3
+    COMMAND = 4
+    END = 5
+    TEXT = 6
+
+
+class Record(NamedTuple):
+    """
+    A message read in binary mode.
+    """
+    type: MessageType
+    index: int
+    payload: bytes
+
+
+# The fields of the frames sent by each experiment, in the order they are packed. Nested json keys are joined by ".".
+FRAME_LAYOUTS = {
+    "cart_pole": ("CartPosition", "CartVelocity", "PoleAngle", "PoleAngularVelocity", "Score"),
+    "cart_pole_3d": ("State.CartVelocityX", "State.PoleAngularPositionX", "State.PoleAngularVelocityX",
+                     "State.CartVelocityZ", "State.PoleAngularPositionZ", "State.PoleAngularVelocityZ",
+                     "Goal.CartVelocityX", "Goal.CartVelocityZ", "Score"),
+}
+
+# The fields of the commands accepted by each experiment, in the order they are packed. Booleans are 0.0 or 1.0.
+COMMAND_LAYOUTS = {
+    "cart_pole": ("MoveRight",),
+    "cart_pole_3d": ("DriveX", "DriveZ"),
+}
+
+
+def pack_record(message_type: MessageType, index: int, values=()) -> bytes:
+    """
+    Packs a record with a float32 payload (values can be any iterable of numbers, or a float32 NumPy array).
+    """
+    payload = values.tobytes() if hasattr(values, "tobytes") else array("f", values).tobytes()
+    return RECORD_HEADER.pack(message_type, index, len(payload)) + payload
+
+
+def pack_text_record(text: str, index: int = -1) -> bytes:
+    payload = text.encode()
+    return RECORD_HEADER.pack(MessageType.TEXT, index, len(payload)) + payload
+
+
+def unpack_values(payload: bytes) -> array:
+    """
+    Unpacks a float32 payload without NumPy.
+    """
+    values = array("f")
+    values.frombytes(payload)
+    return values
+
+
+def layout_to_dict(layout: tuple, values) -> dict:
+    """
+    Converts packed values back into the (possibly nested) dict that the json version of the message would have.
+    """
+    out = dict()
+    for name, value in zip(layout, values):
+        keys = name.split(".")
+        parent = out
+        for key in keys[:-1]:
+            parent = parent.setdefault(key, dict())
+        parent[keys[-1]] = float(value)
+    return out
+
+
+def dict_to_layout(layout: tuple, data: dict) -> list:
+    """
+    Converts a (possibly nested) dict into values to pack, in the order of layout.
+    """
+    values = []
+    for name in layout:
+        value = data
+        for key in name.split("."):
+            value = value[key]
+        values.append(float(value))
+    return values
@@ -0,0 +1,264 @@
+"""
+@author William Erignac
+@version 2026-10-16
+
+This script contains the parts of the cart pole training scripts (training_cart_pole.py and training_cart_pole_3d.py)
+that don't depend on the experiment: the CartPoleTrainer, which runs the sessions of an epoch with a policy network
+and learns from them with a ReinforceLearner, and the arguments and main loop of the scripts. The scripts only define
+their network, the layout of their sessions, how a frame is turned into a state and which command each action sends.
+
+The policy gradient code is based on the first example for cart pole in "Deep Reinforcement Learning In Action" by
+Zai, Alexander and Brown, Brandon (pg 106-108), see the license in the training scripts.
+"""
+
+import argparse
+import os
+
+import numpy as np
+import torch
+from tqdm import tqdm
+
+from binary_protocol import MessageType
+from instance_metrics import MetricsExporter, diff_snapshots, format_summary
+from learner_process import LearnerProcess
+from population import Population
+from recording_transport import ReplayTransport
+from reinforce_learner import ReinforceLearner
+from session_encoder import SessionEncoder
+from tracing import TRACER, traced
+from trajectory_store import TrajectoryStore
+from unity_instance import Message, MessageDecoder, UnityInstance
+from unity_instance_pool import create_simulator
+
+
+class CartPoleTrainer:
+    """
+    Runs the sessions of a cart pole experiment with a policy network, and learns from the finished sessions.
+    """
+    def __init__(self, model: torch.nn.Sequential, optimizer: torch.optim.Optimizer, observation_count: int,
+                 session_encoder: SessionEncoder, extract_frame_data, action_commands: list, score_episode):
+        """
+        model = the policy network, ending with a softmax over dim 0 (it takes one state at a time).
+        observation_count = number of values in a state.
+        session_encoder = formats the initialization data of the sessions.
+        extract_frame_data = function turning the data of a frame into (state, reward).
+        action_commands = the command sent for each action of the network.
+        score_episode = function returning the score to plot for an episode, given its states, actions and rewards.
+        """
+        self.model = model
+        self.optimizer = optimizer
+        self.observation_count = observation_count
+        self.session_encoder = session_encoder
+        self.extract_frame_data = extract_frame_data
+        self.action_commands = action_commands
+        self.score_episode = score_episode
+
+        # Performs the gradient steps for finished sessions. Configured with -episodes, and replaced by a
+        # LearnerProcess with -learner_process.
+        self.learner = self.create_learner()
+        # The steps of the running sessions, handed to the learner when they finish. Replaced when -compact is passed.
+        self.trajectories = TrajectoryStore(observation_count)
+        # The score of each finished session, in the order they finished.
+        self.scores = []
+
+    def configure(self, args: argparse.Namespace, create_learner=None):
+        """
+        Applies the arguments of create_argument_parser that change the training.
+        create_learner = function (picklable, e.g. defined at the top level of the training script) creating the
+        learner in the learner process with -learner_process (see learner_process.LearnerProcess).
+        """
+        self.learner.per_episode = args.episodes is None
+        if not self.learner.per_episode:
+            self.learner.episodes_per_update = args.episodes
+        if args.learner_process:
+            if create_learner is None:
+                raise Exception("-learner_process needs the function creating the learner in the learner process.")
+            self.learner = LearnerProcess(self.model, create_learner, self.learner.episodes_per_update,
+                                          self.learner.per_episode)
+        self.trajectories = TrajectoryStore(self.observation_count, compact=args.compact)
+
+    def create_learner(self) -> ReinforceLearner:
+        return ReinforceLearner(self.model, self.optimizer, self.policy)
+
+    def policy(self, states: torch.Tensor) -> torch.Tensor:
+        """
+        Returns the action probabilities for each row of states.
+        The model's softmax is over dim 0 (it takes one state at a time), so it is applied to each row here.
+        """
+        return torch.softmax(self.model[:-1](states), dim=1)
+
+    def choose_actions(self, states: np.ndarray) -> np.ndarray:
+        """
+        Samples an action for each row of states (float32) with a single forward pass, without tracking gradients.
+        """
+        with torch.no_grad():
+            act_probs = self.policy(torch.from_numpy(states)).numpy()
+        # For each row, the first action whose cumulative probability reaches a uniform draw.
+        draws = np.random.random((states.shape[0], 1))
+        return np.minimum((act_probs.cumsum(axis=1) < draws).sum(axis=1), len(self.action_commands) - 1)
+
+    @traced()
+    def serialize_sessions(self, sessions: Population) -> list:
+        return self.session_encoder.encode(sessions)
+
+    @traced("epoch")
+    def execute_epoch(self, sessions: Population, sim_inst: UnityInstance) -> Population:
+        metrics = sim_inst.get_metrics()
+        # Send the session initialization data while the responses are read.
+        sim_inst.submit_sessions(self.serialize_sessions(sessions))
+        # Read the responses from the simulator and process them
+        # this includes starting new sessions, reporting the final
+        # scores of sessions, and data about the initial state of sessions.
+        # Commands are batched and written once every frame of a physics step has been read.
+        sim_inst.begin_batch()
+        try:
+            self.read_simulator_responses(sessions, sim_inst)
+        finally:
+            sim_inst.commit()
+        # Learn from the sessions that didn't fill a batch of episodes, after which their steps aren't needed anymore.
+        self.learner.flush()
+        self.trajectories.clear()
+        # By now "sessions" is updated to have the true scores from the read_simulator_responses thread.
+        print(f'Top Performers:\n{sessions.top(10).to_dataframe()}')
+        print(f"Pipe: {format_summary(diff_snapshots(metrics, sim_inst.get_metrics()))}")
+
+        return sessions.sorted()
+
+    def read_simulator_responses(self, sessions: Population, sim_inst: UnityInstance):
+        decoder = MessageDecoder()
+
+        with tqdm(range(len(sessions))) as progress:
+            def on_start(message: Message):
+                TRACER.session_begin(message.index)
+                # The state, action and reward of each step of the session are kept by the trajectory store.
+                self.trajectories.start_session(message.index)
+
+            def on_frames(messages: list):
+                # Every frame of the physics step is answered with one forward pass.
+                commands = self.process_frames(messages)
+                with TRACER.span("write_commands"):
+                    for index, command in zip((message.index for message in messages), commands):
+                        sim_inst.write_line(f"{index} {command}")
+
+            def on_score(message: Message):
+                with TRACER.span("on_session_end", session=message.index):
+                    self.on_session_end(message.index)
+                TRACER.session_end(message.index, score=float(message.data))
+                progress.update(1)
+
+            decoder.dispatch(sim_inst, {MessageType.START: on_start,
+                                        MessageType.SCORE: on_score}, on_frames)
+
+        score_indices, scores = decoder.get_scores()
+        sessions.set_scores(score_indices, scores)
+
+    @traced()
+    def process_frames(self, messages: list) -> list:
+        """
+        Chooses the actions for a batch of frame messages (usually every frame of a physics step) at once, stores the
+        frames' states, actions and rewards, and returns the command of each session, in the order of messages.
+        """
+        # Between physics steps, take the parameters of the learner if it updates them elsewhere (e.g. a LearnerProcess).
+        self.learner.sync()
+        indices = np.empty(len(messages), dtype=np.int64)
+        inputs = np.empty((len(messages), self.observation_count), dtype=np.float32)
+        frame_scores = np.empty(len(messages), dtype=np.float32)
+        with TRACER.span("extract_frame_data", frames=len(messages)):
+            for i, message in enumerate(messages):
+                indices[i] = message.index
+                inputs[i], frame_scores[i] = self.extract_frame_data(message.data)
+
+        with TRACER.span("choose_actions", frames=len(messages)):
+            actions = self.choose_actions(inputs)
+        self.trajectories.add_frames(indices, inputs, actions, frame_scores)
+
+        TRACER.session_instants("frame", indices.tolist())
+        return [self.action_commands[action] for action in actions.tolist()]
+
+    def on_session_end(self, index: int):
+        """
+        When a session has ended, give all the rewards, states, and actions to the learner,
+        which performs gradient descent.
+        """
+        states, actions, rewards = self.trajectories.get_episode(index)
+        if len(rewards) > 0:
+            self.scores.append(self.score_episode(states, actions, rewards))
+        self.learner.add_episode(states, actions, rewards)
+
+
+def create_argument_parser() -> argparse.ArgumentParser:
+    """
+    Returns the parser of the arguments of the cart pole training scripts.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-t", help="if this flag is passed, don't run the Unity executable.", action="store_false")
+    parser.add_argument("-e", help="number of epochs that should be run.", type=int, default=1)
+    parser.add_argument("-display", help="if this flag is passed, display the agent's performance after training.", action="store_true")
+    parser.add_argument("-stats", help="what types of statistics to show.", type=int, default=0)
+    parser.add_argument("-instances", help="number of simulator instances to split the sessions across.", type=int, default=1)
+    parser.add_argument("-episodes", help="if passed, learn from batches of this many finished sessions with each gradient step (e.g. 16), instead of taking a gradient step for each session as it finishes.", type=int, default=None)
+    parser.add_argument("-learner_process", help="if this flag is passed, take the gradient steps in another process, so reading the simulator never waits for them (the policy used is a few updates behind).", action="store_true")
+    parser.add_argument("-compact", help="if this flag is passed, keep the states of running sessions as float16.", action="store_true")
+    parser.add_argument("-record", help="file to record the traffic with the simulator to (one file per instance).", type=str, default=None)
+    parser.add_argument("-replay", help="recording to replay instead of running the simulator (recorded with one instance and the same -e).", type=str, default=None)
+    parser.add_argument("-paced", help="if this flag is passed with -replay, replay the simulator's messages at the recorded pace.", action="store_true")
+    parser.add_argument("-metrics", help="file to export the metrics of the simulator instances to periodically (Prometheus text format if it ends with .prom, json lines otherwise).", type=str, default=None)
+    parser.add_argument("-trace", help="file to write a Chrome trace of the epochs to (open it in Perfetto).", type=str, default=None)
+    parser.add_argument("-trace_sample", help="with -trace, fraction of the sessions whose timeline is traced.", type=float, default=0.1)
+    parser.add_argument("-metrics_interval", help="seconds between exports of the metrics with -metrics.", type=float, default=10.0)
+    return parser
+
+
+def create_training_simulator(args: argparse.Namespace, pipe_path: str, pipe_name: str, executable_args: dict):
+    """
+    Returns the simulator to train with: a UnityInstance replaying -replay, or the -instances builds run with
+    executable_args (unless -t is passed), recording to -record.
+    """
+    if not (args.replay is None):
+        if args.instances > 1:
+            raise Exception("Recordings are replayed with a single instance.")
+        # The policy samples its actions, so the commands are expected to differ from the recording.
+        replay = ReplayTransport(args.replay, paced=args.paced)
+        return UnityInstance(os.path.join(pipe_path, pipe_name), transport=replay, no_timeout=True)
+
+    return create_simulator(pipe_path, pipe_name, executable_args if args.t else None, args.instances,
+                            no_timeout=True, recording_path=args.record)
+
+
+def run_epochs(trainer: CartPoleTrainer, sim_inst, experiment_name: str, sessions: Population,
+               args: argparse.Namespace) -> list:
+    """
+    Runs -e epochs of the experiment with the sessions, tracing them to -trace and exporting the metrics of sim_inst
+    to -metrics if they are passed. Returns the mean score of the first 10 sessions after each epoch.
+    """
+    if not (args.trace is None):
+        TRACER.enable(args.trace_sample)
+
+    exporter = None
+    if not (args.metrics is None):
+        exporter = MetricsExporter(sim_inst, args.metrics, args.metrics_interval)
+        exporter.start()
+
+    performance_per_epoch = []
+    for i in range(args.e):
+        print(f"\nEpoch {i + 1}")
+        sim_inst.run_experiment(experiment_name)
+        trainer.execute_epoch(sessions, sim_inst)
+        performance_per_epoch.append(np.mean(sessions.scores[:10]))
+
+    if not (args.replay is None):
+        # The transport of the instance made by create_training_simulator.
+        print(f"Replay: {sim_inst.transport.get_stats()}")
+
+    # Wait for the last gradient steps (those of the learner process with -learner_process) before the model is saved.
+    trainer.learner.close()
+    print(f"Learner: {trainer.learner.get_stats()}")
+
+    if not (exporter is None):
+        exporter.stop()
+
+    if not (args.trace is None):
+        TRACER.save(args.trace)
+        print(f"Trace of {TRACER.get_event_count()} events written to {args.trace}")
+
+    return performance_per_epoch
@@ -7,14 +7,21 @@ and initial rotation of a prism that result in movement for the longest amount o
 """
 
 import numpy as np
-import numpy.random
-import pandas as pd
-import random
 import matplotlib.pyplot as plt
 import json
 import argparse
 import os
-from unity_instance import UnityInstance
+import time
+from fitness_cache import FitnessCache, get_build_id
+from genetic_operators import reproduce
+from population import Population
+from session_encoder import SessionEncoder
+from surrogate import KNNSurrogate
+from steady_state_ga import REPLACEMENT_POLICIES, REPLACE_WORST, SteadyStateGA
+from binary_protocol import MessageType
+from instance_metrics import MetricsExporter, diff_snapshots, format_summary
+from unity_instance import Message, MessageDecoder, UnityInstance
+from unity_instance_pool import create_simulator
 
 PIPE_PATH = '\\\\.\\pipe\\'
 PIPE_NAME = "PipeB"
@@ -23,16 +30,24 @@ SIMULATOR_ARGS = ["-batchmode", "-nographics", "-p", PIPE_NAME]
 
 #region Genetic Algorithm
 
+# The genes of a prism, in the order of the Genome column: its scale (x, y, z) and its euler rotation (x, y, z).
+SCALE = slice(0, 3)
+ROTATION = slice(3, 6)
+PRISM_COLUMNS = {"Genome": (np.float64, (6,))}
+
+# The genes changed by asexual reproduction. The per-prism mutation this replaced picked genes with
+# np.random.randint(0, 2) from the scale only, so only the x and y scales were ever mutated; that is kept as-is.
+MUTABLE_GENES = np.array([0, 1])
+
+rng = np.random.default_rng()
+
 class RectPrism:
     """
     The scale and euler rotation of a rectangular prism.
     """
-    def __init__(self, scale_vector=None, rotation_vector=None):
-        """
-        Can be initialized with Nones for random scales and rotations.
-        """
-        self.scale = np.random.random(3) if scale_vector is None else scale_vector
-        self.rotation = np.random.random(3) * 90 if rotation_vector is None else rotation_vector
+    def __init__(self, scale_vector, rotation_vector):
+        self.scale = scale_vector
+        self.rotation = rotation_vector
 
     def serialize(self):
         """
@@ -44,111 +59,138 @@ class RectPrism:
     def __str__(self):
         return f"Location: <{self.scale}>, Rotation: <{self.rotation}>"
 
-    def sexual_mutation(self, other) -> object:
-        """
-        Create a new RectPrism by combining the genes of this
-        prism and another prism.
+    @classmethod
+    def from_member(cls, population: Population, index: int):
         """
-        scale = np.empty(3, dtype=float)
-        for i in range(scale.shape[0]):
-            scale[i] = np.random.choice([self.scale[i], other.scale[i]])
-        rotation = np.empty(3, dtype=float)
-        for i in range(rotation.shape[0]):
-            rotation[i] = np.random.choice([self.rotation[i], other.rotation[i]])
-        return RectPrism(scale, rotation)
-
-    def asexual_mutation(self, switch_chance=0.3, modify_chance=0.6):
+        Creates the RectPrism of a member of a population of prisms (see create_organisms).
         """
-        Create a new RectPrism by mutating the genes of this
-        prim.
-        """
-        scale = np.copy(self.scale)
-        rotation = np.copy(self.rotation)
-        attributes = [scale, rotation]
-        while random.random() < modify_chance:
-            # Multiply either scale or rotation by a random amount from 0.9 - 1.1.
-            attribute = attributes[np.random.randint(0, len(attributes) - 1)]
-            attribute[np.random.randint(0, 2)] *= np.random.rand() * 0.2 + 0.9
-        while random.random() < switch_chance:
-            # Switch the values of two attributes randomly.
-            attribute_1 = attributes[np.random.randint(0, len(attributes) - 1)]
-            index_1 = np.random.randint(0, 2)
-            attribute_2 = attributes[np.random.randint(0, len(attributes) - 1)]
-            index_2 = np.random.randint(0, 2)
-            temp = attribute_1[index_1]
-            attribute_1[index_1] = attribute_2[index_2]
-            attribute_2[index_2] = temp
-        return RectPrism(scale, rotation)
-
-
-def reproduction(scored_organisms: pd.DataFrame, new_population_count=None, sexual_to_asexual_percent=0.5):
-    """
-    Create a new mutated population, with successful prisms being more likely to reproduce.
-    """
-    scored_organisms = scored_organisms.sort_values("Score", ascending=False)
+        genome = population["Genome"][index]
+        return cls(genome[SCALE], genome[ROTATION])
 
-    if new_population_count is None:
-        new_population_count = scored_organisms.shape[0]
 
-    sexual_reproductions = int(new_population_count * sexual_to_asexual_percent)
-    asexual_reproductions = new_population_count - sexual_reproductions
-
-    new_organisms = pd.DataFrame(columns=["Creature", "Score"])
+def create_organisms(count: int) -> Population:
+    """
+    Creates a population of count random prisms.
+    """
+    organisms = Population(count, PRISM_COLUMNS)
+    organisms["Genome"][:, SCALE] = rng.random((count, 3))
+    organisms["Genome"][:, ROTATION] = rng.random((count, 3)) * 90
+    return organisms
 
-    np_last_organisms = scored_organisms["Creature"].to_numpy()
-    np_scores = scored_organisms["Score"].to_numpy()
-    success_probability_distribution = (np_scores / np.sum(np_scores)).astype(float)
 
-    sexual_pairs = numpy.random.choice(np_last_organisms, (sexual_reproductions, 2), p=success_probability_distribution)
-    asexual_individuals = numpy.random.choice(np_last_organisms, asexual_reproductions, p=success_probability_distribution)
+def reproduction(scored_organisms: Population, new_population_count=None, sexual_to_asexual_percent=0.5,
+                 switch_chance=0.3, modify_chance=0.6, surrogate: KNNSurrogate = None, oversample=1):
+    """
+    Create a new mutated population, with successful prisms being more likely to reproduce.
+    Sexual reproduction mixes the genes of two prisms. Asexual reproduction copies a prism, scales its mutable genes by
+    0.9 - 1.1 while a draw under modify_chance succeeds, then switches pairs of them while a draw under switch_chance
+    succeeds (see genetic_operators.reproduce).
+    With a surrogate, oversample times as many children are bred, and only the most promising of them according to the
+    surrogate are kept.
+    """
+    if new_population_count is None:
+        new_population_count = len(scored_organisms)
 
-    to_add = np.apply_along_axis(lambda row: [row[0].sexual_mutation(row[1]), 0], 1, sexual_pairs)
-    new_organisms = pd.concat([ new_organisms, pd.DataFrame(to_add, columns=["Creature", "Score"])])
+    candidate_count = new_population_count * (1 if surrogate is None else oversample)
+    children = reproduce(rng, scored_organisms["Genome"], scored_organisms.scores, candidate_count,
+                         sexual_to_asexual_percent, switch_chance, modify_chance, MUTABLE_GENES)
+    if not (surrogate is None):
+        children = children[surrogate.select(children, new_population_count)]
+    return Population.from_columns({"Genome": children})
 
-    RectPrism().asexual_mutation()
+#endregion
 
-    to_add = np.vectorize(lambda x: x.asexual_mutation())(asexual_individuals)
-    scores_to_add = np.zeros(asexual_reproductions)
-    new_organisms = pd.concat([ new_organisms, pd.DataFrame({"Creature": to_add, "Score": scores_to_add}, columns=["Creature", "Score"])])
+#region Running Simulation
+# The same keys as RectPrism.serialize.
+PRISM_ENCODER = SessionEncoder({"XScale": ("Genome", 0), "YScale": ("Genome", 1), "ZScale": ("Genome", 2),
+                                "XRot": ("Genome", 3), "YRot": ("Genome", 4), "ZRot": ("Genome", 5)})
 
-    return new_organisms.reset_index(drop=True)
+def serialize_organisms(organisms: Population) -> list:
+    return PRISM_ENCODER.encode(organisms)
 
-#endregion
 
-#region Running Simulation
-def execute_epoch(organisms, sim_inst: UnityInstance):
+def execute_epoch(organisms: Population, sim_inst: UnityInstance, cache: FitnessCache = None):
     """
     Simulate a population of rectangular prisms and record their scores.
+    With a cache, prisms with a cached score aren't simulated, identical prisms are only simulated once, and the new
+    scores are cached.
     """
+    metrics = sim_inst.get_metrics()
+    to_simulate = np.arange(len(organisms))
+    if not (cache is None):
+        keys = cache.get_keys(organisms["Genome"])
+        cached_scores = cache.lookup(keys)
+        missing = np.flatnonzero(np.isnan(cached_scores))
+        hits = np.flatnonzero(~np.isnan(cached_scores))
+        organisms.set_scores(hits, cached_scores[hits])
+        # The first prism with each missing key.
+        first_with_key = dict()
+        for i in missing.tolist():
+            first_with_key.setdefault(keys[i], i)
+        to_simulate = np.array(list(first_with_key.values()), dtype=int)
+        print(f"Fitness cache: {len(hits)} hits, {len(missing)} misses, {len(to_simulate)} prisms to simulate")
+
+    if len(to_simulate) > 0:
+        sim_inst.run_experiment("falling_rectangular_prism")
+        sim_inst.submit_sessions(serialize_organisms(organisms.take(to_simulate)))
 
-    serialize_v = np.vectorize(lambda c: json.dumps(c.serialize()))
+        # Only the scores are needed, so the messages are decoded without handlers.
+        decoder = MessageDecoder()
+        decoder.dispatch(sim_inst, dict())
 
-    serializations = serialize_v(organisms["Creature"].to_numpy())
+        score_indices, scores = decoder.get_scores()
+        organisms.set_scores(to_simulate[np.asarray(score_indices, dtype=int)], scores)
 
-    sim_inst.send_session_initialization_data(serializations)
-    sim_inst.end_send_session_initialization_data()
+    if not (cache is None) and len(to_simulate) > 0:
+        simulated_keys = [keys[i] for i in to_simulate]
+        cache.store(simulated_keys, organisms.scores[to_simulate])
+        # Give the duplicates of the simulated prisms their scores.
+        simulated_scores = dict(zip(simulated_keys, organisms.scores[to_simulate].tolist()))
+        organisms.set_scores(missing, [simulated_scores[keys[i]] for i in missing])
 
-    while True:
-        line = sim_inst.read_line()
+    print(f'Top Performers:\n{organisms.top(10).to_dataframe()}')
+    print(f"Pipe: {format_summary(diff_snapshots(metrics, sim_inst.get_metrics()))}")
 
-        if line is None:
-            break
+    return organisms.sorted()
 
-        line_split = line.split(" ")
 
-        if len(line_split) < 2:
-            continue
+def execute_steady_state(ga: SteadyStateGA, sim_inst: UnityInstance, session_count: int, chunk_size: int,
+                         on_scored=None):
+    """
+    Simulate session_count prisms bred by ga, adding each to ga as soon as it is scored.
+    Prisms are bred chunk_size at a time whenever an instance of sim_inst (a UnityInstancePool) has run its last chunk.
+    A simulator only starts the sessions of an experiment once they have all been sent, so each chunk is an experiment
+    that waits for its slowest session; the other instances keep running theirs meanwhile, which is why at least 2
+    instances are needed. on_scored(number of prisms scored) is called after each score.
+    """
+    # The genome of each session, by index.
+    genomes = []
+    scored_count = 0
 
-        index = int(line_split[0])
-        score = float(line_split[1])
+    def bred_sessions():
+        while len(genomes) < session_count:
+            children = ga.breed(min(chunk_size, session_count - len(genomes)))
+            genomes.extend(children)
+            yield from serialize_organisms(Population.from_columns({"Genome": children}))
 
-        organisms.loc[index, "Score"] = score
+    def on_score(message: Message):
+        nonlocal scored_count
+        ga.add_member(genomes[message.index], float(message.data))
+        scored_count += 1
+        if not (on_scored is None):
+            on_scored(scored_count)
 
-    sorted_organisms = organisms.sort_values("Score", ascending=False)
+    sim_inst.submit_sessions(bred_sessions(), chunk_size)
+    MessageDecoder().dispatch(sim_inst, {MessageType.SCORE: on_score})
 
-    print(f'Top Performers:\n{sorted_organisms.head(10)}')
 
-    return sorted_organisms
+def print_idle_time(sim_inst: UnityInstance, duration: float):
+    """
+    Print how long the simulators weren't running an experiment over the last duration seconds.
+    """
+    total_time = sim_inst.get_instance_count() * duration
+    idle_time = total_time - sim_inst.get_experiment_time()
+    print(f"Simulators idle for {idle_time:.2f}s of {total_time:.2f}s ({100 * idle_time / total_time:.1f}%)")
 
 
 def display_performers(best_performers):
@@ -187,16 +229,43 @@ if __name__ == "__main__":
     parser.add_argument("-e", help="number of epochs that should be run.", type=int, default=10)
     parser.add_argument("-display", help="if this flag is passed, display the best performers.", action="store_true")
     parser.add_argument("-stats", help="what types of statistics to show.", type=int, default=0)
+    parser.add_argument("-instances", help="number of simulator instances to split the sessions across.", type=int, default=1)
+    parser.add_argument("-steady", help="if this flag is passed, evolve without generations after the first epoch: each "
+                        "prism replaces one of the population once scored, and new prisms are bred whenever an "
+                        "instance has run its last chunk. Needs at least 2 instances, and can't be used with -cache or "
+                        "-surrogate.", action="store_true")
+    parser.add_argument("-chunk", help="number of prisms bred and run at once by an instance with -steady.", type=int,
+                        default=16)
+    parser.add_argument("-tournament", help="number of prisms competing to be each parent with -steady.", type=int,
+                        default=3)
+    parser.add_argument("-replacement", help="which prism of the population a scored prism replaces with -steady.",
+                        choices=REPLACEMENT_POLICIES, default=REPLACE_WORST)
+    parser.add_argument("-surrogate", help="if more than 1, breed this many times as many prisms as are simulated, and "
+                        "only simulate those a model of the scores seen so far finds most promising.", type=int,
+                        default=1)
+    parser.add_argument("-explore", help="with -surrogate, how much prisms far from those simulated so far are favoured.",
+                        type=float, default=1.0)
+    parser.add_argument("-metrics", help="file to export the metrics of the simulator instances to periodically (Prometheus text format if it ends with .prom, json lines otherwise).", type=str, default=None)
+    parser.add_argument("-metrics_interval", help="seconds between exports of the metrics with -metrics.", type=float, default=10.0)
+    parser.add_argument("-cache", help="sqlite database to cache the scores of prisms in, so prisms already simulated "
+                        "by this build (in this run or an earlier one) aren't simulated again.", type=str, default=None)
     args = parser.parse_args()
     RUN_EXECUTABLE = args.t
     EPOCH_COUNT = args.e
     DISPLAY_BEST_PERFORMERS = args.display
     STATS = args.stats
+    INSTANCE_COUNT = args.instances
+    STEADY_STATE = args.steady
+
+    if STEADY_STATE:
+        # Each chunk waits for its slowest session, so a single instance would be idle at the end of every chunk.
+        if INSTANCE_COUNT < 2:
+            raise Exception("-steady needs at least 2 instances.")
+        if not (args.cache is None) or args.surrogate > 1:
+            raise Exception("-cache and -surrogate can't be used with -steady.")
 
     # Create an initial population
-    organisms = pd.DataFrame(columns=["Creature", "Score"])
-    for i in range(64):
-        organisms.loc[len(organisms.index)] = [RectPrism(), 0]
+    organisms = create_organisms(64)
 
     if DISPLAY_BEST_PERFORMERS:
         best_performers = []
@@ -209,21 +278,67 @@ if __name__ == "__main__":
     exec_args = dict()
     exec_args["simulator_path"] = SIMULATOR_PATH
     exec_args["simulator_args"] = SIMULATOR_ARGS
-    sim_inst = UnityInstance(os.path.join(PIPE_PATH, PIPE_NAME), exec_args if RUN_EXECUTABLE else None)
+    sim_inst = create_simulator(PIPE_PATH, PIPE_NAME, exec_args if RUN_EXECUTABLE else None, INSTANCE_COUNT)
 
-    for i in range(EPOCH_COUNT):
-        print(f"\nEpoch {i + 1}")
-        sim_inst.run_experiment("falling_rectangular_prism")
-        organisms = execute_epoch(organisms, sim_inst)
+    exporter = None
+    if not (args.metrics is None):
+        exporter = MetricsExporter(sim_inst, args.metrics, args.metrics_interval)
+        exporter.start()
+
+    cache = None
+    if not (args.cache is None):
+        # Scores from the editor are kept apart from those of builds.
+        cache = FitnessCache("falling_rectangular_prism", get_build_id(SIMULATOR_PATH) if RUN_EXECUTABLE else "editor",
+                             args.cache)
+
+    def record_epoch(organisms: Population):
         if DISPLAY_BEST_PERFORMERS:
-            best_performers.append(organisms.head(1)["Creature"].iloc[0])
+            best_performers.append(RectPrism.from_member(organisms, 0))
         if STATS > 0:
-            avg_performance_per_epoch.append(np.mean(organisms["Score"]))
+            avg_performance_per_epoch.append(np.mean(organisms.scores))
         if STATS > 1:
-            best_performers_scores.append(np.mean(organisms.head(10)["Score"]))
-        organisms = reproduction(organisms)
+            best_performers_scores.append(np.mean(organisms.scores[:10]))
+
+    surrogate = None
+    if args.surrogate > 1:
+        surrogate = KNNSurrogate(exploration=args.explore)
+
+    start = time.perf_counter()
+    for i in range(1 if STEADY_STATE else EPOCH_COUNT):
+        print(f"\nEpoch {i + 1}")
+        organisms = execute_epoch(organisms, sim_inst, cache)
+        record_epoch(organisms)
+        if not STEADY_STATE:
+            if not (surrogate is None):
+                surrogate.add(organisms["Genome"], organisms.scores)
+            organisms = reproduction(organisms, surrogate=surrogate, oversample=args.surrogate)
+
+    if STEADY_STATE and EPOCH_COUNT > 1:
+        ga = SteadyStateGA(rng, organisms, args.tournament, args.replacement, mutable_genes=MUTABLE_GENES)
+
+        epoch_metrics = sim_inst.get_metrics()
+
+        def on_scored(scored_count: int):
+            global epoch_metrics
+            # An epoch is as many scores as there are prisms in the population.
+            if scored_count % len(organisms) == 0:
+                epoch_organisms = ga.get_best(len(organisms))
+                print(f"\nEpoch {scored_count // len(organisms) + 1}")
+                print(f'Top Performers:\n{epoch_organisms.top(10).to_dataframe()}')
+                metrics = sim_inst.get_metrics()
+                print(f"Pipe: {format_summary(diff_snapshots(epoch_metrics, metrics))}")
+                epoch_metrics = metrics
+                record_epoch(epoch_organisms)
+
+        sim_inst.run_experiment("falling_rectangular_prism")
+        execute_steady_state(ga, sim_inst, (EPOCH_COUNT - 1) * len(organisms), args.chunk, on_scored)
 
+    print_idle_time(sim_inst, time.perf_counter() - start)
+    if not (exporter is None):
+        exporter.stop()
     sim_inst.quit()
+    if not (cache is None):
+        cache.close()
 
     if DISPLAY_BEST_PERFORMERS:
         display_performers(best_performers)
@@ -240,7 +355,3 @@ if __name__ == "__main__":
         ax.grid()
 
         plt.show()
-
-
-
-
@@ -0,0 +1,145 @@
+"""
+@author William Erignac
+@version 2026-10-16
+
+This script contains the FitnessCache, which remembers the scores of genomes for experiments whose simulations are
+deterministic (e.g. the falling prism), so genomes that were already simulated (elites, duplicate children, or members
+of an earlier run) don't have to be simulated again.
+
+Genomes are keyed by their quantized values: by default, the float32 values the simulator reads them as, so two genomes
+share a score only if the simulator can't tell them apart. Keys are scoped to an experiment and a build of the
+simulator. Recently used scores are kept in memory (least recently used first out), and every score is also written
+to an sqlite database when a path is given, so later runs start with the scores of earlier ones.
+"""
+
+import os
+import sqlite3
+from collections import OrderedDict
+
+import numpy as np
+
+# Maximum number of keys looked up in the database per query (sqlite limits the parameters of a statement).
+_QUERY_SIZE = 500
+
+
+def get_build_id(simulator_path: str) -> str:
+    """
+    Returns an id for the build of the simulator at simulator_path, which changes whenever the build is replaced.
+    """
+    if simulator_path is None or not os.path.exists(simulator_path):
+        return ""
+    stat = os.stat(simulator_path)
+    return f"{os.path.abspath(simulator_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class FitnessCache:
+    """
+    The scores of genomes simulated by an experiment, in memory and optionally on disk.
+    """
+    def __init__(self, experiment_name: str, build_id: str = "", path: str = None, capacity: int = 1000000,
+                 resolution: float = None):
+        """
+        build_id = id of the simulator's build (see get_build_id). Scores of other builds aren't used.
+        path = sqlite database to keep the scores in (created if needed). None to only keep them in memory.
+        capacity = maximum number of scores kept in memory.
+        resolution = if not None, genomes are rounded to multiples of resolution instead of to float32, so genomes
+        closer than resolution can share a score.
+        """
+        self.experiment_name = experiment_name
+        self.build_id = build_id
+        self.capacity = capacity
+        self.resolution = resolution
+
+        # Key -> score, from the least to the most recently used.
+        self._scores = OrderedDict()
+
+        self._database = None
+        if not (path is None):
+            self._database = sqlite3.connect(path)
+            self._database.execute("CREATE TABLE IF NOT EXISTS scores (experiment TEXT, build TEXT, genome BLOB, "
+                                   "score REAL, PRIMARY KEY (experiment, build, genome))")
+            self._database.commit()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get_keys(self, genomes: np.ndarray) -> list:
+        """
+        Returns the key of each row of genomes (a (members, genes) array).
+        """
+        if self.resolution is None:
+            quantized = np.ascontiguousarray(genomes, dtype=np.float32)
+        else:
+            quantized = np.ascontiguousarray(np.round(genomes / self.resolution), dtype=np.int64)
+        return quantized.view(np.dtype((np.void, quantized.shape[1] * quantized.itemsize))).ravel().tolist()
+
+    def lookup(self, keys: list) -> np.ndarray:
+        """
+        Returns the score of each key, or NaN for keys that aren't cached.
+        """
+        scores = np.full(len(keys), np.nan)
+        missing = []
+        for i, key in enumerate(keys):
+            score = self._scores.get(key)
+            if score is None:
+                missing.append(i)
+            else:
+                self._scores.move_to_end(key)
+                scores[i] = score
+
+        if len(missing) > 0 and not (self._database is None):
+            stored = self._load([keys[i] for i in missing])
+            for i in missing:
+                score = stored.get(keys[i])
+                if not (score is None):
+                    self._remember(keys[i], score)
+                    scores[i] = score
+
+        hits = int(np.count_nonzero(~np.isnan(scores)))
+        self.hits += hits
+        self.misses += len(keys) - hits
+        return scores
+
+    def store(self, keys: list, scores):
+        """
+        Caches the score of each key.
+        """
+        scores = np.asarray(scores, dtype=np.float64).tolist()
+        for key, score in zip(keys, scores):
+            self._remember(key, score)
+
+        if not (self._database is None):
+            self._database.executemany("INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?)",
+                                       [(self.experiment_name, self.build_id, bytes(key), score)
+                                        for key, score in zip(keys, scores)])
+            self._database.commit()
+
+    def get_stats(self) -> dict:
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "in_memory": len(self._scores)}
+
+    def close(self):
+        if not (self._database is None):
+            self._database.close()
+            self._database = None
+
+    def _remember(self, key, score: float):
+        self._scores[key] = score
+        self._scores.move_to_end(key)
+        if len(self._scores) > self.capacity:
+            self._scores.popitem(last=False)
+
+    def _load(self, keys: list) -> dict:
+        """
+        Returns the scores stored in the database for keys (only those that are stored).
+        """
+        stored = dict()
+        for start in range(0, len(keys), _QUERY_SIZE):
+            chunk = keys[start:start + _QUERY_SIZE]
+            rows = self._database.execute(
+                f"SELECT genome, score FROM scores WHERE experiment = ? AND build = ? AND genome IN "
+                f"({', '.join('?' * len(chunk))})",
+                [self.experiment_name, self.build_id] + [bytes(key) for key in chunk])
+            stored.update(rows)
+        return stored
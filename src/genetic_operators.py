@@ -0,0 +1,97 @@
+"""
+@author William Erignac
+@version 2026-10-16
+
+This script contains genetic operators that work on a whole population at once. The genomes of a population are the
+rows of a (members, genes) float array, and each operator is a few array operations on a np.random.Generator instead of
+a loop over members.
+"""
+
+import numpy as np
+
+
+def select_proportional(rng: np.random.Generator, scores: np.ndarray, shape) -> np.ndarray:
+    """
+    Returns an array of the given shape of member indices, each picked with a probability proportional to the
+    member's score.
+    """
+    # Inverse transform sampling on the cumulative scores (like rng.choice with p). The draws are looked up in sorted
+    # order, which is much faster on large populations, and the picks are then shuffled back into a random order.
+    cumulative_scores = np.cumsum(scores)
+    draws = np.sort(rng.random(np.prod(shape, dtype=int))) * cumulative_scores[-1]
+    picks = np.minimum(np.searchsorted(cumulative_scores, draws, side="right"), len(scores) - 1)
+    return rng.permutation(picks).reshape(shape)
+
+
+def select_tournament(rng: np.random.Generator, scores: np.ndarray, shape, size: int = 3) -> np.ndarray:
+    """
+    Returns an array of the given shape of member indices, each the best of size members picked uniformly (with
+    replacement). Unlike select_proportional, only the order of the scores matters, so they can be negative.
+    """
+    count = np.prod(shape, dtype=int)
+    entrants = rng.integers(0, len(scores), (count, size))
+    winners = entrants[np.arange(count), np.argmax(scores[entrants], axis=1)]
+    return winners.reshape(shape)
+
+
+def uniform_crossover(rng: np.random.Generator, first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """
+    Returns one child per row of first and second, each gene of which is taken from either parent with equal chance.
+    """
+    return np.where(rng.random(first.shape) < 0.5, first, second)
+
+
+def multiplicative_mutation(rng: np.random.Generator, genomes: np.ndarray, modify_chance: float, genes: np.ndarray,
+                            low: float = 0.9, high: float = 1.1):
+    """
+    Mutates genomes in place. Each genome is modified k times with probability modify_chance^k * (1 - modify_chance)
+    (as many times as a draw under modify_chance succeeds in a row), and each modification multiplies one of genes,
+    picked uniformly, by a factor between low and high.
+    """
+    counts = rng.geometric(1 - modify_chance, len(genomes)) - 1
+    rows = np.repeat(np.arange(len(genomes)), counts)
+    # multiply.at applies every factor, even when a gene is picked more than once for the same genome.
+    np.multiply.at(genomes, (rows, rng.choice(genes, len(rows))), rng.uniform(low, high, len(rows)))
+
+
+def swap_mutation(rng: np.random.Generator, genomes: np.ndarray, switch_chance: float, genes: np.ndarray):
+    """
+    Mutates genomes in place. Each genome has k swaps with probability switch_chance^k * (1 - switch_chance), and each
+    swap exchanges the values of two of genes, each picked uniformly (possibly the same gene).
+    """
+    counts = rng.geometric(1 - switch_chance, len(genomes)) - 1
+    rows = np.arange(len(genomes))
+    # Swaps don't commute, so they are done in rounds: the i-th swap of every genome that has one at once.
+    for swap in range(counts.max(initial=0)):
+        rows = rows[counts[rows] > swap]
+        first = rng.choice(genes, len(rows))
+        second = rng.choice(genes, len(rows))
+        first_values = genomes[rows, first]
+        genomes[rows, first] = genomes[rows, second]
+        genomes[rows, second] = first_values
+
+
+def reproduce(rng: np.random.Generator, genomes: np.ndarray, scores: np.ndarray, count: int,
+              sexual_to_asexual_percent: float = 0.5, switch_chance: float = 0.3, modify_chance: float = 0.6,
+              mutable_genes: np.ndarray = None, select=select_proportional) -> np.ndarray:
+    """
+    Returns the genomes of count children, with members with higher scores being more likely to reproduce: parents are
+    picked with select(rng, scores, shape) (e.g. select_proportional, or a partial of select_tournament).
+    The first sexual_to_asexual_percent of the children mix the genes of two members (uniform crossover). The rest copy
+    one member and mutate its mutable_genes (all genes if None): multiplicative_mutation, then swap_mutation.
+    """
+    if mutable_genes is None:
+        mutable_genes = np.arange(genomes.shape[1])
+
+    sexual_reproductions = int(count * sexual_to_asexual_percent)
+    asexual_reproductions = count - sexual_reproductions
+
+    sexual_pairs = select(rng, scores, (sexual_reproductions, 2))
+    asexual_individuals = select(rng, scores, asexual_reproductions)
+
+    sexual_children = uniform_crossover(rng, genomes[sexual_pairs[:, 0]], genomes[sexual_pairs[:, 1]])
+    asexual_children = genomes[asexual_individuals]
+    multiplicative_mutation(rng, asexual_children, modify_chance, mutable_genes)
+    swap_mutation(rng, asexual_children, switch_chance, mutable_genes)
+
+    return np.concatenate((sexual_children, asexual_children))
@@ -0,0 +1,245 @@
+"""
+@author William Erignac
+@version 2026-10-16
+
+This script contains the runtime metrics of UnityInstance: counters of what crossed the pipe, histograms of how long
+read_line callers waited for the simulator and how long writes took, and gauges of the read buffer and the running
+sessions. They are updated by the threads already holding the lock that protects what they measure (the read thread
+and read_line under the read lock, writes under the writer's lock), so they add no locking to the hot path.
+
+UnityInstance.get_metrics returns a snapshot (a dict) of an instance's metrics. Snapshots can be merged (e.g. over the
+instances of a pool), subtracted to get what happened between two of them (e.g. during an epoch, see format_summary),
+and exported periodically to a Prometheus textfile or a file of json lines with a MetricsExporter.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+
+# Upper bounds (in seconds) of the buckets of a Histogram: powers of 2 from about 1 microsecond to 64 seconds.
+HISTOGRAM_BOUNDS = tuple(2.0 ** exponent for exponent in range(-20, 7)) + (math.inf,)
+_SMALLEST_EXPONENT = -20
+
+# The metrics of a snapshot: counters only increase, gauges are a current value, and histograms are dicts of the
+# count, sum and bucket counts of their observations.
+COUNTERS = ("bytes_in", "messages_in", "warnings", "sessions_started", "sessions_scored", "lines_out", "bytes_out",
+            "write_calls", "flush_calls")
+GAUGES = ("live_sessions", "read_buffer_depth", "max_read_buffer_depth")
+HISTOGRAMS = ("read_wait", "write_call")
+
+
+class Histogram:
+    """
+    Counts observations of durations in buckets of HISTOGRAM_BOUNDS.
+    """
+    def __init__(self):
+        self.counts = [0] * len(HISTOGRAM_BOUNDS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        # The bucket of the smallest bound >= seconds. frexp gives seconds = mantissa * 2^exponent with mantissa in
+        # [0.5, 1), so the bound is 2^exponent, or 2^(exponent - 1) when seconds is exactly that power of 2.
+        if seconds <= 0:
+            bucket = 0
+        else:
+            mantissa, exponent = math.frexp(seconds)
+            if mantissa == 0.5:
+                exponent -= 1
+            bucket = min(max(exponent - _SMALLEST_EXPONENT, 0), len(self.counts) - 1)
+        self.counts[bucket] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def get_snapshot(self) -> dict:
+        return {"count": self.count, "sum": self.sum, "counts": list(self.counts)}
+
+
+class InstanceMetrics:
+    """
+    The metrics updated by a UnityInstance, its tasks and its LineWriter. The lines, writes and flushes sent are
+    counted by the LineWriter itself (see UnityInstance.get_metrics).
+    """
+    def __init__(self):
+        self.bytes_in = 0
+        # Lines and records added to the read buffer (not warnings, END and QUIT).
+        self.messages_in = 0
+        # Warnings from the simulator, and lines dropped because they were read after the end of a task.
+        self.warnings = 0
+        self.sessions_started = 0
+        self.sessions_scored = 0
+        self.max_read_buffer_depth = 0
+        self.bytes_out = 0
+
+        # Time read_line callers waited for the simulator (calls that found a line in the buffer aren't counted).
+        self.read_wait = Histogram()
+        # Time taken by each write to the transport.
+        self.write_call = Histogram()
+
+    def get_snapshot(self, read_buffer_depth: int = 0) -> dict:
+        """
+        Returns the current value of the metrics. read_buffer_depth = number of messages in the read buffer now.
+        """
+        return {"bytes_in": self.bytes_in,
+                "messages_in": self.messages_in,
+                "warnings": self.warnings,
+                "sessions_started": self.sessions_started,
+                "sessions_scored": self.sessions_scored,
+                "bytes_out": self.bytes_out,
+                "live_sessions": self.sessions_started - self.sessions_scored,
+                "read_buffer_depth": read_buffer_depth,
+                "max_read_buffer_depth": self.max_read_buffer_depth,
+                "read_wait": self.read_wait.get_snapshot(),
+                "write_call": self.write_call.get_snapshot()}
+
+
+def histogram_quantile(histogram: dict, quantile: float) -> float:
+    """
+    Returns the upper bound of the bucket holding the given quantile of a histogram snapshot (0 if it is empty).
+    """
+    target = quantile * histogram["count"]
+    seen = 0
+    for bound, count in zip(HISTOGRAM_BOUNDS, histogram["counts"]):
+        seen += count
+        if seen >= target and seen > 0:
+            return bound
+    return 0.0
+
+
+def merge_snapshots(snapshots: list) -> dict:
+    """
+    Combines the snapshots of several instances: counters, gauges and histograms are summed, except for the maximum
+    read buffer depth.
+    """
+    merged = dict()
+    for snapshot in snapshots:
+        for name, value in snapshot.items():
+            if not (name in merged):
+                merged[name] = value
+            elif name in HISTOGRAMS:
+                merged[name] = _combine_histograms(merged[name], value, 1)
+            elif name.startswith("max_"):
+                merged[name] = max(merged[name], value)
+            else:
+                merged[name] = merged[name] + value
+    return merged
+
+
+def diff_snapshots(before: dict, after: dict) -> dict:
+    """
+    Returns what happened between two snapshots of the same instance(s): counters and histograms are subtracted, and
+    gauges are those of after.
+    """
+    difference = dict()
+    for name, value in after.items():
+        if name in HISTOGRAMS:
+            difference[name] = _combine_histograms(value, before[name], -1)
+        elif name in COUNTERS:
+            difference[name] = value - before[name]
+        else:
+            difference[name] = value
+    return difference
+
+
+def format_summary(snapshot: dict) -> str:
+    """
+    Describes a snapshot (e.g. the difference of the snapshots at the start and end of an epoch) in one line.
+    """
+    read_wait = snapshot["read_wait"]
+    write_call = snapshot["write_call"]
+    return (f"{snapshot['messages_in']} messages in ({snapshot['bytes_in'] / 1e6:.2f} MB), "
+            f"{snapshot['lines_out']} out ({snapshot['bytes_out'] / 1e6:.2f} MB) in {snapshot['write_calls']} writes "
+            f"and {snapshot['flush_calls']} flushes, {snapshot['warnings']} warnings; "
+            f"waited {read_wait['sum']:.2f}s for {read_wait['count']} reads "
+            f"(p50 {histogram_quantile(read_wait, 0.5) * 1e3:.3f} ms, "
+            f"p99 {histogram_quantile(read_wait, 0.99) * 1e3:.3f} ms); "
+            f"write p99 {histogram_quantile(write_call, 0.99) * 1e3:.3f} ms; "
+            f"max read buffer depth {snapshot['max_read_buffer_depth']}")
+
+
+def to_prometheus(snapshots: list, prefix: str = "unity_instance") -> str:
+    """
+    Formats the snapshot of each instance in the Prometheus text format, labelled with the instance's position.
+    """
+    lines = []
+    for name in COUNTERS + GAUGES + HISTOGRAMS:
+        if name in COUNTERS:
+            metric = f"{prefix}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+        elif name in GAUGES:
+            metric = f"{prefix}_{name}"
+            lines.append(f"# TYPE {metric} gauge")
+        else:
+            metric = f"{prefix}_{name}_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+
+        for instance, snapshot in enumerate(snapshots):
+            label = f'instance="{instance}"'
+            if not (name in HISTOGRAMS):
+                lines.append(f"{metric}{{{label}}} {snapshot[name]}")
+                continue
+
+            histogram = snapshot[name]
+            cumulative = 0
+            for bound, count in zip(HISTOGRAM_BOUNDS, histogram["counts"]):
+                cumulative += count
+                le = "+Inf" if math.isinf(bound) else repr(bound)
+                lines.append(f'{metric}_bucket{{{label},le="{le}"}} {cumulative}')
+            lines.append(f"{metric}_sum{{{label}}} {histogram['sum']}")
+            lines.append(f"{metric}_count{{{label}}} {histogram['count']}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """
+    Writes the metrics of a UnityInstance or UnityInstancePool to a file every interval seconds, from a thread.
+    """
+    def __init__(self, sim_inst, path: str, interval: float = 10.0, prometheus: bool = None):
+        """
+        sim_inst = the UnityInstance or UnityInstancePool whose metrics are exported (see get_instance_metrics).
+        path = file to export to.
+        prometheus = if True, replace the file with the metrics in the Prometheus text format each time (e.g. for the
+        textfile collector of node_exporter). Otherwise, append them as a json line. Defaults to True for .prom files.
+        """
+        self.sim_inst = sim_inst
+        self.path = path
+        self.interval = interval
+        self.prometheus = path.endswith(".prom") if prometheus is None else prometheus
+
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops the exporter thread, and exports the final metrics.
+        """
+        self._stopped.set()
+        self._thread.join()
+        self.export()
+
+    def export(self):
+        snapshots = self.sim_inst.get_instance_metrics()
+        if self.prometheus:
+            # Replaced at once, so the file is never read half written.
+            temporary_path = f"{self.path}.tmp"
+            with open(temporary_path, "w") as file:
+                file.write(to_prometheus(snapshots))
+            os.replace(temporary_path, self.path)
+        else:
+            with open(self.path, "a") as file:
+                file.write(json.dumps({"time": time.time(), "instances": snapshots}) + "\n")
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.export()
+
+
+def _combine_histograms(first: dict, second: dict, sign: int) -> dict:
+    return {"count": first["count"] + sign * second["count"],
+            "sum": first["sum"] + sign * second["sum"],
+            "counts": [a + sign * b for a, b in zip(first["counts"], second["counts"])]}
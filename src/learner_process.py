@@ -0,0 +1,260 @@
+"""
+@author William Erignac
+@version 2026-10-16
+
+This script contains the LearnerProcess, which performs the REINFORCE updates of a training script in another
+process, so the thread reading the simulator's pipe only chooses actions and is never held up by backpropagation
+(while it is, the frames of every other running session wait, and so does the simulator's physics step).
+
+The training script (the actor) queues the finished episodes, one batch per update (so each update costs a single
+message), and the learner process trains on them with a ReinforceLearner of its own. After each update, the learner publishes its parameters in shared memory, and the actor
+copies them into its model at the next physics step (see sync). The actor's policy is therefore a few updates behind
+the learner's: each episode records the version of the parameters it ended with, so the learner reports how many
+updates old the episodes it trains on are (their staleness).
+
+Shared memory layout: an int64 version (odd while the learner is writing), then the parameters as float32.
+"""
+
+import multiprocessing
+import queue
+import time
+import traceback
+from multiprocessing import shared_memory
+
+import numpy as np
+import torch
+
+from tracing import TRACER
+
+# Sent to the learner process to make it train on the episodes it has (see flush).
+_FLUSH = "flush"
+_VERSION_SIZE = 8
+
+
+class LearnerProcess:
+    """
+    A learner running in another process, used like a ReinforceLearner by the actor.
+    """
+    def __init__(self, model: torch.nn.Module, create_learner, episodes_per_update: int = 16,
+                 per_episode: bool = False, max_queued_episodes: int = 256):
+        """
+        model = the actor's policy network. Its parameters are replaced by the learner's at each sync.
+        create_learner = function (picklable, e.g. defined at the top level of the training script) creating the
+        ReinforceLearner to train with in the learner process. The parameters of its model are set to those of model.
+        episodes_per_update, per_episode = settings of that ReinforceLearner.
+        max_queued_episodes = number of episodes the learner can fall behind by before add_episode waits for it,
+        which bounds the staleness of the episodes.
+        """
+        self.model = model
+        self.version = 0
+        # Episodes are sent in batches of this many (one per update).
+        self.episodes_per_batch = 1 if per_episode else episodes_per_update
+        # The episodes not sent yet, as (version, states, actions, rewards).
+        self._batch = []
+
+        parameters = torch.nn.utils.parameters_to_vector(model.parameters()).detach().numpy()
+        self._memory = shared_memory.SharedMemory(create=True, size=_VERSION_SIZE + parameters.nbytes)
+        self._version = np.ndarray((1,), dtype=np.int64, buffer=self._memory.buf)
+        self._parameters = np.ndarray(parameters.shape, dtype=np.float32, buffer=self._memory.buf,
+                                      offset=_VERSION_SIZE)
+        self._version[0] = 0
+        self._parameters[:] = parameters
+
+        # Spawned, as forking a process using torch's threads can deadlock.
+        context = multiprocessing.get_context("spawn")
+        self._episodes = context.Queue(max(1, max_queued_episodes // self.episodes_per_batch))
+        self._results = context.Queue()
+        self._process = context.Process(target=_run_learner, daemon=True,
+                                        args=(create_learner, self._memory.name, len(parameters), self._episodes,
+                                              self._results, episodes_per_update, per_episode))
+        self._process.start()
+        # Wait for the learner to be created, so errors creating it are raised here.
+        result = self._get_result()
+        if isinstance(result, str):
+            self._release_memory()
+            raise Exception(f"The learner process failed:\n{result}")
+
+        self.episodes_added = 0
+        self.syncs = 0
+        self.sync_time = 0.0
+        # Time add_episode waited for the learner to catch up.
+        self.queue_wait_time = 0.0
+        self._stats = None
+
+    def add_episode(self, states, actions, rewards):
+        """
+        Queues a finished episode for the learner (see ReinforceLearner.add_episode). The arrays are copied, so
+        views (e.g. of a TrajectoryStore) can be reused right away.
+        """
+        if len(rewards) == 0:
+            return
+
+        self.episodes_added += 1
+        self._batch.append((self.version, np.array(states, dtype=np.float32), np.array(actions),
+                            np.array(rewards, dtype=np.float32)))
+        if len(self._batch) >= self.episodes_per_batch:
+            self._send_batch()
+
+    def flush(self):
+        """
+        Makes the learner train on the episodes it has, without waiting for it. Call at the end of an epoch.
+        """
+        self._send_batch()
+        self._put(_FLUSH)
+
+    def sync(self) -> bool:
+        """
+        Copies the learner's latest parameters into the model, if they changed. Call between physics steps, when no
+        inference is running. Returns whether the parameters were updated.
+        """
+        if self._memory is None:
+            return False
+        version = int(self._version[0])
+        # Unchanged, or being written.
+        if version == 2 * self.version or version % 2 == 1:
+            return False
+
+        start = time.perf_counter()
+        parameters = self._parameters.copy()
+        if int(self._version[0]) != version:
+            # Written again while copying; the next sync gets them.
+            return False
+        with torch.no_grad():
+            torch.nn.utils.vector_to_parameters(torch.from_numpy(parameters), self.model.parameters())
+        self.version = version // 2
+        self.syncs += 1
+        end = time.perf_counter()
+        self.sync_time += end - start
+        TRACER.complete("sync_parameters", start, end, version=self.version)
+        return True
+
+    def close(self):
+        """
+        Waits for the learner to train on every episode queued, loads its final parameters into the model and stops
+        the learner process. The process isn't waited for once it has sent its stats: it has nothing left to do, and
+        shutting its interpreter down (torch included) takes about a second.
+        """
+        if self._stats is None and not (self._memory is None):
+            self._send_batch()
+            self._put(None)
+            result = self._get_result()
+            if isinstance(result, str):
+                self._release_memory()
+                raise Exception(f"The learner process failed:\n{result}")
+            self._stats = result
+            self.sync()
+            self._release_memory()
+
+    def get_stats(self) -> dict:
+        """
+        Returns the actor's counters, and once closed, those of the learner: its ReinforceLearner's stats and the mean
+        and maximum staleness (in updates) of the episodes it trained on.
+        """
+        stats = {"episodes": self.episodes_added,
+                 "syncs": self.syncs,
+                 "version": self.version,
+                 "sync_time": self.sync_time,
+                 "queue_wait_time": self.queue_wait_time}
+        if not (self._stats is None):
+            stats.update(self._stats)
+        return stats
+
+    def _send_batch(self):
+        if len(self._batch) > 0:
+            self._put(self._batch)
+            self._batch = []
+
+    def _put(self, item):
+        start = time.perf_counter()
+        while True:
+            try:
+                self._episodes.put(item, timeout=1.0)
+                break
+            except queue.Full:
+                if not self._process.is_alive():
+                    raise Exception("The learner process stopped.")
+        self.queue_wait_time += time.perf_counter() - start
+
+    def _get_result(self):
+        """
+        Waits for the next result of the learner process: True once it is ready, its stats once it has finished, or
+        the traceback of an exception.
+        """
+        while True:
+            try:
+                return self._results.get(timeout=1.0)
+            except queue.Empty:
+                if not self._process.is_alive():
+                    self._release_memory()
+                    raise Exception("The learner process stopped.")
+
+    def _release_memory(self):
+        if self._memory is None:
+            return
+        # The arrays must not be used after the memory is closed.
+        del self._version, self._parameters
+        self._memory.close()
+        self._memory.unlink()
+        self._memory = None
+
+
+def _run_learner(create_learner, memory_name: str, parameter_count: int, episodes, results, episodes_per_update: int,
+                 per_episode: bool):
+    """
+    Runs in the learner process: trains on the episodes queued until None is received, publishing the parameters
+    after each update.
+    """
+    memory = shared_memory.SharedMemory(name=memory_name)
+    version = np.ndarray((1,), dtype=np.int64, buffer=memory.buf)
+    parameters = np.ndarray((parameter_count,), dtype=np.float32, buffer=memory.buf, offset=_VERSION_SIZE)
+    try:
+        # The network is small, so more threads would only compete with the actor for the cores.
+        torch.set_num_threads(1)
+        learner = create_learner()
+        learner.episodes_per_update = episodes_per_update
+        learner.per_episode = per_episode
+        with torch.no_grad():
+            torch.nn.utils.vector_to_parameters(torch.from_numpy(parameters.copy()), learner.model.parameters())
+        results.put(True)
+
+        # The version the actor had when each episode not trained on yet ended.
+        pending_versions = []
+        staleness = []
+
+        def publish(updates_before: int):
+            if learner.updates == updates_before:
+                return
+            # Every pending episode was used by the updates, made with the parameters of version updates_before.
+            staleness.extend(updates_before - episode_version for episode_version in pending_versions)
+            pending_versions.clear()
+            version[0] = 2 * learner.updates - 1
+            parameters[:] = torch.nn.utils.parameters_to_vector(learner.model.parameters()).detach().numpy()
+            version[0] = 2 * learner.updates
+
+        while True:
+            item = episodes.get()
+            if item is None:
+                break
+
+            updates_before = learner.updates
+            if isinstance(item, str):
+                learner.flush()
+            else:
+                for episode_version, states, actions, rewards in item:
+                    pending_versions.append(episode_version)
+                    learner.add_episode(states, actions, rewards)
+            publish(updates_before)
+
+        updates_before = learner.updates
+        learner.flush()
+        publish(updates_before)
+
+        stats = learner.get_stats()
+        stats["mean_staleness"] = float(np.mean(staleness)) if len(staleness) > 0 else 0.0
+        stats["max_staleness"] = max(staleness, default=0)
+        results.put(stats)
+    except Exception:
+        results.put(traceback.format_exc())
+    finally:
+        del version, parameters
+        memory.close()
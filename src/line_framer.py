@@ -0,0 +1,111 @@
+"""
+@author William Erignac
+@version 2026-10-16
+
+This script contains the LineFramer, which splits the bytes read from a transport into lines.
+Bytes are read straight into one reusable buffer, delimiters are searched for in place, and only completed lines are
+decoded (all of those read by one call to read_into at once).
+The framer can also split the buffer into the records of the binary protocol (see binary_protocol), and switch
+between lines and records from one message to the next.
+"""
+
+from binary_protocol import RECORD_HEADER, MessageType, Record
+from pipe_transport import PIPE_BUFFER_SIZE
+
+
+class LineFramer:
+    """
+    A reusable read buffer that yields complete lines.
+
+    Usage:
+        bytes_read = transport.read_into(framer.get_read_view())
+        framer.commit(bytes_read)
+        for line in framer.lines():
+            ...
+    """
+    def __init__(self, delimiter: bytes, buffer_size: int = PIPE_BUFFER_SIZE):
+        self.delimiter = delimiter
+        self._delimiter_string = delimiter.decode()
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+        # Bytes in [_start, _end) have been read but aren't part of a line returned yet.
+        self._start = 0
+        self._end = 0
+
+    def get_read_view(self) -> memoryview:
+        """
+        Returns the free space at the end of the buffer to read into. Makes room first if the buffer is full.
+        """
+        if self._end == len(self._buffer):
+            unframed = self._end - self._start
+            if self._start > 0:
+                # Move the unfinished line to the front of the buffer.
+                self._view[:unframed] = self._view[self._start:self._end]
+            else:
+                # The unfinished line fills the whole buffer, so it needs a bigger one.
+                self._view.release()
+                self._buffer = self._buffer + bytearray(len(self._buffer))
+                self._view = memoryview(self._buffer)
+            self._start = 0
+            self._end = unframed
+        return self._view[self._end:]
+
+    def commit(self, bytes_read: int):
+        """
+        Marks bytes_read bytes of the last view returned by get_read_view as read.
+        """
+        self._end += bytes_read
+
+    def lines(self) -> list:
+        """
+        Returns each complete line read since the last call, without the delimiter.
+        """
+        # Everything before the last delimiter is made of complete lines, so they are decoded and split in one go.
+        last_delimiter = self._buffer.rfind(self.delimiter, self._start, self._end)
+        if last_delimiter < 0:
+            return []
+
+        complete = str(self._view[self._start:last_delimiter], "utf-8")
+        self._consume(last_delimiter + len(self.delimiter))
+        return complete.split(self._delimiter_string)
+
+    def next_line(self):
+        """
+        Returns the next complete line, or None if there isn't one.
+        """
+        line_end = self._buffer.find(self.delimiter, self._start, self._end)
+        if line_end < 0:
+            return None
+
+        line = str(self._view[self._start:line_end], "utf-8")
+        self._consume(line_end + len(self.delimiter))
+        return line
+
+    def next_record(self):
+        """
+        Returns the next complete binary record, or None if there isn't one.
+        """
+        if self._end - self._start < RECORD_HEADER.size:
+            return None
+
+        message_type, index, payload_size = RECORD_HEADER.unpack_from(self._buffer, self._start)
+        payload_start = self._start + RECORD_HEADER.size
+        if self._end - payload_start < payload_size:
+            return None
+
+        record = Record(MessageType(message_type), index, bytes(self._view[payload_start:payload_start + payload_size]))
+        self._consume(payload_start + payload_size)
+        return record
+
+    def _consume(self, new_start: int):
+        self._start = new_start
+        # Start from the front of the buffer again when nothing is left to frame.
+        if self._start == self._end:
+            self._start = 0
+            self._end = 0
+
+    def get_partial_line(self) -> str:
+        """
+        Returns the start of a line that hasn't been finished.
+        """
+        return str(self._view[self._start:self._end], "utf-8", "replace")
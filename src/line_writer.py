@@ -0,0 +1,146 @@
+"""
+@author William Erignac
+@version 2026-10-16
+
+This script contains the LineWriter, which writes lines to a transport.
+Outside of a batch, every line is written (and every flush is performed) immediately. Inside a batch, lines are
+coalesced into one buffer that is written when the batch is committed, when the buffer is full, or when the reader
+is about to wait for the simulator (see SimulationTask.read_line).
+"""
+
+import threading
+import time
+
+from instance_metrics import InstanceMetrics
+from pipe_transport import PIPE_BUFFER_SIZE, Transport
+from tracing import TRACER
+
+
+class LineWriter:
+    """
+    A write buffer in front of a transport that counts the writes and flushes it saved.
+    """
+    def __init__(self, transport: Transport, max_batch_size: int = PIPE_BUFFER_SIZE, metrics: InstanceMetrics = None):
+        """
+        max_batch_size = number of buffered bytes after which a batch is written without waiting for a commit.
+        metrics = where to count the bytes written and time the writes (e.g. those of a UnityInstance).
+        """
+        self.transport = transport
+        self.max_batch_size = max_batch_size
+        self.metrics = InstanceMetrics() if metrics is None else metrics
+
+        self._pending = bytearray()
+        self._lock = threading.Lock()
+        # Number of begin_batch calls that haven't been committed.
+        self._batch_depth = 0
+        # Whether something was written since the last flush.
+        self._unflushed = False
+
+        # Lines (or records) and flushes requested by callers.
+        self.lines_written = 0
+        self.flushes_requested = 0
+        # Calls actually made to the transport.
+        self.write_calls = 0
+        self.flush_calls = 0
+
+    def is_batching(self) -> bool:
+        return self._batch_depth > 0
+
+    def has_pending(self) -> bool:
+        return len(self._pending) > 0
+
+    def write_line(self, line: str):
+        self.write_lines((line,))
+
+    def write_lines(self, lines):
+        """
+        Writes each string in lines followed by a newline.
+        """
+        with self._lock:
+            for line in lines:
+                self._pending += line.encode()
+                self._pending += b"\n"
+                self.lines_written += 1
+
+                if len(self._pending) >= self.max_batch_size:
+                    self._write_pending()
+
+            if not self.is_batching():
+                self._write_pending()
+
+    def write_bytes(self, data: bytes):
+        """
+        Writes data as-is (e.g. a binary record). Counted as a line.
+        """
+        with self._lock:
+            self._pending += data
+            self.lines_written += 1
+
+            if not self.is_batching() or len(self._pending) >= self.max_batch_size:
+                self._write_pending()
+
+    def flush(self):
+        """
+        Flushes the transport. Deferred to the end of the batch while batching.
+        """
+        with self._lock:
+            self.flushes_requested += 1
+            if not self.is_batching():
+                self._write_pending()
+                self._flush_transport()
+
+    def begin_batch(self):
+        """
+        Starts coalescing writes and flushes until commit is called. Batches can be nested.
+        """
+        with self._lock:
+            self._batch_depth += 1
+
+    def commit(self):
+        """
+        Ends the current batch. Once the outermost batch is committed, writes and flushes everything it buffered.
+        """
+        with self._lock:
+            if self._batch_depth > 0:
+                self._batch_depth -= 1
+            if self.is_batching():
+                return
+            self._write_pending()
+            if self._unflushed:
+                self._flush_transport()
+
+    def write_pending(self):
+        """
+        Writes everything buffered so far without ending the batch. Called when idle.
+        """
+        with self._lock:
+            self._write_pending()
+
+    def get_stats(self) -> dict:
+        """
+        Returns the number of lines and flushes requested, the calls made to the transport for them, and how many
+        calls were saved compared to writing each line and performing each flush immediately.
+        """
+        return {"lines_written": self.lines_written,
+                "flushes_requested": self.flushes_requested,
+                "write_calls": self.write_calls,
+                "flush_calls": self.flush_calls,
+                "calls_saved": (self.lines_written + self.flushes_requested) - (self.write_calls + self.flush_calls)}
+
+    def _write_pending(self):
+        if len(self._pending) == 0:
+            return
+        start = time.perf_counter()
+        self.transport.write(self._pending)
+        end = time.perf_counter()
+        self.metrics.write_call.observe(end - start)
+        TRACER.complete("pipe_write", start, end, bytes=len(self._pending))
+        self.metrics.bytes_out += len(self._pending)
+        self.write_calls += 1
+        self._pending = bytearray()
+        self._unflushed = True
+
+    def _flush_transport(self):
+        self.transport.flush()
+        self.flush_calls += 1
+        self._unflushed = False
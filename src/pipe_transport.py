@@ -0,0 +1,253 @@
+"""
+@author William Erignac
+@version 2026-10-16
+
+This script contains the transports that UnityInstance uses to talk to a Unity simulator. A transport owns the server
+end of the connection and only moves bytes; splitting those bytes into lines is left to the SimulationTask reading them.
+
+On Windows, the transport is a named pipe (the original implementation). Everywhere else, .NET's NamedPipeClientStream
+(used by the Unity project's PipeCommunicator) connects to a Unix domain socket at <temp dir>/CoreFxPipe_<pipe name>,
+so the POSIX transport listens on that path.
+"""
+
+import asyncio
+import io
+import os
+import re
+import selectors
+import socket
+import sys
+import tempfile
+
+if sys.platform == "win32":
+    import win32file, win32pipe, win32event, pywintypes, winerror
+
+
+# Size of the in/out buffers of the pipe (and the socket reads).
+PIPE_BUFFER_SIZE = 65536
+
+
+class Transport:
+    """
+    The byte-level connection between Python and a simulator.
+    This class is inherited for each kind of connection supported.
+    """
+
+    # The bytes the simulator writes at the end of each line.
+    line_delimiter = b"\r\n"
+
+    def accept(self):
+        """
+        Blocks until the simulator has connected.
+        """
+        return NotImplemented
+
+    def read_into(self, buffer) -> int:
+        """
+        Blocks until some bytes have been read into buffer (a writable memoryview) and returns the number of bytes
+        read. Raises a ConnectionError if the simulator closed the connection.
+        """
+        return NotImplemented
+
+    def write(self, data: bytes):
+        """
+        Writes all of data to the simulator.
+        """
+        return NotImplemented
+
+    def flush(self):
+        """
+        Blocks until the simulator has received everything written so far (if the transport buffers writes).
+        """
+        pass
+
+    def close(self):
+        return NotImplemented
+
+    # The async versions of the methods above, for use from an event loop (see AsyncUnityInstance).
+    # By default, they run the blocking versions on the loop's thread pool.
+
+    async def accept_async(self):
+        await asyncio.get_running_loop().run_in_executor(None, self.accept)
+
+    async def read_into_async(self, buffer) -> int:
+        return await asyncio.get_running_loop().run_in_executor(None, self.read_into, buffer)
+
+    async def write_async(self, data: bytes):
+        await asyncio.get_running_loop().run_in_executor(None, self.write, data)
+
+    async def flush_async(self):
+        await asyncio.get_running_loop().run_in_executor(None, self.flush)
+
+
+class NamedPipeTransport(Transport):
+    """
+    A transport over a Windows named pipe, using overlapped reads.
+    """
+
+    line_delimiter = b"\r\n"
+
+    def __init__(self, pipe_path_and_name: str, buffer_size: int = PIPE_BUFFER_SIZE):
+        # From https://www.codeproject.com/Questions/5340484/How-to-send-back-data-through-Python-to-Csharp-thr
+        self.pipe_handle = win32pipe.CreateNamedPipe(
+            pipe_path_and_name,
+            win32pipe.PIPE_ACCESS_DUPLEX | win32file.FILE_FLAG_OVERLAPPED,
+            win32pipe.PIPE_TYPE_MESSAGE | win32pipe.PIPE_READMODE_MESSAGE | win32pipe.PIPE_WAIT,
+            1, buffer_size, buffer_size,
+            0,
+            None)
+
+        # Object to handle asynchronous events.
+        self.overlap = pywintypes.OVERLAPPED()
+        self.overlap.hEvent = win32event.CreateEvent(None, 0, 0, None)
+
+    def accept(self):
+        win32pipe.ConnectNamedPipe(self.pipe_handle, self.overlap)
+        win32file.GetOverlappedResult(self.pipe_handle, self.overlap, True)
+
+    def read_into(self, buffer) -> int:
+        # https://stackoverflow.com/questions/57833774/python-pywintypes-overlapped-offset-throws-overflowerror
+        win32file.ReadFile(self.pipe_handle, buffer, self.overlap)
+        try:
+            return win32file.GetOverlappedResult(self.pipe_handle, self.overlap, True)
+        except pywintypes.error as e:
+            # The message didn't fit in the buffer. The rest of it is returned by the next read.
+            if e.winerror == winerror.ERROR_MORE_DATA:
+                return len(buffer)
+            if e.winerror == winerror.ERROR_BROKEN_PIPE:
+                raise ConnectionError("The simulator closed the pipe.") from e
+            raise
+
+    def write(self, data: bytes):
+        win32file.WriteFile(self.pipe_handle, data)
+
+    def flush(self):
+        win32file.FlushFileBuffers(self.pipe_handle)
+
+    def close(self):
+        win32file.FlushFileBuffers(self.pipe_handle)
+        win32pipe.DisconnectNamedPipe(self.pipe_handle)
+        win32file.CloseHandle(self.pipe_handle)
+
+
+class UnixSocketTransport(Transport):
+    """
+    A transport over a Unix domain socket. The connected socket is non-blocking; reads and writes wait on a selector
+    when the socket isn't ready. The async methods use the event loop's socket methods instead.
+    """
+
+    line_delimiter = b"\n"
+
+    def __init__(self, pipe_path_and_name: str):
+        self.socket_path = get_unix_socket_path(pipe_path_and_name)
+
+        # A socket file left behind by a previous run would make bind fail.
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.socket_path)
+        self._server.listen(1)
+
+        self.connection = None
+        self._read_selector = selectors.DefaultSelector()
+        self._write_selector = selectors.DefaultSelector()
+
+    def accept(self):
+        connection, _ = self._server.accept()
+        self._on_accepted(connection)
+
+    def _on_accepted(self, connection: socket.socket):
+        self.connection = connection
+        self.connection.setblocking(False)
+        self._read_selector.register(self.connection, selectors.EVENT_READ)
+        self._write_selector.register(self.connection, selectors.EVENT_WRITE)
+
+    def read_into(self, buffer) -> int:
+        while True:
+            try:
+                bytes_read = self.connection.recv_into(buffer)
+            except BlockingIOError:
+                self._read_selector.select()
+                continue
+
+            if bytes_read == 0:
+                raise ConnectionError("The simulator closed the socket.")
+            return bytes_read
+
+    def write(self, data: bytes):
+        # Equivalent to sendall, but safe to use on a non-blocking socket.
+        view = memoryview(data)
+        while len(view) > 0:
+            try:
+                view = view[self.connection.send(view):]
+            except BlockingIOError:
+                self._write_selector.select()
+
+    async def accept_async(self):
+        self._server.setblocking(False)
+        connection, _ = await asyncio.get_running_loop().sock_accept(self._server)
+        self._on_accepted(connection)
+
+    async def read_into_async(self, buffer) -> int:
+        bytes_read = await asyncio.get_running_loop().sock_recv_into(self.connection, buffer)
+        if bytes_read == 0:
+            raise ConnectionError("The simulator closed the socket.")
+        return bytes_read
+
+    async def write_async(self, data: bytes):
+        await asyncio.get_running_loop().sock_sendall(self.connection, data)
+
+    async def flush_async(self):
+        pass
+
+    def close(self):
+        self._read_selector.close()
+        self._write_selector.close()
+        if not (self.connection is None):
+            self.connection.close()
+        self._server.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+def get_pipe_name(pipe_path_and_name: str) -> str:
+    """
+    Strips the path from a pipe path and name (e.g. '\\\\.\\pipe\\PipeB' -> 'PipeB').
+    """
+    return re.split(r"[\\/]", pipe_path_and_name)[-1]
+
+
+def get_unix_socket_path(pipe_path_and_name: str) -> str:
+    """
+    Converts a pipe path and name into the socket path .NET uses for a named pipe outside of Windows.
+    Absolute POSIX paths are used as-is.
+    """
+    if pipe_path_and_name.startswith("/"):
+        return pipe_path_and_name
+    return os.path.join(tempfile.gettempdir(), f"CoreFxPipe_{get_pipe_name(pipe_path_and_name)}")
+
+
+def create_transport(pipe_path_and_name: str) -> Transport:
+    """
+    Creates the server end of a connection for this platform.
+    """
+    if sys.platform == "win32":
+        return NamedPipeTransport(pipe_path_and_name)
+    return UnixSocketTransport(pipe_path_and_name)
+
+
+def connect_to_transport(pipe_path_and_name: str, timeout: float = 10.0):
+    """
+    Opens the client end of a connection for this platform, the way the Unity project does.
+    Returns a binary file object for reading and one for writing. Used by stand-ins for the simulator.
+    """
+    if sys.platform == "win32":
+        pipe_file = open(f"\\\\.\\pipe\\{get_pipe_name(pipe_path_and_name)}", "r+b", buffering=0)
+        return io.BufferedReader(pipe_file), pipe_file
+
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(timeout)
+    client.connect(get_unix_socket_path(pipe_path_and_name))
+    client.settimeout(None)
+    return client.makefile("rb"), client.makefile("wb", buffering=0)
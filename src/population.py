@@ -0,0 +1,126 @@
+"""
+@author William Erignac
+@version 2026-10-16
+
+This script contains the Population, which stores the members of a population (their genomes, seeds, ...) and their
+scores for the training scripts.
+
+Each attribute of the members is a column: a NumPy array with one row per member (e.g. a (members, 3) array for a
+vector), so a population of millions takes a few arrays instead of millions of Python objects. Scores are written by
+index, and sorting and selecting the best members are done on the score array. A DataFrame is only built when asked
+for (e.g. to print the best members).
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class Population:
+    """
+    The members of a population as columns of typed NumPy arrays, and a score for each member.
+    """
+    def __init__(self, size: int, columns: dict):
+        """
+        size = number of members.
+        columns = name of each column -> (dtype, shape of the column's value for one member),
+        e.g. {"Scale": (np.float64, (3,)), "Seed": (np.int32, ())}. Values start at 0.
+        """
+        self.columns = {name: np.zeros((size,) + tuple(shape), dtype=dtype) for name, (dtype, shape) in columns.items()}
+        self.scores = np.zeros(size)
+
+    @classmethod
+    def from_columns(cls, columns: dict, scores: np.ndarray = None):
+        """
+        Creates a population that uses the given arrays (name -> array with one row per member) as its columns.
+        """
+        population = cls(0, dict())
+        population.columns = dict(columns)
+        size = len(next(iter(columns.values())))
+        population.scores = np.zeros(size) if scores is None else np.asarray(scores, dtype=np.float64)
+
+        if any(len(column) != size for column in population.columns.values()) or len(population.scores) != size:
+            raise Exception("Every column of a population needs one row per member.")
+
+        return population
+
+    def __len__(self):
+        return len(self.scores)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def __setitem__(self, name: str, values):
+        self.columns[name][:] = values
+
+    def get_member(self, index: int) -> dict:
+        """
+        Returns the values of every column for one member.
+        """
+        return {name: column[index] for name, column in self.columns.items()}
+
+    def set_scores(self, indices, scores):
+        """
+        Sets the score of the members at indices (an index or an array of indices).
+        """
+        self.scores[indices] = scores
+
+    def argsort(self) -> np.ndarray:
+        """
+        Returns the indices of the members from the highest score to the lowest.
+        """
+        return np.argsort(-self.scores, kind="stable")
+
+    def top_k(self, k: int) -> np.ndarray:
+        """
+        Returns the indices of the k members with the highest scores, from the highest score to the lowest.
+        Only those k members are sorted.
+        """
+        k = min(k, len(self))
+        if k == len(self):
+            return self.argsort()
+
+        best = np.argpartition(-self.scores, k - 1)[:k]
+        return best[np.argsort(-self.scores[best], kind="stable")]
+
+    def take(self, indices) -> "Population":
+        """
+        Returns a new population made of the members at indices (with their scores), in that order.
+        """
+        return Population.from_columns({name: column[indices] for name, column in self.columns.items()},
+                                       self.scores[indices])
+
+    def sorted(self) -> "Population":
+        """
+        Returns a copy of the population sorted from the highest score to the lowest.
+        """
+        return self.take(self.argsort())
+
+    def top(self, k: int) -> "Population":
+        """
+        Returns the k members with the highest scores, sorted from the highest score to the lowest.
+        """
+        return self.take(self.top_k(k))
+
+    def concat(self, other: "Population") -> "Population":
+        """
+        Returns a new population with the members of this population followed by those of other.
+        """
+        return Population.from_columns({name: np.concatenate((column, other.columns[name]))
+                                        for name, column in self.columns.items()},
+                                       np.concatenate((self.scores, other.scores)))
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Returns the population as a DataFrame with a Score column. Columns with more than one value per member are
+        split into one column per value (e.g. Scale[0], Scale[1], Scale[2]).
+        """
+        data = dict()
+        for name, column in self.columns.items():
+            if column.ndim == 1:
+                data[name] = column
+                continue
+            flat = column.reshape(len(column), -1)
+            for i in range(flat.shape[1]):
+                data[f"{name}[{i}]"] = flat[:, i]
+        data["Score"] = self.scores
+        return pd.DataFrame(data)
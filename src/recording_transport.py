@@ -0,0 +1,239 @@
+"""
+@author William Erignac
+@version 2026-10-16
+
+This script contains the RecordingTransport, which logs the traffic between Python and a simulator, and the
+ReplayTransport, which plays a log back in place of the simulator.
+
+A recording is a gzip file of entries: the bytes of each read (inbound) and write (outbound) with the monotonic time
+it happened at, since the recording started. Each inbound entry also holds the number of lines Python had written when
+it was read. On replay, an inbound entry is only returned once as many lines have been written again, so the replayed
+program reads the simulator's answers in the same batches it did when recording (e.g. one physics step at a time),
+either as fast as it can or at the recorded pace. The lines written are compared to the recorded ones, so replays can
+check that the program still sends the same commands.
+
+Replays don't need the Unity build, so they make a reproducible workload for profiling the Python side of the
+experiments. Run this script on a recording to see how long Python and the simulator took between messages.
+"""
+
+import argparse
+import gzip
+import struct
+import threading
+import time
+
+from pipe_transport import Transport
+
+_MAGIC = b"UNITYRECORDING1\n"
+# Direction, nanoseconds since the recording started, lines written so far, and the size of the data that follows.
+_ENTRY = struct.Struct("<BqqI")
+INBOUND = 0
+OUTBOUND = 1
+
+
+def read_recording(path: str) -> tuple:
+    """
+    Returns the line delimiter of the simulator recorded at path, and its entries as
+    (direction, nanoseconds since the recording started, lines written so far, data) tuples.
+    """
+    with gzip.open(path, "rb") as file:
+        if file.read(len(_MAGIC)) != _MAGIC:
+            raise Exception(f"{path} is not a recording of a simulator.")
+        line_delimiter = file.read(file.read(1)[0])
+
+        entries = []
+        while True:
+            header = file.read(_ENTRY.size)
+            if len(header) == 0:
+                break
+            if len(header) < _ENTRY.size:
+                raise Exception(f"The recording {path} ends in the middle of an entry.")
+            direction, time_ns, lines_written, size = _ENTRY.unpack(header)
+            entries.append((direction, time_ns, lines_written, file.read(size)))
+    return line_delimiter, entries
+
+
+def summarize_recording(path: str) -> dict:
+    """
+    Returns the amount of traffic in the recording at path, and how the time between its entries splits between
+    Python (gaps ending with a write) and the simulator (gaps ending with a read). Reads are timed when the read
+    thread receives them, so this is an estimate.
+    """
+    _, entries = read_recording(path)
+    summary = {"inbound_bytes": 0, "outbound_bytes": 0, "outbound_lines": 0, "duration": 0.0, "python_time": 0.0,
+               "simulator_time": 0.0}
+
+    last_time_ns = entries[0][1] if len(entries) > 0 else 0
+    for direction, time_ns, _, data in entries:
+        gap = (time_ns - last_time_ns) / 1e9
+        last_time_ns = time_ns
+        if direction == INBOUND:
+            summary["inbound_bytes"] += len(data)
+            summary["simulator_time"] += gap
+        else:
+            summary["outbound_bytes"] += len(data)
+            summary["outbound_lines"] += data.count(b"\n")
+            summary["python_time"] += gap
+
+    if len(entries) > 0:
+        summary["duration"] = (entries[-1][1] - entries[0][1]) / 1e9
+    return summary
+
+
+class RecordingTransport(Transport):
+    """
+    A transport that logs everything read from and written to another transport.
+    """
+    def __init__(self, transport: Transport, path: str, compress_level: int = 1):
+        """
+        transport = the connection to the simulator to record.
+        path = gzip file to write the recording to (replaced if it exists).
+        compress_level = gzip compression level. Low levels keep the recording from slowing the experiment down.
+        """
+        self.transport = transport
+        self.line_delimiter = transport.line_delimiter
+
+        self._file = gzip.open(path, "wb", compresslevel=compress_level)
+        self._file.write(_MAGIC + bytes((len(self.line_delimiter),)) + self.line_delimiter)
+        # Entries are written from the read thread and the threads writing to the simulator.
+        self._lock = threading.Lock()
+        self._start_ns = time.monotonic_ns()
+        self.lines_written = 0
+
+    def accept(self):
+        self.transport.accept()
+
+    def read_into(self, buffer) -> int:
+        bytes_read = self.transport.read_into(buffer)
+        self._record(INBOUND, buffer[:bytes_read])
+        return bytes_read
+
+    def write(self, data: bytes):
+        # Recorded before it is written, so an answer read meanwhile is recorded after the lines it answers.
+        self._record(OUTBOUND, data)
+        self.transport.write(data)
+
+    def flush(self):
+        self.transport.flush()
+
+    def close(self):
+        self.transport.close()
+        with self._lock:
+            self._file.close()
+
+    def _record(self, direction: int, data):
+        with self._lock:
+            if direction == OUTBOUND:
+                self.lines_written += data.count(b"\n")
+            self._file.write(_ENTRY.pack(direction, time.monotonic_ns() - self._start_ns, self.lines_written,
+                                         len(data)))
+            self._file.write(data)
+
+
+class ReplayTransport(Transport):
+    """
+    A transport that plays back what a simulator sent in a recording, and checks what is written against it.
+    """
+    def __init__(self, path: str, paced: bool = False, strict: bool = False, timeout: float = 10.0):
+        """
+        path = the recording to replay (see RecordingTransport).
+        paced = if True, return the recorded reads no earlier (since the first read) than they were recorded.
+        Otherwise, return them as soon as the lines they answer have been written.
+        strict = if True, raise an exception when a written line differs from the recording. Otherwise, only count
+        the differences (e.g. for programs choosing random actions).
+        timeout = seconds to wait for the lines a recorded read answers before giving up (the program wrote fewer
+        lines than when recording).
+        """
+        self.line_delimiter, entries = read_recording(path)
+        self.paced = paced
+        self.strict = strict
+        self.timeout = timeout
+
+        self._inbound = [(time_ns, lines_written, data) for direction, time_ns, lines_written, data in entries
+                         if direction == INBOUND]
+        self._outbound_lines = b"".join(data for direction, _, _, data in entries if direction == OUTBOUND).split(b"\n")
+        # The next read to return, and how much of it was returned already (when it didn't fit in a buffer).
+        self._next_read = 0
+        self._read_offset = 0
+        self._first_read = None
+
+        # Bytes written after the last complete line.
+        self._partial_line = b""
+        self._lines_available = threading.Condition()
+        self.lines_written = 0
+        self.mismatches = 0
+        self.wait_time = 0.0
+
+    def accept(self):
+        pass
+
+    def read_into(self, buffer) -> int:
+        if self._next_read >= len(self._inbound):
+            raise ConnectionError("The recording has ended.")
+
+        time_ns, lines_written, data = self._inbound[self._next_read]
+        if self._read_offset == 0:
+            self._wait_for_lines(lines_written)
+            self._wait_for_time(time_ns)
+
+        size = min(len(buffer), len(data) - self._read_offset)
+        buffer[:size] = data[self._read_offset:self._read_offset + size]
+        self._read_offset += size
+        if self._read_offset == len(data):
+            self._next_read += 1
+            self._read_offset = 0
+        return size
+
+    def write(self, data: bytes):
+        lines = (self._partial_line + bytes(data)).split(b"\n")
+        self._partial_line = lines.pop()
+
+        with self._lines_available:
+            for line in lines:
+                if self.lines_written >= len(self._outbound_lines) or \
+                        line != self._outbound_lines[self.lines_written]:
+                    self.mismatches += 1
+                    if self.strict:
+                        expected = self._outbound_lines[self.lines_written] \
+                            if self.lines_written < len(self._outbound_lines) else None
+                        raise Exception(f"Line {self.lines_written} written differs from the recording: {line} "
+                                        f"instead of {expected}.")
+                self.lines_written += 1
+            self._lines_available.notify_all()
+
+    def close(self):
+        pass
+
+    def get_stats(self) -> dict:
+        return {"reads_replayed": self._next_read,
+                "reads_recorded": len(self._inbound),
+                "lines_written": self.lines_written,
+                "mismatches": self.mismatches,
+                "wait_time": self.wait_time}
+
+    def _wait_for_lines(self, lines_written: int):
+        start = time.perf_counter()
+        with self._lines_available:
+            if not self._lines_available.wait_for(lambda: self.lines_written >= lines_written, self.timeout):
+                raise Exception(f"Timeout for {self.timeout} seconds waiting for line {lines_written} to be written "
+                                f"({self.lines_written} were). The program doesn't write what was recorded.")
+        self.wait_time += time.perf_counter() - start
+
+    def _wait_for_time(self, time_ns: int):
+        if self._first_read is None:
+            self._first_read = (time.monotonic_ns(), time_ns)
+        if not self.paced:
+            return
+
+        delay = (self._first_read[0] + time_ns - self._first_read[1] - time.monotonic_ns()) / 1e9
+        if delay > 0:
+            time.sleep(delay)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("recording", help="recording to summarize.")
+    args = parser.parse_args()
+
+    for name, value in summarize_recording(args.recording).items():
+        print(f"{name}: {round(value, 3) if isinstance(value, float) else value}")
@@ -0,0 +1,150 @@
+"""
+@author William Erignac
+@version 2026-10-16
+
+This script contains the ReinforceLearner, which performs the REINFORCE updates of the training scripts.
+
+Finished episodes are accumulated, and one gradient step is taken for every episodes_per_update of them: their states
+are packed into one tensor for a single forward pass, and their discounted returns are computed together on a padded
+(episodes, steps) tensor. With per_episode set, each episode is instead used for its own gradient step as soon as it
+finishes, like the training scripts did before batching (based on the cart pole example of "Deep Reinforcement
+Learning In Action"). Both ways evaluate the policy on each row of states and divide the discounted returns of each
+episode by its largest one (see normalize_returns), so a single episode gives the same gradient either way.
+"""
+
+import time
+
+import numpy as np
+import torch
+
+from tracing import TRACER
+
+
+def normalize_returns(disc_returns: torch.Tensor, mask: torch.Tensor = None) -> torch.Tensor:
+    """
+    Divides the discounted returns of each episode (the last dimension) by its largest return, as the cart pole
+    example does.
+    mask = for padded episodes, whether each return is part of its episode. Padding isn't taken into account for the
+    largest return.
+    """
+    if mask is None:
+        return disc_returns / disc_returns.max(dim=-1, keepdim=True).values
+    return disc_returns / disc_returns.masked_fill(~mask, -torch.inf).max(dim=-1, keepdim=True).values
+
+
+class ReinforceLearner:
+    """
+    Collects finished episodes and updates a policy with REINFORCE.
+    """
+    def __init__(self, model: torch.nn.Module, optimizer: torch.optim.Optimizer, policy=None,
+                 episodes_per_update: int = 16, gamma: float = 0.99, per_episode: bool = False):
+        """
+        model = the policy's network, whose parameters the optimizer updates.
+        policy = function returning the action probabilities for each row of a (steps, observations) tensor. If
+        None, the model is called on the states.
+        episodes_per_update = number of episodes used for each gradient step.
+        per_episode = if True, take a gradient step for every episode as soon as it is added, the same way as
+        before batching (episodes_per_update is ignored).
+        """
+        self.model = model
+        self.optimizer = optimizer
+        self.policy = model if policy is None else policy
+        self.episodes_per_update = episodes_per_update
+        self.gamma = gamma
+        self.per_episode = per_episode
+
+        # Finished episodes that haven't been used for an update yet, as (states, actions, rewards).
+        self._episodes = []
+
+        self.episodes_added = 0
+        self.updates = 0
+        self.update_time = 0.0
+
+    def add_episode(self, states, actions, rewards):
+        """
+        states = the state of each step (steps x observations), actions = the action taken at each step, rewards =
+        the reward of each step, as lists or arrays (e.g. the views of a TrajectoryStore, which must stay valid until
+        the next flush). Episodes without steps are ignored.
+        """
+        if len(rewards) == 0:
+            return
+
+        self.episodes_added += 1
+        self._episodes.append((states, actions, rewards))
+
+        if self.per_episode or len(self._episodes) >= self.episodes_per_update:
+            self.flush()
+
+    def flush(self):
+        """
+        Takes a gradient step with the episodes that haven't been used yet. Call at the end of an epoch.
+        """
+        if len(self._episodes) == 0:
+            return
+
+        start = time.perf_counter()
+        if self.per_episode:
+            for states, actions, rewards in self._episodes:
+                self._update_with_episode(states, actions, rewards)
+        else:
+            self._update_with_episodes(self._episodes)
+        end = time.perf_counter()
+        self.update_time += end - start
+        TRACER.complete("reinforce_update", start, end, episodes=len(self._episodes))
+
+        self._episodes = []
+
+    def sync(self) -> bool:
+        """
+        The model is updated in place, so there is nothing to sync (see learner_process.LearnerProcess).
+        """
+        return False
+
+    def close(self):
+        self.flush()
+
+    def get_stats(self) -> dict:
+        return {"episodes": self.episodes_added,
+                "updates": self.updates,
+                "update_time": self.update_time}
+
+    def _update_with_episode(self, states, actions, rewards):
+        reward_batch = torch.from_numpy(np.asarray(rewards, dtype=np.float32)).flip(dims=(0,))
+        disc_returns = torch.pow(self.gamma, torch.arange(len(reward_batch)).float()) * reward_batch
+        disc_returns = normalize_returns(disc_returns)
+        # Arrays that are already float32 (e.g. the views of a TrajectoryStore) aren't copied.
+        state_batch = torch.from_numpy(np.asarray(states, dtype=np.float32))
+        action_batch = torch.from_numpy(np.asarray(actions))
+        prob_batch = self.policy(state_batch).gather(dim=1, index=action_batch.long().view(-1, 1)).squeeze(1)
+        self._step(-1 * torch.sum(disc_returns * torch.log(prob_batch)))
+
+    def _update_with_episodes(self, episodes: list):
+        lengths = torch.tensor([len(rewards) for _, _, rewards in episodes])
+        max_length = int(lengths.max())
+        steps = torch.arange(max_length)
+        # Whether each (episode, step) of the padded tensors is part of its episode.
+        mask = steps < lengths.view(-1, 1)
+
+        # As for a single episode, step t is weighted by gamma^t times the reward of the t-th step from the end.
+        rewards = torch.zeros((len(episodes), max_length))
+        rewards[mask] = torch.from_numpy(np.concatenate([np.asarray(episode_rewards, dtype=np.float32)
+                                                         for _, _, episode_rewards in episodes]))
+        reversed_steps = (lengths.view(-1, 1) - 1 - steps).clamp(min=0)
+        disc_returns = torch.pow(self.gamma, steps.float()) * rewards.gather(1, reversed_steps) * mask
+        disc_returns = normalize_returns(disc_returns, mask)
+
+        # The steps of every episode, packed one after the other (the order of disc_returns[mask]).
+        state_batch = torch.from_numpy(np.concatenate([np.asarray(states, dtype=np.float32)
+                                                       for states, _, _ in episodes]))
+        action_batch = torch.from_numpy(np.concatenate([np.asarray(actions, dtype=np.int64)
+                                                        for _, actions, _ in episodes]))
+        prob_batch = self.policy(state_batch).gather(dim=1, index=action_batch.view(-1, 1)).squeeze(1)
+
+        # The mean of the episodes' losses.
+        self._step(-1 * torch.sum(disc_returns[mask] * torch.log(prob_batch)) / len(episodes))
+
+    def _step(self, loss: torch.Tensor):
+        self.optimizer.zero_grad()
+        loss.backward()
+        self.optimizer.step()
+        self.updates += 1
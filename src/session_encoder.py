@@ -0,0 +1,191 @@
+"""
+@author William Erignac
+@version 2026-10-16
+
+This script contains the SessionEncoder, which turns the members of a Population into the json strings of session
+initialization data.
+
+An encoder is compiled once from a layout of the json object (which column goes under which key), into a %-template
+with one placeholder per value. Encoding a population then formats each column as a whole (with orjson when it is
+installed) and fills the template, instead of building and dumping nested dicts for every member. The strings are
+byte-identical to json.dumps of the same dicts.
+
+The strings of the last population encoded are kept, keyed by the values of their member, so members that haven't
+changed since (e.g. the sessions of the cart pole, which are the same every epoch) aren't formatted again. Very large
+populations can also be formatted in chunks by a pool of processes.
+"""
+
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from population import Population
+
+
+class Constant:
+    """
+    A value of a layout that is the same for every member (e.g. Constant("") for an empty string).
+    """
+    def __init__(self, value):
+        self.value = value
+
+
+def _format_float(value: float) -> str:
+    # How json.dumps writes a float.
+    if value != value:
+        return "NaN"
+    if value == float("inf"):
+        return "Infinity"
+    if value == -float("inf"):
+        return "-Infinity"
+    return float.__repr__(value)
+
+
+def format_values(values: np.ndarray) -> list:
+    """
+    Returns the json of each value of a 1D array of bools, integers or floats, as json.dumps would write it.
+    """
+    if values.dtype.kind == "b":
+        return np.where(values, "true", "false").tolist()
+
+    if values.dtype.kind in "iu":
+        if orjson is None:
+            return list(map(int.__repr__, values.tolist()))
+        values = np.ascontiguousarray(values)
+        return orjson.dumps(values, option=orjson.OPT_SERIALIZE_NUMPY)[1:-1].decode().split(",")
+
+    if values.dtype.kind == "f":
+        # orjson only takes contiguous arrays, and float32 values are written as the float64 json.dumps would get.
+        values = np.ascontiguousarray(values, dtype=np.float64)
+        if orjson is None or not np.isfinite(values).all():
+            return list(map(_format_float, values.tolist()))
+
+        strings = orjson.dumps(values, option=orjson.OPT_SERIALIZE_NUMPY)[1:-1].decode().split(",")
+        # orjson switches to scientific notation at different magnitudes than repr, so those values use repr instead.
+        magnitudes = np.abs(values)
+        scientific = np.flatnonzero((magnitudes != 0) & ((magnitudes < 1e-4) | (magnitudes >= 1e16)))
+        for index, value in zip(scientific.tolist(), values[scientific].tolist()):
+            strings[index] = float.__repr__(value)
+        return strings
+
+    raise Exception(f"Cannot encode values of type {values.dtype}.")
+
+
+def fill_template(template: str, values: list) -> list:
+    """
+    Returns template filled with each row of values (the strings of each placeholder, one list per placeholder).
+    """
+    return list(map(template.__mod__, zip(*values)))
+
+
+def _encode_chunk(template: str, values: list) -> list:
+    return fill_template(template, [format_values(column_values) for column_values in values])
+
+
+class SessionEncoder:
+    """
+    Encodes the members of populations with the same columns into json strings.
+    """
+    def __init__(self, layout: dict, memoize: bool = True, processes: int = 0, min_process_count: int = 200000):
+        """
+        layout = the json object of a member. Each key maps to the name of a column, to (name of a column, index of a
+        value in the column) for columns with several values per member, to a Constant, or to a nested layout, e.g.
+        {"Scale": {"x": ("Scale", 0), "y": ("Scale", 1), "z": ("Scale", 2)}, "Seed": "Seed", "Name": Constant("")}.
+        memoize = if True, keep the strings of the last population encoded to reuse them for unchanged members.
+        processes = number of processes to format large populations with (0 to always format them in this process).
+        min_process_count = number of members to format after which the processes are used.
+        """
+        self.memoize = memoize
+        self.processes = processes
+        self.min_process_count = min_process_count
+
+        # (name of a column, index of a value or None) for each placeholder of the template.
+        self._values = []
+        self._template = self._compile(layout)
+        self._columns = list(dict.fromkeys(name for name, _ in self._values))
+
+        # The string of each member of the last population encoded, keyed by its values.
+        self._cache = dict()
+        self._executor = None
+
+        self.members_encoded = 0
+        self.members_formatted = 0
+
+    def _compile(self, layout: dict) -> str:
+        items = []
+        for key, value in layout.items():
+            if isinstance(value, dict):
+                json_value = self._compile(value)
+            elif isinstance(value, Constant):
+                json_value = json.dumps(value.value).replace("%", "%%")
+            else:
+                self._values.append(value if isinstance(value, tuple) else (value, None))
+                json_value = "%s"
+            items.append(f"{json.dumps(str(key)).replace('%', '%%')}: {json_value}")
+        return "{" + ", ".join(items) + "}"
+
+    def encode(self, population: Population) -> list:
+        """
+        Returns the json string of each member of population.
+        """
+        count = len(population)
+        self.members_encoded += count
+        if not self.memoize:
+            return self._format(population.columns, count)
+
+        keys = self._get_keys(population)
+        strings = list(map(self._cache.get, keys))
+        missing = [index for index, string in enumerate(strings) if string is None]
+
+        if len(missing) > 0:
+            missing_columns = {name: population[name][missing] for name in self._columns}
+            for index, string in zip(missing, self._format(missing_columns, len(missing))):
+                strings[index] = string
+
+        # Only the members of this population are kept, so members that died don't take memory.
+        self._cache = dict(zip(keys, strings))
+        return strings
+
+    def close(self):
+        """
+        Stops the processes, if any were started.
+        """
+        if not (self._executor is None):
+            self._executor.shutdown()
+            self._executor = None
+
+    def get_stats(self) -> dict:
+        return {"members_encoded": self.members_encoded,
+                "members_formatted": self.members_formatted,
+                "members_reused": self.members_encoded - self.members_formatted}
+
+    def _get_keys(self, population: Population) -> list:
+        """
+        Returns the bytes of the values of each member.
+        """
+        count = len(population)
+        rows = np.concatenate([np.ascontiguousarray(population[name]).reshape(count, -1).view(np.uint8)
+                               for name in self._columns], axis=1)
+        return np.ascontiguousarray(rows).view(np.dtype((np.void, rows.shape[1]))).ravel().tolist()
+
+    def _format(self, columns: dict, count: int) -> list:
+        self.members_formatted += count
+        values = [columns[name] if index is None else columns[name][:, index] for name, index in self._values]
+
+        if self.processes <= 0 or count < self.min_process_count:
+            return _encode_chunk(self._template, values)
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.processes)
+
+        bounds = np.linspace(0, count, self.processes + 1).astype(int)
+        chunks = [self._executor.submit(_encode_chunk, self._template,
+                                        [column_values[start:end] for column_values in values])
+                  for start, end in zip(bounds[:-1], bounds[1:])]
+        return [string for chunk in chunks for string in chunk.result()]
@@ -0,0 +1,301 @@
+"""
+@author William Erignac
+@version 2026-10-16
+
+This script contains the experiments simulated by the stand-in simulator (see stand_in_simulator.py), vectorized with
+NumPy so that a single process can step thousands of sessions at once.
+
+- ScriptedExperiment: every value of a frame is the number of steps the session has run, and sessions run for a fixed
+number of steps. Used for any experiment with frames when physics aren't requested.
+- CartPoleExperiment and CartPole3DExperiment: cart poles integrated with the equations of motion of the classic
+control problem (Barto, Sutton and Anderson), pushed by the commands read from Python, with the wind, goals and initial
+impulses of the Unity experiments generated from the same seeds. Sessions end when the pole falls or the cart leaves
+the track, like in Unity. They approximate the Unity experiments (which use PhysX articulations), and are meant to
+give the training scripts realistic episodes, not to train controllers for Unity.
+- score_prisms: a scripted score for falling rectangular prisms, the height of the prism's center once it is placed on
+the floor as Unity places it (after the same size reduction and rotation).
+"""
+
+import numpy as np
+
+from binary_protocol import COMMAND_LAYOUTS, FRAME_LAYOUTS
+
+# Seconds per physics step (Unity's default fixed time step).
+TIME_STEP = 0.02
+
+GRAVITY = 9.81
+CART_MASS = 1.0
+POLE_MASS = 0.1
+# Half the length of the pole.
+POLE_LENGTH = 0.5
+CART_FORCE = 10.0
+# Degrees the pole can tilt and distance the cart can move before a session ends.
+ANGLE_LIMIT = 24.0
+CART_LIMIT = 5.0
+
+# The wind of the cart pole (see RandomWind.cs).
+WIND_STEP = 0.1
+MAX_WIND = 0.2
+
+# The goals and initial impulse of the 3D cart pole (see CartPole3DGoalGenerator.cs and CartPole3DInitialImpulse.cs).
+MAX_GOAL_VELOCITY = 10.0
+GOAL_STEP = 1.0
+VELOCITY_TOLERANCE = 1.0
+LOSS_PENALTY = 10.0
+MAX_IMPULSE = 5.0
+# Angular velocity of the pole per unit of impulse.
+IMPULSE_TO_ANGULAR_VELOCITY = 0.2
+
+# The smallest side of a prism relative to its longest (see FallingRectuangularPrismComponent.cs).
+MIN_SIDE_LENGTH = 0.1
+
+# The gradients of the noise, at each integer position modulo their count.
+_NOISE_GRADIENTS = np.random.default_rng(0).uniform(-1, 1, 256)
+
+
+def perlin_noise(positions: np.ndarray) -> np.ndarray:
+    """
+    Returns 1D gradient noise between 0 and 1 at each position, like Unity's Mathf.PerlinNoise1D.
+    """
+    cells = np.floor(positions)
+    offsets = positions - cells
+    cells = cells.astype(np.int64) & (len(_NOISE_GRADIENTS) - 1)
+    left = _NOISE_GRADIENTS[cells] * offsets
+    right = _NOISE_GRADIENTS[(cells + 1) & (len(_NOISE_GRADIENTS) - 1)] * (offsets - 1)
+    fade = offsets * offsets * offsets * (offsets * (offsets * 6 - 15) + 10)
+    return np.clip(0.5 + left + (right - left) * fade, 0, 1)
+
+
+def cart_pole_accelerations(force: np.ndarray, angles: np.ndarray, angular_velocities: np.ndarray) -> tuple:
+    """
+    Returns the acceleration of the carts and the angular acceleration of their poles (angles in radians).
+    """
+    total_mass = CART_MASS + POLE_MASS
+    sin, cos = np.sin(angles), np.cos(angles)
+    temp = (force + POLE_MASS * POLE_LENGTH * angular_velocities ** 2 * sin) / total_mass
+    angular_accelerations = (GRAVITY * sin - cos * temp) / \
+        (POLE_LENGTH * (4.0 / 3.0 - POLE_MASS * cos ** 2 / total_mass))
+    accelerations = temp - POLE_MASS * POLE_LENGTH * angular_accelerations * cos / total_mass
+    return accelerations, angular_accelerations
+
+
+class SteppedExperiment:
+    """
+    The sessions of an experiment with frames. Sessions are referred to by their index, and are started, observed and
+    stepped in groups (arrays of indices).
+    """
+    def __init__(self, experiment_name: str, session_init_data: list, max_steps: int):
+        """
+        session_init_data = the initialization data of each session, as dicts.
+        max_steps = number of steps after which a session ends.
+        """
+        self.layout = FRAME_LAYOUTS[experiment_name]
+        self.command_layout = COMMAND_LAYOUTS[experiment_name]
+        self.session_init_data = session_init_data
+        self.max_steps = max_steps
+
+        session_count = len(session_init_data)
+        self.steps = np.zeros(session_count, dtype=np.int64)
+        self.scores = np.zeros(session_count)
+
+    def start(self, indices: np.ndarray):
+        self.steps[indices] = 0
+        self.scores[indices] = 0
+        self._start(indices)
+
+    def observe(self, indices: np.ndarray) -> np.ndarray:
+        """
+        Returns the frame of each session, a row of values in the order of the experiment's frame layout.
+        """
+        return NotImplemented
+
+    def step(self, indices: np.ndarray, commands: np.ndarray) -> np.ndarray:
+        """
+        Applies the commands (a row of values per session, in the order of the experiment's command layout), scores
+        the sessions and steps their physics. Returns whether each session has ended.
+        """
+        self.steps[indices] += 1
+        terminated = self._step(indices, commands)
+        return terminated | (self.steps[indices] >= self.max_steps)
+
+    def _start(self, indices: np.ndarray):
+        pass
+
+    def _step(self, indices: np.ndarray, commands: np.ndarray) -> np.ndarray:
+        return NotImplemented
+
+
+class ScriptedExperiment(SteppedExperiment):
+    """
+    Sessions whose frames are the number of steps they ran, scored with the number of steps they ran.
+    """
+    def observe(self, indices: np.ndarray) -> np.ndarray:
+        return np.repeat(self.steps[indices, np.newaxis].astype(np.float64), len(self.layout), axis=1)
+
+    def _step(self, indices: np.ndarray, commands: np.ndarray) -> np.ndarray:
+        self.scores[indices] = self.steps[indices]
+        return np.zeros(len(indices), dtype=bool)
+
+
+class CartPoleExperiment(SteppedExperiment):
+    """
+    Cart poles pushed left or right and blown by the wind, scored with the number of steps their pole stayed up.
+    """
+    def __init__(self, session_init_data: list, max_steps: int):
+        SteppedExperiment.__init__(self, "cart_pole", session_init_data, max_steps)
+        session_count = len(session_init_data)
+        self.positions = np.zeros(session_count)
+        self.velocities = np.zeros(session_count)
+        self.angles = np.zeros(session_count)
+        self.angular_velocities = np.zeros(session_count)
+        self.wind_positions = np.zeros(session_count)
+
+    def _start(self, indices: np.ndarray):
+        self.positions[indices] = 0
+        self.velocities[indices] = 0
+        self.angular_velocities[indices] = 0
+        for index in indices.tolist():
+            init_data = self.session_init_data[index]
+            self.angles[index] = np.radians(init_data["InitialAngle"])
+            self.wind_positions[index] = np.random.default_rng(init_data["WindSeed"]).random()
+
+    def observe(self, indices: np.ndarray) -> np.ndarray:
+        return np.stack((self.positions[indices], self.velocities[indices], np.degrees(self.angles[indices]),
+                         self.angular_velocities[indices], self.scores[indices]), axis=1)
+
+    def _step(self, indices: np.ndarray, commands: np.ndarray) -> np.ndarray:
+        self.scores[indices] += 1
+        terminated = (np.abs(np.degrees(self.angles[indices])) > ANGLE_LIMIT) | \
+            (np.abs(self.positions[indices]) > CART_LIMIT)
+
+        self.wind_positions[indices] += TIME_STEP * WIND_STEP
+        wind = (0.5 - perlin_noise(self.wind_positions[indices])) * 2 * MAX_WIND
+        force = np.where(commands[:, 0] > 0.5, CART_FORCE, -CART_FORCE)
+
+        angles = self.angles[indices]
+        angular_velocities = self.angular_velocities[indices]
+        accelerations, angular_accelerations = cart_pole_accelerations(force, angles, angular_velocities)
+        # The wind pushes on the middle of the pole.
+        angular_accelerations += wind * np.cos(angles) / (POLE_MASS * POLE_LENGTH)
+
+        self.positions[indices] += TIME_STEP * self.velocities[indices]
+        self.velocities[indices] += TIME_STEP * accelerations
+        self.angles[indices] = angles + TIME_STEP * angular_velocities
+        self.angular_velocities[indices] = angular_velocities + TIME_STEP * angular_accelerations
+        return terminated
+
+
+class CartPole3DExperiment(SteppedExperiment):
+    """
+    Cart poles driven along x and z, scored by how closely their velocity follows a goal velocity that changes over
+    time. Each axis is simulated as a cart pole of its own.
+    """
+    def __init__(self, session_init_data: list, max_steps: int):
+        SteppedExperiment.__init__(self, "cart_pole_3d", session_init_data, max_steps)
+        session_count = len(session_init_data)
+        # (sessions, axes) for the x and z axes.
+        self.velocities = np.zeros((session_count, 2))
+        self.angles = np.zeros((session_count, 2))
+        self.angular_velocities = np.zeros((session_count, 2))
+        # Positions in the noise of the goal's x direction, z direction and magnitude.
+        self.goal_positions = np.zeros((session_count, 3))
+        self.goals = np.zeros((session_count, 2))
+
+    def _start(self, indices: np.ndarray):
+        self.velocities[indices] = 0
+        self.angles[indices] = 0
+        self.goals[indices] = 0
+        for index in indices.tolist():
+            init_data = self.session_init_data[index]
+            self.goal_positions[index] = (np.random.default_rng(init_data["GoalGeneratorSeed"]).random(3) - 0.5) * \
+                2 * 1000
+
+            x_direction, z_direction, magnitude = np.random.default_rng(init_data["InitialImpulseSeed"]).random(3)
+            direction = (np.array((x_direction, z_direction)) - 0.5) * 2
+            impulse = direction / max(np.linalg.norm(direction), 1e-12) * magnitude * MAX_IMPULSE
+            self.angular_velocities[index] = impulse * IMPULSE_TO_ANGULAR_VELOCITY
+
+    def observe(self, indices: np.ndarray) -> np.ndarray:
+        velocities = self.velocities[indices]
+        angles = np.degrees(self.angles[indices])
+        angular_velocities = self.angular_velocities[indices]
+        return np.stack((velocities[:, 0], angles[:, 0], angular_velocities[:, 0],
+                         velocities[:, 1], angles[:, 1], angular_velocities[:, 1],
+                         self.goals[indices, 0], self.goals[indices, 1], self.scores[indices]), axis=1)
+
+    def _step(self, indices: np.ndarray, commands: np.ndarray) -> np.ndarray:
+        # The goal moves before the session is scored (see CartPole3DGoalGenerator.OnSimulateStep).
+        self.goal_positions[indices] += TIME_STEP * np.array((GOAL_STEP, GOAL_STEP, GOAL_STEP))
+        noise = perlin_noise(self.goal_positions[indices])
+        directions = (noise[:, :2] - 0.5) * 2
+        norms = np.maximum(np.linalg.norm(directions, axis=1, keepdims=True), 1e-12)
+        self.goals[indices] = directions / norms * noise[:, 2:] * MAX_GOAL_VELOCITY
+
+        difference = np.linalg.norm(self.velocities[indices] - self.goals[indices], axis=1)
+        self.scores[indices] += (np.exp(-0.5 * (difference / VELOCITY_TOLERANCE) ** 2) - 0.5) * 2
+        terminated = np.degrees(np.linalg.norm(self.angles[indices], axis=1)) > ANGLE_LIMIT
+        self.scores[indices[terminated]] -= LOSS_PENALTY
+
+        force = (np.asarray(commands, dtype=np.float64) * 2 - 1) * CART_FORCE
+        angles = self.angles[indices]
+        angular_velocities = self.angular_velocities[indices]
+        accelerations, angular_accelerations = cart_pole_accelerations(force, angles, angular_velocities)
+        self.velocities[indices] += TIME_STEP * accelerations
+        self.angles[indices] = angles + TIME_STEP * angular_velocities
+        self.angular_velocities[indices] = angular_velocities + TIME_STEP * angular_accelerations
+        return terminated
+
+
+def create_experiment(experiment_name: str, session_init_data: list, max_steps: int, physics: bool):
+    """
+    Returns the SteppedExperiment simulating the sessions, or None for experiments without frames.
+    physics = if True, simulate the cart poles. Otherwise, their frames are scripted.
+    """
+    if experiment_name not in FRAME_LAYOUTS:
+        return None
+    if physics and experiment_name == "cart_pole":
+        return CartPoleExperiment(session_init_data, max_steps)
+    if physics and experiment_name == "cart_pole_3d":
+        return CartPole3DExperiment(session_init_data, max_steps)
+    return ScriptedExperiment(experiment_name, session_init_data, max_steps)
+
+
+def _rotation_matrices(euler_angles: np.ndarray) -> np.ndarray:
+    """
+    Returns the rotation matrix of each row of Euler angles (in degrees), applied in Unity's order (z, x, then y).
+    """
+    x, y, z = np.radians(euler_angles).T
+    ones, zeros = np.ones_like(x), np.zeros_like(x)
+    rotate_x = np.stack((ones, zeros, zeros, zeros, np.cos(x), -np.sin(x), zeros, np.sin(x), np.cos(x)), axis=1)
+    rotate_y = np.stack((np.cos(y), zeros, np.sin(y), zeros, ones, zeros, -np.sin(y), zeros, np.cos(y)), axis=1)
+    rotate_z = np.stack((np.cos(z), -np.sin(z), zeros, np.sin(z), np.cos(z), zeros, zeros, zeros, ones), axis=1)
+    return rotate_y.reshape(-1, 3, 3) @ rotate_x.reshape(-1, 3, 3) @ rotate_z.reshape(-1, 3, 3)
+
+
+def score_prisms(session_init_data: list) -> np.ndarray:
+    """
+    Returns the score of each falling rectangular prism: 100 times the height of its center above the floor.
+    """
+    if len(session_init_data) == 0:
+        return np.zeros(0)
+
+    values = np.array([[init_data[key] for key in ("XScale", "YScale", "ZScale", "XRot", "YRot", "ZRot")]
+                       for init_data in session_init_data], dtype=np.float64)
+    scales = np.abs(values[:, :3])
+    scales = np.maximum(scales / np.maximum(scales.max(axis=1, keepdims=True), 1e-12), MIN_SIDE_LENGTH)
+
+    corners = np.array([(x, y, z) for x in (-0.5, 0.5) for y in (-0.5, 0.5) for z in (-0.5, 0.5)])
+    # (prisms, corners, 3) corners of each scaled prism, then the height of each once rotated.
+    heights = np.einsum("pj,pcj->pc", _rotation_matrices(values[:, 3:])[:, 1, :],
+                        corners[np.newaxis, :, :] * scales[:, np.newaxis, :])
+    # The prism is moved up until its lowest corner touches the floor.
+    return -heights.min(axis=1) * 100
+
+
+def score_sessions(experiment_name: str, session_init_data: list) -> np.ndarray:
+    """
+    Returns the score of each session of an experiment without frames.
+    """
+    if experiment_name == "falling_rectangular_prism":
+        return score_prisms(session_init_data)
+    return np.zeros(len(session_init_data))
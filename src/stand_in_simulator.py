@@ -0,0 +1,306 @@
+"""
+@author William Erignac
+@version 2026-10-16
+
+This script is a stand-in for the Unity simulator. It connects to the pipe made by a UnityInstance and speaks the
+same line protocol as the Dispatcher in the Unity project, so UnityInstance can be exercised without a Unity build:
+
+run <experiment name> -> SUCCESS, followed by session initialization data lines and END from Python.
+Each session is then started (<index>) and scored (<index> <score>), followed by END once all have finished.
+quit -> QUIT
+
+For experiments that send frames (those in binary_protocol.FRAME_LAYOUTS), the running sessions are stepped together:
+each step, a frame (<index> <json>) is sent for every running session, and a command (<index> <json>) is read back for
+each, the way the PopulationController waits for every session before stepping physics. Up to -slots sessions run at
+once (all of them by default); when a session ends, it is scored and the next one is started in its slot. By default,
+the frames are scripted (every value is the number of steps the session ran) and sessions are scored with the number
+of steps they ran. With -physics, the cart poles are simulated instead (see stand_in_experiments). Falling rectangular
+prisms are given a scripted score, and other experiments without frames are scored 0. With -step_time, each step also
+takes that many seconds, however many sessions it steps, like the fixed physics step of a Unity build.
+
+Frames are formatted, and commands parsed, a step at a time for every session, so the stand-in can send over 10^5
+frames per second (see benchmarks.py stand_in) and load-test the Python side.
+
+run <experiment name> binary -> SUCCESS binary, after which frames, scores and commands are sent as binary records
+(see binary_protocol).
+
+The "echo" experiment instead writes back every line it reads until END, which is useful for measuring round trips.
+
+Run it the same way as a Unity build, e.g. executable_args = {"simulator_path": sys.executable,
+"simulator_args": ["stand_in_simulator.py", "-p", PIPE_NAME]}.
+"""
+
+import argparse
+import json
+import os
+import time
+from operator import itemgetter
+
+import numpy as np
+
+from binary_protocol import BINARY_MODE_ARGUMENT, FRAME_LAYOUTS, MessageType, dict_to_layout, pack_record
+from pipe_transport import connect_to_transport
+from stand_in_experiments import create_experiment, score_sessions
+
+# The name of the experiment that writes back whatever it reads.
+ECHO_EXPERIMENT = "echo"
+
+# Number of steps each session with frames runs for.
+DEFAULT_FRAME_COUNT = 50
+
+
+class StandInSimulator:
+    """
+    Answers the commands read from a pipe the way the Unity Dispatcher would.
+    """
+    def __init__(self, reader, writer, frame_count: int = DEFAULT_FRAME_COUNT, slots: int = 0, physics: bool = False,
+                 step_time: float = 0.0):
+        """
+        reader, writer = binary file objects connected to the pipe (see pipe_transport.connect_to_transport).
+        frame_count = number of steps each session with frames runs for (at most, with physics).
+        slots = number of sessions that run at once (0 for every session of an experiment).
+        physics = if True, simulate the cart poles instead of sending scripted frames.
+        step_time = seconds each step of the sessions with frames takes (spent sleeping).
+        """
+        self.reader = reader
+        self.writer = writer
+        self.frame_count = frame_count
+        self.slots = slots
+        self.physics = physics
+        self.step_time = step_time
+
+        # Whether the current experiment sends records instead of lines.
+        self.binary = False
+        # Bytes written but not sent yet. Sent by flush.
+        self._out = bytearray()
+
+    def read_line(self):
+        """
+        Returns the next line written by Python, or None if the pipe has closed.
+        """
+        line = self.reader.readline()
+        if len(line) == 0:
+            return None
+        return line.decode().rstrip("\r\n")
+
+    def read_commands(self, count: int, command_layout: tuple) -> tuple:
+        """
+        Reads count commands written by Python. Returns the session index of each, and their values (a row per
+        command, in the order of command_layout).
+        """
+        if self.binary:
+            dtype = np.dtype([("type", "u1"), ("index", "<i4"), ("size", "<u4"),
+                              ("values", "<f4", (len(command_layout),))])
+            data = self.reader.read(count * dtype.itemsize)
+            if len(data) < count * dtype.itemsize:
+                raise ConnectionError("The pipe closed while reading commands.")
+            records = np.frombuffer(data, dtype=dtype)
+            return records["index"].astype(np.int64), records["values"].astype(np.float64)
+
+        lines = [self.reader.readline().split(b" ", 1) for _ in range(count)]
+        if any(len(line) < 2 for line in lines):
+            raise ConnectionError("The pipe closed while reading commands.")
+        indices = np.array([int(index) for index, _ in lines], dtype=np.int64)
+        commands = json.loads(b"[" + b",".join(command for _, command in lines) + b"]")
+
+        if any("." in name for name in command_layout):
+            values = [dict_to_layout(command_layout, command) for command in commands]
+        else:
+            get_values = itemgetter(*command_layout)
+            values = [get_values(command) for command in commands]
+        return indices, np.array(values, dtype=np.float64).reshape(count, len(command_layout))
+
+    def write_line(self, line: str):
+        # Written the way .NET's StreamWriter.WriteLine would on this platform.
+        self._out += f"{line}{os.linesep}".encode()
+
+    def write_message(self, message_type: MessageType, index: int, values=()):
+        """
+        Writes a start, score or end message as a line or a record depending on the mode.
+        """
+        if self.binary:
+            self._out += pack_record(message_type, index, values)
+        elif message_type == MessageType.START:
+            self.write_line(str(index))
+        elif message_type == MessageType.SCORE:
+            self.write_line(f"{index} {values[0]}")
+        elif message_type == MessageType.END:
+            self.write_line("END")
+
+    def write_frames(self, layout: tuple, indices: np.ndarray, values: np.ndarray):
+        """
+        Writes the frame of each session of indices (values has a row per session, in the order of layout).
+        """
+        if self.binary:
+            dtype = np.dtype([("type", "u1"), ("index", "<i4"), ("size", "<u4"), ("values", "<f4", (len(layout),))])
+            records = np.empty(len(indices), dtype=dtype)
+            records["type"] = MessageType.FRAME
+            records["index"] = indices
+            records["size"] = 4 * len(layout)
+            records["values"] = values
+            self._out += records.tobytes()
+            return
+
+        template = get_frame_template(layout)
+        self._out += "".join(map(template.__mod__, zip(indices.tolist(), *values.T.tolist()))).encode()
+
+    def flush(self):
+        self.writer.write(self._out)
+        self.writer.flush()
+        self._out = bytearray()
+
+    def run(self):
+        """
+        Executes commands until quit is received or the pipe closes.
+        """
+        while True:
+            line = self.read_line()
+
+            if line is None:
+                return
+
+            words = line.split(" ")
+
+            if words[0] == "run" and len(words) > 1:
+                self.run_experiment(words[1], BINARY_MODE_ARGUMENT in words[2:])
+            elif words[0] == "quit":
+                self.write_line("QUIT")
+                self.flush()
+                return
+            elif words[0] != "set":
+                self.write_line(f'Error: Could not recognize command "{line}".')
+                self.flush()
+
+    def run_experiment(self, experiment_name: str, binary: bool = False):
+        """
+        Acknowledges the experiment, reads its sessions until END and then simulates them.
+        """
+        # Binary mode is only supported by experiments with frames.
+        self.binary = binary and experiment_name in FRAME_LAYOUTS
+        self.write_line(f"SUCCESS {BINARY_MODE_ARGUMENT}" if self.binary else "SUCCESS")
+        self.flush()
+
+        if experiment_name == ECHO_EXPERIMENT:
+            self.echo_until_end()
+            return
+
+        session_init_data = []
+        while True:
+            line = self.read_line()
+            if line is None or line == "END":
+                break
+            session_init_data.append(line)
+
+        self.simulate_sessions(experiment_name, session_init_data)
+        self.write_message(MessageType.END, -1)
+        self.flush()
+        self.binary = False
+
+    def echo_until_end(self):
+        """
+        Writes back each line read until END is read.
+        """
+        while True:
+            line = self.read_line()
+            if line is None or line == "END":
+                break
+            self.write_line(line)
+            self.flush()
+        self.write_line("END")
+        self.flush()
+
+    def simulate_sessions(self, experiment_name: str, session_init_data: list):
+        """
+        Starts the sessions as slots free up, steps the running ones with frames together, and scores them.
+        """
+        session_init_data = [json.loads(line) for line in session_init_data]
+        session_count = len(session_init_data)
+
+        experiment = create_experiment(experiment_name, session_init_data, self.frame_count, self.physics)
+        if experiment is None:
+            for index in range(session_count):
+                self.write_message(MessageType.START, index)
+            for index, score in enumerate(score_sessions(experiment_name, session_init_data).tolist()):
+                self.write_message(MessageType.SCORE, index, (score,))
+            return
+
+        slot_count = session_count if self.slots <= 0 else self.slots
+        running = np.zeros(0, dtype=np.int64)
+        next_session = 0
+        # The row of each running session in the current step (to put commands in the order of the frames).
+        rows = np.zeros(session_count, dtype=np.int64)
+
+        while True:
+            # Start sessions in the free slots.
+            started = np.arange(next_session, min(next_session + slot_count - len(running), session_count))
+            next_session += len(started)
+            for index in started.tolist():
+                self.write_message(MessageType.START, index)
+            experiment.start(started)
+            running = np.concatenate((running, started))
+
+            if len(running) == 0:
+                return
+
+            self.write_frames(experiment.layout, running, experiment.observe(running))
+            self.flush()
+
+            indices, values = self.read_commands(len(running), experiment.command_layout)
+            rows[running] = np.arange(len(running))
+            commands = np.zeros((len(running), len(experiment.command_layout)))
+            commands[rows[indices]] = values
+
+            if self.step_time > 0:
+                time.sleep(self.step_time)
+            ended = experiment.step(running, commands)
+            for index, score in zip(running[ended].tolist(), experiment.scores[running[ended]].tolist()):
+                self.write_message(MessageType.SCORE, index, (score,))
+            running = running[~ended]
+
+
+def get_frame_template(layout: tuple) -> str:
+    """
+    Returns a %-template of the line of a frame, with a placeholder for the session index and each value of layout,
+    e.g. '%d {"CartPosition":%.9g,...}'. The json is compact, like the json written by Unity.
+    """
+    template = _FRAME_TEMPLATES.get(layout)
+    if template is None:
+        # The nested keys of the layout, in order.
+        tree = dict()
+        for name in layout:
+            keys = name.split(".")
+            parent = tree
+            for key in keys[:-1]:
+                parent = parent.setdefault(key, dict())
+            parent[keys[-1]] = None
+
+        def compile_tree(node: dict) -> str:
+            return "{" + ",".join(f"{json.dumps(key).replace('%', '%%')}:"
+                                  f"{'%.9g' if value is None else compile_tree(value)}"
+                                  for key, value in node.items()) + "}"
+
+        template = f"%d {compile_tree(tree)}{os.linesep}"
+        _FRAME_TEMPLATES[layout] = template
+    return template
+
+
+# Layout -> template of the frames of that layout (see get_frame_template).
+_FRAME_TEMPLATES = dict()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-p", help="name of the pipe to connect to.", required=True)
+    parser.add_argument("-frames", help="number of steps each session with frames runs for (at most, with -physics).",
+                        type=int, default=DEFAULT_FRAME_COUNT)
+    parser.add_argument("-slots", help="number of sessions that run at once (0 for every session of an experiment).",
+                        type=int, default=0)
+    parser.add_argument("-physics", help="if this flag is passed, simulate the cart poles instead of sending scripted "
+                        "frames.", action="store_true")
+    parser.add_argument("-step_time", help="seconds each step of the sessions with frames takes, like the fixed physics "
+                        "step of a Unity build.", type=float, default=0.0)
+    # Ignore the arguments meant for Unity builds (e.g. -batchmode -nographics).
+    args, _ = parser.parse_known_args()
+
+    reader, writer = connect_to_transport(args.p)
+    StandInSimulator(reader, writer, args.frames, args.slots, args.physics, args.step_time).run()
@@ -0,0 +1,105 @@
+"""
+@author William Erignac
+@version 2026-10-16
+
+This script contains the SteadyStateGA, which evolves a population without generations. Each score is added to a pool
+of scored members as soon as it is read, replacing one of them, and new members are bred from the pool whenever a
+simulator has room for more sessions. Simulators then don't wait for the slowest session of a generation, nor for the
+next generation to be bred.
+"""
+
+import threading
+from functools import partial
+
+import numpy as np
+
+from genetic_operators import reproduce, select_tournament
+from population import Population
+
+# Which member of the pool a newly scored member replaces.
+REPLACE_WORST = "worst"
+REPLACE_OLDEST = "oldest"
+REPLACE_TOURNAMENT = "tournament"
+REPLACEMENT_POLICIES = (REPLACE_WORST, REPLACE_OLDEST, REPLACE_TOURNAMENT)
+
+
+class SteadyStateGA:
+    """
+    A pool of scored genomes that new genomes are bred from, and that scored genomes are added to one at a time.
+    breed and add_member can be called from different threads (e.g. the threads sending sessions and the one reading
+    scores).
+    """
+    def __init__(self, rng: np.random.Generator, pool: Population, tournament_size: int = 3,
+                 replacement: str = REPLACE_WORST, **reproduce_args):
+        """
+        pool = the scored members to start from, with their genomes in a "Genome" column (e.g. a scored generation).
+        tournament_size = number of members competing to be each parent (see genetic_operators.select_tournament).
+        replacement = the member of the pool replaced by each new member:
+            "worst": the member with the lowest score.
+            "oldest": the member that has been in the pool the longest.
+            "tournament": the member with the lowest score out of tournament_size members picked uniformly.
+        reproduce_args = other arguments of genetic_operators.reproduce (e.g. modify_chance, mutable_genes).
+        """
+        if replacement not in REPLACEMENT_POLICIES:
+            raise Exception(f"Unknown replacement policy {replacement}, expected one of {REPLACEMENT_POLICIES}.")
+
+        self.rng = rng
+        self.pool = pool.take(np.arange(len(pool)))
+        self.tournament_size = tournament_size
+        self.replacement = replacement
+        self.reproduce_args = reproduce_args
+        self._select = partial(select_tournament, size=tournament_size)
+        self._lock = threading.Lock()
+
+        # When each member of the pool was added (for REPLACE_OLDEST), counting the initial members.
+        self._additions = np.arange(len(pool))
+        self.members_added = len(pool)
+        self.members_bred = 0
+
+    def breed(self, count: int) -> np.ndarray:
+        """
+        Returns the genomes of count children of members of the pool picked by tournament selection.
+        """
+        if count == 0:
+            return self.pool["Genome"][:0].copy()
+
+        sexual_to_asexual_percent = self.reproduce_args.get("sexual_to_asexual_percent", 0.5)
+        reproduce_args = {name: value for name, value in self.reproduce_args.items()
+                          if name != "sexual_to_asexual_percent"}
+
+        with self._lock:
+            # reproduce rounds the number of sexual children down, which would make every child asexual when they are
+            # bred one at a time. Draw it instead (the +0.5 keeps the float product from rounding under the draw).
+            sexual_reproductions = self.rng.binomial(count, sexual_to_asexual_percent)
+            children = reproduce(self.rng, self.pool["Genome"], self.pool.scores, count,
+                                 (sexual_reproductions + 0.5) / count, select=self._select, **reproduce_args)
+            self.members_bred += count
+        return children
+
+    def add_member(self, genome: np.ndarray, score: float):
+        """
+        Adds a scored genome to the pool in place of a member picked by the replacement policy.
+        """
+        with self._lock:
+            replaced = self._pick_replaced()
+            self.pool["Genome"][replaced] = genome
+            self.pool.scores[replaced] = score
+            self._additions[replaced] = self.members_added
+            self.members_added += 1
+
+    def get_best(self, k: int) -> Population:
+        """
+        Returns the k members of the pool with the highest scores, sorted from the highest score to the lowest.
+        """
+        with self._lock:
+            return self.pool.top(k)
+
+    def _pick_replaced(self) -> int:
+        if self.replacement == REPLACE_WORST:
+            return int(np.argmin(self.pool.scores))
+
+        if self.replacement == REPLACE_OLDEST:
+            return int(np.argmin(self._additions))
+
+        entrants = self.rng.integers(0, len(self.pool), self.tournament_size)
+        return int(entrants[np.argmin(self.pool.scores[entrants])])
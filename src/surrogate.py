@@ -0,0 +1,103 @@
+"""
+@author William Erignac
+@version 2026-10-16
+
+This script contains the KNNSurrogate, a cheap model of an experiment's scores used to decide which genomes are worth
+simulating.
+
+The surrogate remembers every (genome, score) pair seen so far, and predicts the score of a genome from the scores of
+its k nearest neighbours (weighted by inverse distance, with genes rescaled by their spread so that e.g. rotations in
+degrees don't outweigh scales). Candidates are ranked by their predicted score plus an exploration term that grows with
+their distance to the nearest sample, so that candidates in regions the model knows little about still get simulated.
+Duplicate candidates are only kept once: children that are copies of each other (or of a sample) would otherwise share
+the best prediction and crowd out every other candidate.
+"""
+
+import numpy as np
+
+# Maximum number of candidate-sample distances computed at once.
+_MAX_DISTANCES = 4000000
+
+
+class KNNSurrogate:
+    """
+    A k-nearest-neighbours regressor over the genomes and scores seen so far.
+    """
+    def __init__(self, k: int = 8, exploration: float = 1.0):
+        """
+        k = number of neighbours used for each prediction.
+        exploration = weight of the distance to the nearest sample when ranking candidates, in spreads of the scores per
+        median distance of the candidates (0 to rank by predicted score only).
+        """
+        self.k = k
+        self.exploration = exploration
+
+        self._genomes = None
+        self._scores = np.zeros(0)
+
+    def __len__(self):
+        return len(self._scores)
+
+    def add(self, genomes: np.ndarray, scores: np.ndarray):
+        """
+        Adds scored genomes (a (members, genes) array and a score per member) to the samples.
+        """
+        genomes = np.asarray(genomes, dtype=np.float64)
+        self._genomes = genomes.copy() if self._genomes is None else np.concatenate((self._genomes, genomes))
+        self._scores = np.concatenate((self._scores, np.asarray(scores, dtype=np.float64)))
+
+    def predict(self, genomes: np.ndarray) -> tuple:
+        """
+        Returns the predicted score of each genome, and its distance to the nearest sample (with rescaled genes).
+        """
+        if len(self) == 0:
+            raise Exception("Cannot predict scores without samples.")
+
+        k = min(self.k, len(self))
+        # Rescale the genes so that each has the same spread in the samples (genes that don't vary are left as-is).
+        gene_scale = np.std(self._genomes, axis=0)
+        gene_scale[gene_scale == 0] = 1
+        samples = self._genomes / gene_scale
+
+        predictions = np.zeros(len(genomes))
+        nearest_distances = np.zeros(len(genomes))
+        chunk_size = max(1, _MAX_DISTANCES // len(self))
+        for start in range(0, len(genomes), chunk_size):
+            candidates = np.asarray(genomes[start:start + chunk_size], dtype=np.float64) / gene_scale
+            distances = np.sqrt(((candidates[:, np.newaxis, :] - samples[np.newaxis, :, :]) ** 2).sum(axis=2))
+            neighbours = np.argpartition(distances, k - 1, axis=1)[:, :k]
+            neighbour_distances = np.take_along_axis(distances, neighbours, axis=1)
+            neighbour_scores = self._scores[neighbours]
+
+            weights = 1 / np.maximum(neighbour_distances, 1e-12)
+            weights /= weights.sum(axis=1, keepdims=True)
+            predictions[start:start + chunk_size] = (weights * neighbour_scores).sum(axis=1)
+            nearest_distances[start:start + chunk_size] = neighbour_distances.min(axis=1)
+
+        return predictions, nearest_distances
+
+    def rank(self, genomes: np.ndarray) -> np.ndarray:
+        """
+        Returns the indices of genomes from the most to the least promising (predicted score plus the exploration
+        term).
+        """
+        predictions, nearest_distances = self.predict(genomes)
+        median_distance = np.median(nearest_distances)
+        if median_distance > 0:
+            predictions += self.exploration * np.std(self._scores) * nearest_distances / median_distance
+        return np.argsort(-predictions, kind="stable")
+
+    def select(self, genomes: np.ndarray, count: int) -> np.ndarray:
+        """
+        Returns the indices of the count most promising genomes, or of the first count genomes if there are no samples
+        yet. Duplicate genomes are only picked once, unless there aren't count different genomes.
+        """
+        if len(self) == 0:
+            return np.arange(min(count, len(genomes)))
+
+        _, unique = np.unique(genomes, axis=0, return_index=True)
+        unique = np.sort(unique)
+        selected = unique[self.rank(genomes[unique])]
+        if len(selected) < count:
+            selected = np.concatenate((selected, np.setdiff1d(np.arange(len(genomes)), selected)))
+        return selected[:count]
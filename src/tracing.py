@@ -0,0 +1,195 @@
+"""
+@author William Erignac
+@version 2026-10-16
+
+This script contains the Tracer, which records how long the phases of a training epoch take (serializing sessions,
+waiting for and writing to the pipe, inference, backpropagation...) as spans, along with a timeline of each session,
+and writes them in the Chrome trace event format. Open the file in https://ui.perfetto.dev or chrome://tracing.
+
+Tracing is off until TRACER.enable is called, in which case the spans cost a check of TRACER.enabled. Phase spans
+are recorded with TRACER.span (a context manager), the traced decorator, or TRACER.complete for durations already
+measured. Each session gets a track of its own (keyed by session index) with its lifetime and its frames, but only
+for the fraction of sessions given by sample_rate, so tracing an epoch of 1024 sessions stays cheap. Sessions are
+sampled by a hash of their index, so the same sessions are traced in every epoch.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+
+# The process ids under which the phases and the sessions are shown.
+PHASES_PID = 1
+SESSIONS_PID = 2
+# Multiplier of Knuth's multiplicative hash, spreading the sampled sessions across the indices.
+_SAMPLING_MULTIPLIER = 2654435761
+
+
+class _NullSpan:
+    """
+    The span returned while tracing is off.
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "args", "start")
+
+    def __init__(self, tracer, name: str, args: dict):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.tracer.complete(self.name, self.start, time.perf_counter(), **self.args)
+        return False
+
+
+class Tracer:
+    """
+    Collects spans and session events in memory until they are saved.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.sample_rate = 1.0
+        self._sample_threshold = 0
+        # Events as (phase, name, pid, tid, start, duration, args), with times from time.perf_counter.
+        self._events = []
+        # Name of each thread that recorded a span.
+        self._thread_names = dict()
+        self._origin = time.perf_counter()
+
+    def enable(self, sample_rate: float = 1.0):
+        """
+        Starts recording. sample_rate = fraction of the sessions whose timeline is recorded (phase spans are always
+        recorded).
+        """
+        self.sample_rate = sample_rate
+        self._sample_threshold = int(sample_rate * 2 ** 32)
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def clear(self):
+        self._events = []
+        self._thread_names = dict()
+        self._origin = time.perf_counter()
+
+    def span(self, name: str, **args):
+        """
+        Returns a context manager recording the time spent in its block as a span, with args shown with it.
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, args)
+
+    def complete(self, name: str, start: float, end: float, **args):
+        """
+        Records a span that was already timed (start and end from time.perf_counter) on the current thread.
+        """
+        if not self.enabled:
+            return
+        thread_id = threading.get_ident()
+        if not (thread_id in self._thread_names):
+            self._thread_names[thread_id] = threading.current_thread().name
+        self._events.append(("X", name, PHASES_PID, thread_id, start, end - start, args))
+
+    def is_session_sampled(self, index: int) -> bool:
+        return self.enabled and (index * _SAMPLING_MULTIPLIER) & 0xFFFFFFFF < self._sample_threshold
+
+    def session_begin(self, index: int, **args):
+        """
+        Starts the lifetime of a session on its track (if the session is sampled).
+        """
+        if self.is_session_sampled(index):
+            self._events.append(("B", "session", SESSIONS_PID, index, time.perf_counter(), 0.0, args))
+
+    def session_end(self, index: int, **args):
+        if self.is_session_sampled(index):
+            self._events.append(("E", "session", SESSIONS_PID, index, time.perf_counter(), 0.0, args))
+
+    def session_instants(self, name: str, indices):
+        """
+        Marks an event (e.g. a frame) at the current time on the track of each sampled session of indices.
+        """
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        for index in indices:
+            if (index * _SAMPLING_MULTIPLIER) & 0xFFFFFFFF < self._sample_threshold:
+                self._events.append(("i", name, SESSIONS_PID, index, now, 0.0, None))
+
+    def get_event_count(self) -> int:
+        return len(self._events)
+
+    def to_chrome_trace(self) -> dict:
+        """
+        Returns the events recorded so far in the Chrome trace event format.
+        """
+        events = [{"ph": "M", "name": "process_name", "pid": PHASES_PID, "tid": 0, "args": {"name": "Phases"}},
+                  {"ph": "M", "name": "process_name", "pid": SESSIONS_PID, "tid": 0, "args": {"name": "Sessions"}}]
+        for thread_id, thread_name in self._thread_names.items():
+            events.append({"ph": "M", "name": "thread_name", "pid": PHASES_PID, "tid": thread_id,
+                           "args": {"name": thread_name}})
+
+        sessions = set()
+        for phase, name, pid, tid, start, duration, args in self._events:
+            # In microseconds since the tracer was created or cleared.
+            event = {"ph": phase, "name": name, "pid": pid, "tid": tid, "ts": (start - self._origin) * 1e6}
+            if phase == "X":
+                event["dur"] = duration * 1e6
+            elif phase == "i":
+                # Shown on the session's track only.
+                event["s"] = "t"
+            if args:
+                event["args"] = args
+            events.append(event)
+            if pid == SESSIONS_PID:
+                sessions.add(tid)
+
+        for index in sorted(sessions):
+            events.append({"ph": "M", "name": "thread_name", "pid": SESSIONS_PID, "tid": index,
+                           "args": {"name": f"Session {index}"}})
+            events.append({"ph": "M", "name": "thread_sort_index", "pid": SESSIONS_PID, "tid": index,
+                           "args": {"sort_index": index}})
+
+        return {"traceEvents": events, "displayTimeUnit": "ms",
+                "otherData": {"sample_rate": self.sample_rate, "pid": os.getpid()}}
+
+    def save(self, path: str):
+        with open(path, "w") as file:
+            json.dump(self.to_chrome_trace(), file)
+
+
+# The tracer used by the training scripts and the classes they use.
+TRACER = Tracer()
+
+
+def traced(name: str = None):
+    """
+    Decorator recording each call of a function as a span of TRACER (named after the function by default).
+    """
+    def decorator(function):
+        span_name = function.__name__ if name is None else name
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not TRACER.enabled:
+                return function(*args, **kwargs)
+            with TRACER.span(span_name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
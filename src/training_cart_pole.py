@@ -34,16 +34,17 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
-import argparse
 import json
 import os
 import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
 
 import torch
-from tqdm import tqdm
 
+from cart_pole_training import CartPoleTrainer, create_argument_parser, create_training_simulator, run_epochs
+from population import Population
+from reinforce_learner import ReinforceLearner
+from session_encoder import SessionEncoder
 from unity_instance import UnityInstance
 
 #region Statics
@@ -73,158 +74,62 @@ model = torch.nn.Sequential(
 learning_rate = 0.009
 optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate)
 
-scores = []
-
-def discount_rewards(rewards, gamma=0.99):
-    lenr = len(rewards)
-    disc_return = torch.pow(gamma,torch.arange(lenr).float()) * rewards
-    disc_return /= disc_return.max()
-    return disc_return
-
-def loss_fn(preds, r):
-    return -1 * torch.sum(r * torch.log(preds))
-
 #endregion Neural Net
 
 #region Initialization Data
 
-class CartPoleData:
-    def __init__(self):
-        self.wind_seed = np.random.randint(1, 1000)
-        self.initial_angle = (0.5 - np.random.rand()) * 2 * 5
+def create_sessions(count: int) -> Population:
+    """
+    Creates the initial conditions of count sessions: the seed of the wind and the initial angle of the pole.
+    """
+    sessions = Population(count, {"WindSeed": (np.int32, ()), "InitialAngle": (np.float64, ())})
+    sessions["WindSeed"] = np.random.randint(1, 1000, count)
+    sessions["InitialAngle"] = (0.5 - np.random.rand(count)) * 2 * 5
+    return sessions
 
-    def serialize(self):
-        return {"WindSeed": self.wind_seed,
-                "InitialAngle": self.initial_angle}
+# The sessions are the same every epoch, so they are only formatted once.
+SESSION_ENCODER = SessionEncoder({"WindSeed": "WindSeed", "InitialAngle": "InitialAngle"})
 
 #endregion InitializationData
 
-#region Running Simulation
-
-def execute_epoch(sessions, sim_inst: UnityInstance):
-    # Send the session initialization data.
-    serialize_v = np.vectorize(lambda c: json.dumps(c.serialize()))
-    serializations = serialize_v(sessions["Initial Condition"].to_numpy())
-    sim_inst.send_session_initialization_data(serializations)
-    sim_inst.end_send_session_initialization_data()
-    # Read the responses from the simulator and process them
-    # this includes starting new sessions, reporting the final
-    # scores of sessions, and data about the initial state of sessions.
-    read_simulator_responses(sessions, sim_inst)
-    # By now "sessions" is updated to have the true scores from the read_simulator_responses thread.
-    sorted_sessions = sessions.sort_values("Score", ascending=False)
-    print(f'Top Performers:\n{sorted_sessions.head(10)}')
+#region Brain Control
 
-    return sorted_sessions
+# The command of each action.
+ACTION_COMMANDS = [json.dumps({'MoveRight': bool(action == 0)}) for action in range(l3)]
 
+def extract_frame_data(data: dict) -> tuple[tuple, float]:
+    """
+    Turns frame data into the values to be fed to the NN.
+    Returns the score separately.
+    """
+    return (
+        data['CartPosition'],
+        data['CartVelocity'],
+        data['PoleAngle'],
+        data['PoleAngularVelocity']
+    ), data['Score']
+
+def score_episode(states, actions, rewards) -> float:
+    """
+    A session is scored with the number of steps it kept its pole up for.
+    """
+    return len(rewards)
 
-def read_simulator_responses(starting_conditions: pd.DataFrame, sim_inst: UnityInstance):
+# Runs the sessions with the model and learns from them (see cart_pole_training).
+trainer = CartPoleTrainer(model, optimizer, l1, SESSION_ENCODER, extract_frame_data, ACTION_COMMANDS, score_episode)
 
+def create_learner() -> ReinforceLearner:
     """
-    Mapping of session indexes to running brains. The brains take in simulation frame
-    data and output actions for the running simulations.
+    Creates the learner of the model (also called in the learner process with -learner_process).
     """
-    running_brains: dict = dict()
-
-    with tqdm(range(starting_conditions.shape[0])) as progress:
-        while True:
-            line = sim_inst.read_line()
-
-            if line is None:
-                break
-
-            line_split = line.split(" ")
-
-            # If there is a space, this is either a score that is being reported,
-            # or data about a frame that is being sent.
-            if len(line_split) > 1:
-                index = int(line_split[0])
-                score_parsed: bool = True
-                score: float
-                try:
-                    score = float(line_split[1])
-                except Exception as e:
-                    score_parsed = False
-
-                if score_parsed:
-                    starting_conditions.loc[index, "Score"] = score
-                    running_brains[index].on_session_end()
-                    del running_brains[index]
-                    progress.update(1)
-                else:
-                    brain: AgentBrain = running_brains[index]
-                    command = brain.process_frame_data(json.loads(line_split[1]))
-                    if not (command is None):
-                        to_write = f"{index} {command}"
-                        sim_inst.write_line(to_write)
-                        sim_inst.flush_pipe()
-            else:
-                # Otherwise, a session is starting execution.
-                index = int(line_split[0])
-                running_brains[index] = AgentBrain(starting_conditions.loc[index, "Initial Condition"], index)
+    return trainer.create_learner()
 
-#region Brain Control
+#endregion Brain Control
 
-class AgentBrain:
-    def __init__(self, session_initialization_data: CartPoleData, index: int):
-        self._session_init = session_initialization_data
-        self._session_index = index
-        self._data_count = 0
-
-        self.last_state_action = None
-        self.transitions = []
-
-    def process_frame_data(self, frame_data: dict) -> str:
-        """
-        Takes a json object sent specifically to this brain and
-        returns a command. If None is returned, no command should
-        be sent.
-        """
-        self._data_count += 1
-        input, score = AgentBrain._extract_frame_data(frame_data)
-
-        act_prob = model(torch.from_numpy(input).float())
-        action = np.random.choice(np.array([0, 1]), p=act_prob.data.numpy())
-
-        if not self.last_state_action is None:
-            self.transitions += [(self.last_state_action[0], self.last_state_action[1], score)]
-
-        self.last_state_action = input, action
-
-        return json.dumps({'MoveRight': bool(action == 0)})
-
-    @staticmethod
-    def _extract_frame_data(data: dict) -> tuple[np.ndarray, float]:
-        """
-        Turns frame data into an array to be fed to the NN.
-        Returns the score separately.
-        """
-        return np.array([
-            data['CartPosition'],
-            data['CartVelocity'],
-            data['PoleAngle'],
-            data['PoleAngularVelocity']
-        ]), data['Score']
-
-    def on_session_end(self):
-        """
-        When a session has ended, gather all the rewards, states, and actions, and perform
-        gradient descent.
-        """
-        ep_len = len(self.transitions)
-        scores.append(ep_len)
-        reward_batch = torch.Tensor([r for (s, a, r) in self.transitions]).flip(dims=(0,))
-        disc_returns = discount_rewards(reward_batch)
-        state_batch = torch.Tensor([s for (s, a, r) in self.transitions])
-        action_batch = torch.Tensor([a for (s, a, r) in self.transitions])
-        pred_batch = model(state_batch)
-        prob_batch = pred_batch.gather(dim=1, index=action_batch.long().view(-1, 1)).squeeze()
-        loss = loss_fn(prob_batch, disc_returns)
-        optimizer.zero_grad()
-        loss.backward()
-        optimizer.step()
+#region Running Simulation
 
-#endregion Brain Control
+def execute_epoch(sessions: Population, sim_inst: UnityInstance):
+    return trainer.execute_epoch(sessions, sim_inst)
 
 def save_onnx():
     """
@@ -250,7 +155,7 @@ def display_performance():
 
     for i in range(5):
         display_sim_inst.run_experiment('cart_pole')
-        execute_epoch(pd.DataFrame([[CartPoleData(), 0]], columns=["Initial Condition", "Score"]), display_sim_inst)
+        execute_epoch(create_sessions(1), display_sim_inst)
 
     display_sim_inst.quit()
 
@@ -258,38 +163,24 @@ def display_performance():
 
 
 if __name__ == "__main__":
-    # Parse Arguments
-    parser = argparse.ArgumentParser()
-    parser.add_argument("-t", help="if this flag is passed, don't run the Unity executable.", action="store_false")
-    parser.add_argument("-e", help="number of epochs that should be run.", type=int, default=1)
-    parser.add_argument("-display", help="if this flag is passed, display the agent's performance after training.", action="store_true")
-    parser.add_argument("-stats", help="what types of statistics to show.", type=int, default=0)
-    args = parser.parse_args()
+    # Parse Arguments (see cart_pole_training.create_argument_parser)
+    args = create_argument_parser().parse_args()
     RUN_EXECUTABLE = args.t
-    EPOCH_COUNT = args.e
     DISPLAY_PERFORMANCE = args.display
     STATS = args.stats
+    trainer.configure(args, create_learner)
 
     # Create the initial states of the sessions.
-    sessions = pd.DataFrame(columns=["Initial Condition", "Score"])
-    for i in range(1024):
-        sessions.loc[len(sessions.index)] = [CartPoleData(), 0]
-
-    if STATS > 0:
-        avg_performance_per_epoch = [0]
+    sessions = create_sessions(1024)
 
     exec_args = dict()
     exec_args["simulator_path"] = SIMULATOR_PATH
     exec_args["simulator_args"] = SIMULATOR_ARGS
-    sim_inst = UnityInstance(os.path.join(PIPE_PATH, PIPE_NAME), exec_args if RUN_EXECUTABLE else None,
-                              no_timeout=True)
+    sim_inst = create_training_simulator(args, PIPE_PATH, PIPE_NAME, exec_args)
 
-    for i in range(EPOCH_COUNT):
-        print(f"\nEpoch {i + 1}")
-        sim_inst.run_experiment("cart_pole")
-        execute_epoch(sessions, sim_inst)
-        if STATS > 0:
-            avg_performance_per_epoch.append(np.mean(sessions.head(10)["Score"]))
+    performance_per_epoch = run_epochs(trainer, sim_inst, "cart_pole", sessions, args)
+    if STATS > 0:
+        avg_performance_per_epoch = [0] + performance_per_epoch
 
     sim_inst.quit()
 
@@ -300,7 +191,7 @@ if __name__ == "__main__":
         plt.title(f"Performance over Epochs")
         plt.ylabel(f"Score")
         plt.xlabel(f"Epoch (first epoch at 1)")
-        plt.plot(np.arange(1, 1024 + 1, 1), scores)
+        plt.plot(np.arange(1, 1024 + 1, 1), trainer.scores)
         ax.grid()
 
         plt.show()
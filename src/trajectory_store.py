@@ -0,0 +1,154 @@
+"""
+@author William Erignac
+@version 2026-10-16
+
+This script contains the TrajectoryStore, which holds the states, actions and rewards of the running sessions of the
+training scripts in a few contiguous arrays, instead of in lists of tuples and arrays per brain.
+
+Each session has a segment of the arrays, which is moved to a segment twice as large at the end of the arrays when it
+fills up (the arrays themselves double in size when needed), so appending a step is amortized constant time. The frames
+of a physics step are added for every session at once, and a finished session's steps are returned as views of the
+arrays (torch.from_numpy turns them into tensors without copying). Segments are only reused after clear, so episodes
+handed to a learner stay valid until then.
+"""
+
+import numpy as np
+
+
+class TrajectoryStore:
+    """
+    The steps of sessions, indexed by session index. A step is a state, the action chosen for it, and the reward (the
+    score of the next frame of the session).
+    """
+    def __init__(self, observation_count: int, compact: bool = False, initial_steps: int = 64,
+                 initial_capacity: int = 65536):
+        """
+        observation_count = number of values of each state.
+        compact = if True, keep states as float16 instead of float32 (halving their memory, at the cost of precision).
+        initial_steps = number of steps each session has room for before its segment is moved.
+        initial_capacity = number of steps the arrays have room for before they are reallocated.
+        """
+        self.observation_count = observation_count
+        self.initial_steps = initial_steps
+        self.state_dtype = np.float16 if compact else np.float32
+
+        self._states = np.empty((initial_capacity, observation_count), dtype=self.state_dtype)
+        self._actions = np.empty(initial_capacity, dtype=np.int8)
+        self._rewards = np.empty(initial_capacity, dtype=np.float32)
+        # The end of the last segment allocated.
+        self._end = 0
+
+        # The segment of each session (by session index), and the state and action of its last frame (whose reward is
+        # only known at the next frame).
+        self._starts = np.zeros(0, dtype=np.int64)
+        self._capacities = np.zeros(0, dtype=np.int64)
+        self._lengths = np.zeros(0, dtype=np.int64)
+        self._last_states = np.zeros((0, observation_count), dtype=np.float32)
+        self._last_actions = np.zeros(0, dtype=np.int8)
+        self._has_last = np.zeros(0, dtype=bool)
+
+        self.segments_moved = 0
+        self.reallocations = 0
+
+    def start_session(self, index: int):
+        """
+        Gives the session a new, empty segment.
+        """
+        if index >= len(self._starts):
+            self._grow_sessions(index + 1)
+
+        self._starts[index] = self._allocate(self.initial_steps)
+        self._capacities[index] = self.initial_steps
+        self._lengths[index] = 0
+        self._has_last[index] = False
+
+    def add_frames(self, indices: np.ndarray, states: np.ndarray, actions: np.ndarray, scores: np.ndarray):
+        """
+        Adds a frame for each session of indices (each at most once): the state, the action chosen for it, and the
+        score of the frame, which is the reward of the session's previous step.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        previous = self._has_last[indices]
+        stepped = indices[previous]
+
+        if len(stepped) > 0:
+            for index in stepped[self._lengths[stepped] == self._capacities[stepped]].tolist():
+                self._move_segment(index)
+
+            positions = self._starts[stepped] + self._lengths[stepped]
+            self._states[positions] = self._last_states[stepped]
+            self._actions[positions] = self._last_actions[stepped]
+            self._rewards[positions] = np.asarray(scores, dtype=np.float32)[previous]
+            self._lengths[stepped] += 1
+
+        self._last_states[indices] = states
+        self._last_actions[indices] = actions
+        self._has_last[indices] = True
+
+    def get_length(self, index: int) -> int:
+        return int(self._lengths[index])
+
+    def get_episode(self, index: int) -> tuple:
+        """
+        Returns views of the states, actions and rewards of the session's steps. They are only valid until clear, and
+        until the session is given more steps.
+        """
+        start = int(self._starts[index])
+        end = start + int(self._lengths[index])
+        return self._states[start:end], self._actions[start:end], self._rewards[start:end]
+
+    def clear(self):
+        """
+        Forgets every session, so their segments can be reused. Episodes returned before are no longer valid.
+        """
+        self._end = 0
+        self._lengths[:] = 0
+        self._has_last[:] = False
+
+    def get_stats(self) -> dict:
+        return {"steps_allocated": self._end,
+                "capacity": len(self._rewards),
+                "segments_moved": self.segments_moved,
+                "reallocations": self.reallocations}
+
+    def _allocate(self, steps: int) -> int:
+        """
+        Returns the start of a new segment of steps, reallocating the arrays if they don't have room for it.
+        """
+        if self._end + steps > len(self._rewards):
+            capacity = max(2 * len(self._rewards), self._end + steps)
+            # New arrays are allocated (instead of resizing in place), so views given out before stay valid.
+            for name in ("_states", "_actions", "_rewards"):
+                old = getattr(self, name)
+                new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+                new[:self._end] = old[:self._end]
+                setattr(self, name, new)
+            self.reallocations += 1
+
+        start = self._end
+        self._end += steps
+        return start
+
+    def _move_segment(self, index: int):
+        """
+        Moves a full segment to a new segment twice its size.
+        """
+        start, length = int(self._starts[index]), int(self._lengths[index])
+        capacity = 2 * int(self._capacities[index])
+        new_start = self._allocate(capacity)
+        for array in (self._states, self._actions, self._rewards):
+            array[new_start:new_start + length] = array[start:start + length]
+        self._starts[index] = new_start
+        self._capacities[index] = capacity
+        self.segments_moved += 1
+
+    def _grow_sessions(self, count: int):
+        count = max(count, 2 * len(self._starts))
+        grown = count - len(self._starts)
+        self._starts = np.concatenate((self._starts, np.zeros(grown, dtype=np.int64)))
+        self._capacities = np.concatenate((self._capacities, np.zeros(grown, dtype=np.int64)))
+        self._lengths = np.concatenate((self._lengths, np.zeros(grown, dtype=np.int64)))
+        self._last_states = np.concatenate((self._last_states,
+                                            np.zeros((grown, self.observation_count), dtype=np.float32)))
+        self._last_actions = np.concatenate((self._last_actions, np.zeros(grown, dtype=np.int8)))
+        self._has_last = np.concatenate((self._has_last, np.zeros(grown, dtype=bool)))
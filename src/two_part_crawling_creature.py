@@ -5,15 +5,18 @@
 This script runs an in-progress two-part crawling creature experiment in Unity.
 """
 import argparse
-import json
 import os
 import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
 
 import multiprocessing
 
-from unity_instance import UnityInstance
+from binary_protocol import MessageType
+from instance_metrics import MetricsExporter, diff_snapshots, format_summary
+from population import Population
+from session_encoder import Constant, SessionEncoder
+from unity_instance import Message, MessageDecoder, UnityInstance
+from unity_instance_pool import create_simulator
 
 #region Statics
 
@@ -27,120 +30,91 @@ CREATURE_PIPE_PREFIX = "Pipe"
 
 #region Initialization Data
 
-class VectorData:
-    def __init__(self, values: tuple = None):
-        self.values = np.random.random(3) if values is None else values
+# The parts of a crawler, and the vectors describing each part. Each vector of each part is a column of the
+# population (e.g. "First.Size").
+PARTS = ("First", "Second")
+PART_VECTORS = ("Size", "Rotation", "ConnectionPoint")
 
-    def serialize(self):
-        return {"x": self.values[0], "y": self.values[1], "z": self.values[2]}
+
+def create_organisms(count: int) -> Population:
+    """
+    Creates count crawlers with random parts.
+    """
+    organisms = Population(count, {f"{part}.{vector}": (np.float64, (3,)) for part in PARTS for vector in PART_VECTORS})
+    for part in PARTS:
+        organisms[f"{part}.Size"] = np.random.random((count, 3))
+        organisms[f"{part}.Rotation"] = np.random.random((count, 3)) * 360  # Convert random axes from 0-1 to 0-360
+        organisms[f"{part}.ConnectionPoint"] = np.random.random((count, 3))
+    return organisms
 
 
-class PartData:
-    def __init__(self, size: tuple = None, rotation: tuple = None, connection_point: tuple = None):
-        self.size = VectorData(size)
-        self.rotation = VectorData(rotation)
-        if rotation is None:  # Convert random axes from 0-1 to 0-360
-            self.rotation.values *= 360
-        self.connection_point = VectorData(connection_point)
+def vector_layout(column: str) -> dict:
+    return {"x": (column, 0), "y": (column, 1), "z": (column, 2)}
 
-    def serialize(self):
-        return {"Size": self.size.serialize(),
-                "Rotation": self.rotation.serialize(),
-                "ConnectionPoint": self.connection_point.serialize()}
 
+CRAWLER_ENCODER = SessionEncoder({**{part: {vector: vector_layout(f"{part}.{vector}") for vector in PART_VECTORS}
+                                     for part in PARTS},
+                                  "PipeName": Constant("")})
 
-class CrawlerData:
-    def __init__(self, first: tuple = (), second: tuple = (), pipe_name=""):
-        self.first = PartData(*first)
-        self.second = PartData(*second)
-        self.pipe_name = pipe_name
 
-    def serialize(self):
-        return {"First": self.first.serialize(),
-                "Second": self.second.serialize(),
-                "PipeName": self.pipe_name}
+def serialize_organisms(organisms: Population) -> list:
+    return CRAWLER_ENCODER.encode(organisms)
 
 #endregion InitializationData
 
 #region Running Simulation
 
-def execute_epoch(organisms, sim_inst: UnityInstance):
-    # Send the creature initialization data.
-    serialize_v = np.vectorize(lambda c: json.dumps(c.serialize()))
-    serializations = serialize_v(organisms["Creature"].to_numpy())
-    sim_inst.send_session_initialization_data(serializations)
-    sim_inst.end_send_session_initialization_data()
+def execute_epoch(organisms: Population, sim_inst: UnityInstance):
+    metrics = sim_inst.get_metrics()
+    # Send the creature initialization data while the responses are read.
+    sim_inst.submit_sessions(serialize_organisms(organisms))
     # Read the responses from the simulator and process them
     # this includes starting new creatures, reporting the final
     # scores of creatures, and data about the initial state of creatures.
-    read_simulator_responses(organisms, sim_inst)
+    # Commands are batched and written once every frame of a physics step has been read.
+    sim_inst.begin_batch()
+    try:
+        read_simulator_responses(organisms, sim_inst)
+    finally:
+        sim_inst.commit()
     # By now "organisms" is updated to have the true scores from the read_simulator_responses thread.
-    sorted_organisms = organisms.sort_values("Score", ascending=False)
-    print(f'Top Performers:\n{sorted_organisms.head(10)}')
+    print(f'Top Performers:\n{organisms.top(10).to_dataframe()}')
+    print(f"Pipe: {format_summary(diff_snapshots(metrics, sim_inst.get_metrics()))}")
 
-    return sorted_organisms
+    return organisms.sorted()
 
 
-def read_simulator_responses(organisms: pd.DataFrame, sim_inst: UnityInstance):
+def read_simulator_responses(organisms: Population, sim_inst: UnityInstance):
 
     """
     Mapping of creature indexes to running brains. The brains take in simulation frame
     data and create outputs for the running creature simulations.
     """
     running_brains: dict = dict()
+    decoder = MessageDecoder()
+
+    def on_start(message: Message):
+        running_brains[message.index] = CreatureBrain(organisms.get_member(message.index), message.index)
+
+    def on_frame(message: Message):
+        command = running_brains[message.index].process_frame_data(message.data)
+        if not (command is None):
+            sim_inst.write_line(f"{message.index} {command}")
 
-    # TODO: Remove
-    # has_sent: bool = False
-
-    while True:
-        line = sim_inst.read_line()
-
-        if line is None:
-            break
-
-        line_split = line.split(" ")
-
-        # If there is a space, this is either a score that is being reported,
-        # or data about a frame that is being sent.
-        if len(line_split) > 1:
-            index = int(line_split[0])
-            score_parsed: bool = True
-            score: float
-            try:
-                score = float(line_split[1])
-            except Exception as e:
-                score_parsed = False
-
-            if score_parsed:
-                organisms.loc[index, "Score"] = score
-                del running_brains[index]
-                #print(f"\tCreature {index} ended")
-            else:
-                brain: CreatureBrain = running_brains[index]
-                command = brain.process_frame_data(json.loads(line_split[1]))
-                if not (command is None):
-                    to_write = f"{index} {command}"
-                    sim_inst.write_line(to_write)
-                    sim_inst.flush_pipe()
-        else:
-            # Otherwise, a creature is starting execution.
-            index = int(line_split[0])
-            #print(f"\tCreature {index} started")
-            running_brains[index] = CreatureBrain(organisms.loc[index, "Creature"], index)
-            """
-            if not has_sent:
-                sim_inst.write_line("0 {}\n1 {}\n2 {}\n3 {}\n4 {}\n5 {}\n6 {}\n7 {}\n8 {}\n9 {}\n10 {}\n11 {}\n12 {}\n13 {}\n14 {}\n15 {}\n"*500)
-                sim_inst.flush_pipe()
-                has_sent = True
-                """
+    def on_score(message: Message):
+        del running_brains[message.index]
+
+    decoder.dispatch(sim_inst, {MessageType.START: on_start,
+                                MessageType.FRAME: on_frame,
+                                MessageType.SCORE: on_score})
+
+    score_indices, scores = decoder.get_scores()
+    organisms.set_scores(score_indices, scores)
 
 #region Brain Control
 
 class CreatureBrain:
-    def __init__(self, creature: CrawlerData, index: int):
-        """
-        TODO: embed index into CrawlerData (and don't include in json).
-        """
+    def __init__(self, creature: dict, index: int):
         self._creature = creature
         self._creature_index = index
         self._unity_creature_data = None
@@ -176,16 +150,18 @@ if __name__ == "__main__":
     parser.add_argument("-e", help="number of epochs that should be run.", type=int, default=1)
     parser.add_argument("-display", help="if this flag is passed, display the best performers.", action="store_true")
     parser.add_argument("-stats", help="what types of statistics to show.", type=int, default=0)
+    parser.add_argument("-instances", help="number of simulator instances to split the sessions across.", type=int, default=1)
+    parser.add_argument("-metrics", help="file to export the metrics of the simulator instances to periodically (Prometheus text format if it ends with .prom, json lines otherwise).", type=str, default=None)
+    parser.add_argument("-metrics_interval", help="seconds between exports of the metrics with -metrics.", type=float, default=10.0)
     args = parser.parse_args()
     RUN_EXECUTABLE = args.t
     EPOCH_COUNT = args.e
     DISPLAY_BEST_PERFORMERS = args.display
     STATS = args.stats
+    INSTANCE_COUNT = args.instances
 
     # Create an initial population
-    organisms = pd.DataFrame(columns=["Creature", "Score"])
-    for i in range(256):
-        organisms.loc[len(organisms.index)] = [CrawlerData(), 0]
+    organisms = create_organisms(256)
 
     if DISPLAY_BEST_PERFORMERS:
         best_performers = []
@@ -196,18 +172,25 @@ if __name__ == "__main__":
     exec_args = dict()
     exec_args["simulator_path"] = SIMULATOR_PATH
     exec_args["simulator_args"] = SIMULATOR_ARGS
-    sim_inst = UnityInstance(os.path.join(PIPE_PATH, PIPE_NAME), exec_args if RUN_EXECUTABLE else None,
-                              no_timeout=True)
+    sim_inst = create_simulator(PIPE_PATH, PIPE_NAME, exec_args if RUN_EXECUTABLE else None, INSTANCE_COUNT,
+                                no_timeout=True)
+
+    exporter = None
+    if not (args.metrics is None):
+        exporter = MetricsExporter(sim_inst, args.metrics, args.metrics_interval)
+        exporter.start()
 
     for i in range(EPOCH_COUNT):
         print(f"\nEpoch {i + 1}")
         sim_inst.run_experiment("crawl")
         execute_epoch(organisms, sim_inst)
         if DISPLAY_BEST_PERFORMERS:
-            best_performers.append(organisms.head(1)["Creature"][0])
+            best_performers.append(organisms.get_member(organisms.top_k(1)[0]))
         if STATS > 0:
-            avg_performance_per_epoch.append(np.mean(organisms.head(10)["Score"]))
+            avg_performance_per_epoch.append(np.mean(organisms.scores[:10]))
 
+    if not (exporter is None):
+        exporter.stop()
     sim_inst.quit()
 
     if DISPLAY_BEST_PERFORMERS:
@@ -7,12 +7,30 @@ The Unity project must be set up with a set of classes of its own. For details,
 UnityRLEnvironment.
 """
 
+import json
 import threading
+import time
+from array import array
+from collections import deque
 from enum import Enum
-import win32file, win32pipe, win32event, pywintypes
+from functools import partial
+from itertools import islice
 import subprocess
+from typing import NamedTuple
 import warnings
 
+from binary_protocol import BINARY_MODE_ARGUMENT, MessageType, Record, pack_record, unpack_values
+from instance_metrics import InstanceMetrics
+from line_framer import LineFramer
+from line_writer import LineWriter
+from pipe_transport import Transport, create_transport
+from recording_transport import RecordingTransport
+from tracing import TRACER
+
+# The first characters of the json sent with frames.
+_FRAME_STARTS = "{["
+_FRAME_PREFIXES = tuple(_FRAME_STARTS)
+
 
 class SimulationTaskType(Enum):
     """
@@ -24,25 +42,133 @@ class SimulationTaskType(Enum):
     QUIT = -1
 
 
+class ConnectionReader:
+    """
+    The thread reading everything a simulator sends over a transport, for as long as the connection is open. What it
+    reads is framed by one LineFramer and routed to the task set with set_task (the current task of the UnityInstance),
+    whose state machine decides what goes in its read buffer and when it is finished.
+
+    The reader only waits for the simulator while the current task expects something from it. Messages read after the
+    end of a task (e.g. along with its END) are kept for the next task: lines in held_lines, and records or a partial
+    line in the framer.
+    """
+    def __init__(self, transport: Transport, metrics: InstanceMetrics = None):
+        self.transport = transport
+        self.metrics = InstanceMetrics() if metrics is None else metrics
+        self.framer = LineFramer(transport.line_delimiter)
+        # Protects the framer, the current task and its read buffer. Shared with the tasks as their read_lock.
+        self.lock = threading.Lock()
+        # Notified (with lock held) when messages were routed, the task changed or the reader stopped.
+        self.changed = threading.Condition(self.lock)
+        self.task = None
+        # Lines read after the end of a task, for the next one.
+        self.held_lines = deque()
+        # Set if the connection failed. Re-raised by the read_line of every task from then on.
+        self.exception = None
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run, name="ConnectionReader", daemon=True)
+        self._thread.start()
+
+    def set_task(self, task):
+        """
+        Routes what is read from now on to task, starting with the messages held for it. Call before writing the
+        command that task answers.
+        """
+        with self.lock:
+            if task._get_finished_pipe_reading():
+                pass
+            elif not (self.exception is None):
+                task._read_exception = self.exception
+            else:
+                while len(self.held_lines) > 0 and not task._get_finished_pipe_reading():
+                    self._route(task, task._add_line_to_buffer, self.held_lines.popleft())
+                self._route(task, task._add_messages_to_buffer, self.framer)
+            # Only set once the framer is routed, as the reader checks the task without the lock.
+            self.task = task
+            self.changed.notify_all()
+
+    def close(self):
+        """
+        Stops the reader once it has nothing left to read (call before closing the transport).
+        """
+        with self.lock:
+            self._closed = True
+            self.changed.notify_all()
+
+    def _run(self):
+        try:
+            while True:
+                # Only read while the current task expects something, so nothing blocks on the simulator between
+                # tasks. The task only changes once it is finished, so it is checked without the lock until then.
+                task = self.task
+                if task is None or task._get_finished_pipe_reading():
+                    with self.lock:
+                        while self.task is None or self.task._get_finished_pipe_reading():
+                            if self._closed:
+                                return
+                            self.changed.wait()
+                    continue
+
+                bytes_read = self.transport.read_into(self.framer.get_read_view())
+                self.metrics.bytes_in += bytes_read
+
+                with self.lock, TRACER.span("frame_messages", bytes=bytes_read):
+                    self.framer.commit(bytes_read)
+                    self._route(task, task._add_messages_to_buffer, self.framer)
+                    # Wake up any readers now that a batch of messages has arrived.
+                    self.changed.notify_all()
+        except Exception as e:
+            with self.lock:
+                self.exception = e
+                if not (self.task is None):
+                    self.task._read_exception = e
+                # Wake up read_line so that it can raise the exception.
+                self.changed.notify_all()
+
+    def _route(self, task, add, messages):
+        """
+        Calls add (a method of task adding messages to its buffer) on messages. Called with lock held. An exception
+        raised by the task (e.g. for an error from the simulator) is raised by its read_line.
+        """
+        depth = len(task.read_buffer)
+        try:
+            add(messages)
+        except Exception as e:
+            task._read_exception = e
+        self.metrics.messages_in += len(task.read_buffer) - depth
+        if len(task.read_buffer) > self.metrics.max_read_buffer_depth:
+            self.metrics.max_read_buffer_depth = len(task.read_buffer)
+
+
 class SimulationTask:
     """
     An object introducing different ways of interacting with Unity depending on what state it's in.
     This class is inherited for each SimulationTaskType.
     The base class implements functions for basic communication.
     """
-    def __init__(self, pipe_handle, overlap, **kwargs):
-        self.pipe_handle = pipe_handle
-        self.read_thread = threading.Thread(target=self._read_content)
-        self.read_lock = threading.Lock()
-        # Triggered when some data was read.
-        self._read_block_thread_event = threading.Event()
-        # Object to handle asynchronous events.
-        self._overlap = overlap
-
-
-        # Lines of the pipe read but not sent to user.
+    def __init__(self, transport: Transport, writer: LineWriter, metrics: InstanceMetrics = None,
+                 reader: ConnectionReader = None, **kwargs):
+        """
+        writer = the LineWriter of the transport, or None if the task is only used to track the simulator's state
+        (see AsyncUnityInstance), in which case nothing can be written with the task.
+        reader = the ConnectionReader of the transport, which adds what it reads to the read buffer once this task
+        is set as its task. Without one, lines must be added with _add_line_to_buffer (see AsyncUnityInstance).
+        """
+        self.transport = transport
+        self.writer = writer
+        # Updated with what the task reads (see instance_metrics). Usually those of the UnityInstance.
+        self.metrics = InstanceMetrics() if metrics is None else metrics
+        self.reader = reader
+        self.read_lock = threading.Lock() if reader is None else reader.lock
+        # Notified (with read_lock held) when complete lines were read or the reader stopped.
+        self._line_available = threading.Condition(self.read_lock) if reader is None else reader.changed
+        # Set if the reader failed or the task raised while handling a message. Re-raised by read_line.
+        self._read_exception = None
+
+        # Complete lines of the pipe read but not sent to user.
         # Warnings and errors are not included in here.
-        self.read_buffer = []
+        self.read_buffer = deque()
 
         # Extra parameters send by simulation instance. e.g. no_timeout
         self.meta_args = kwargs
@@ -61,7 +187,7 @@ class SimulationTask:
 
     def _on_read_line_from_pipe(self, line: str):
         """
-        Called on reading thread when a full line with "\r\n" is finished being read
+        Called on reading thread when a full line with the line delimiter is finished being read
         from the pipe.
         Returns whether the line should be added to the buffer.
 
@@ -69,6 +195,7 @@ class SimulationTask:
         """
         # Check for warnings and print them.
         if line.startswith("Warning:"):
+            self.metrics.warnings += 1
             tabbed_line = line.replace('\n', '\n\t')
             warnings.warn(f"Got warning from simulator: \n\t{tabbed_line}")
             return False
@@ -78,126 +205,119 @@ class SimulationTask:
             raise Exception(f"Got error from simulator: {tabbed_line}")
         return True
 
-    def _is_line_finished(self, line):
+    def _set_exception(self, exception: Exception):
         """
-        Static function for seeing if a line is complete.
+        Makes read_line raise exception (e.g. one raised on the submit thread).
         """
-        return line.endswith("\r\n")
+        with self.read_lock:
+            self._read_exception = exception
+            # Wake up read_line so that it can raise the exception.
+            self._line_available.notify_all()
 
-    def _read_content(self):
-        """
-        Function that runs on the read thread. Finishes when self._get_finished_pipe_reading()
-        returns false.
+    def _add_messages_to_buffer(self, framer: LineFramer):
         """
+        Adds every complete message in the framer to the buffer. Called with read_lock held.
 
-        # While we haven't determined that this task is done, keep reading.
-        while not self._get_finished_pipe_reading():
-            # Allow read_line to block.
-            self._read_block_thread_event.clear()
-
-            # TODO: Check state of pipe
-            # Read from pipe
-            # https://stackoverflow.com/questions/57833774/python-pywintypes-overlapped-offset-throws-overflowerror
-            ret, read_message = win32file.ReadFile(self.pipe_handle, 1024, self._overlap)
-            bytes_read = win32file.GetOverlappedResult(self.pipe_handle, self._overlap, True)
-            read_message = bytes(read_message[:bytes_read])
-            if len(read_message) == 0:
-                continue
-
-            read_lines = read_message.decode().split("\r\n")
-
-            self.read_lock.acquire()
-
-            # If the newest line in the read buffer didn't finish, append to it.
-            if len(self.read_buffer) > 0:
-                last_line = self.read_buffer[-1]
-                if not self._is_line_finished(last_line):
-                    combined = last_line + read_lines.pop(0)
-                    combined_split = combined.split("\r\n")
-                    self.read_buffer[-1] = combined_split[0]
-                    if len(combined_split) > 1:
-                        self._add_partial_line_to_buffer(combined_split[1])
-
-            # For each partial line, end the last line and add the partial line to the read_buffer.
-            # If the message read ends on a newline, read_lines will have an extra empty
-            # string at the end, marking the last line sa being complete.
-            for line in read_lines:
-                self._add_partial_line_to_buffer(line)
-
-            self.read_lock.release()
-            # Signal that we just finished reading some lines.
-            self._read_block_thread_event.set()
-
-    def _add_partial_line_to_buffer(self, partial_line):
-        # Set the last line as a complete line.
-        if len(self.read_buffer) > 0:
-            self.read_buffer[-1] += "\r\n"
-            keep = self._on_read_line_from_pipe(self.read_buffer[-1][:-2])
-            if not keep:
-                self.read_buffer.pop(-1)
-        # Add the new line if appropriate.
-        if len(partial_line) > 0:
-            if self._get_finished_pipe_reading():
-                warnings.warn(f'Received partial line "{partial_line}", after task was complete. Not adding to buffer.')
-            else:
-                self.read_buffer.append(partial_line)
-
-    def _start_read_thread(self):
-        # Run the read thread if we haven't already.
-        if not (self.read_thread.is_alive() or self._get_finished_pipe_reading()):
-            self.read_thread.start()
+        Overridden by tasks that can receive something other than lines.
+        """
+        for line in framer.lines():
+            self._add_line_to_buffer(line)
 
-    def read_line(self, timeout=10.0, wait_step=0.5):
+    def _add_line_to_buffer(self, line):
+        """
+        Adds a complete line to the buffer if appropriate. Called with read_lock held.
         """
-        Returns a line written by the simulator. Blocks.
+        if self._get_finished_pipe_reading():
+            if not (self.reader is None):
+                # Read along with the end of this task, so it is for the next one.
+                self.reader.held_lines.append(line)
+                return
+            self.metrics.warnings += 1
+            warnings.warn(f'Received line "{line}", after task was complete. Not adding to buffer.')
+            return
+
+        if self._on_read_line_from_pipe(line):
+            self.read_buffer.append(line)
+
+    def read_line(self, timeout=10.0):
+        """
+        Returns a line written by the simulator. Blocks until a complete line has been read,
+        or until timeout seconds have passed (never if timeout < 0 or no_timeout is set).
         Returns None if the simulator has reported that it has finished.
         """
+        deadline = None
+        if timeout >= 0 and not self.get_meta_arg("no_timeout"):
+            deadline = time.monotonic() + timeout
+        # When the buffer was first found empty.
+        wait_start = None
+
+        with self.read_lock:
+            while True:
+                # Get the oldest complete line from the buffer if there is one. Lines read before the reader failed
+                # (e.g. before the simulator closed the connection) are returned before the exception is raised.
+                if len(self.read_buffer) > 0:
+                    if not (wait_start is None):
+                        self._on_waited(wait_start)
+                    return self.read_buffer.popleft()
+
+                if not (self._read_exception is None):
+                    raise self._read_exception
+
+                # If we've received the end, we're out of lines.
+                if self._get_finished_pipe_reading():
+                    if not (wait_start is None):
+                        self._on_waited(wait_start)
+                    return None
+
+                if wait_start is None:
+                    wait_start = time.perf_counter()
+
+                # Send any batched writes before waiting; the simulator might be waiting on them.
+                # Written without read_lock so that the reader can keep reading meanwhile.
+                if not (self.writer is None) and self.writer.has_pending():
+                    self.read_lock.release()
+                    try:
+                        self.writer.write_pending()
+                    finally:
+                        self.read_lock.acquire()
+                    continue
+
+                if deadline is None:
+                    self._line_available.wait()
+                elif not self._line_available.wait(deadline - time.monotonic()):
+                    raise Exception(f"Timeout for {timeout} seconds when reading line.")
+
+    def _on_waited(self, wait_start: float):
+        """
+        Records how long read_line waited for the simulator. Called with read_lock held.
+        """
+        end = time.perf_counter()
+        self.metrics.read_wait.observe(end - wait_start)
+        TRACER.complete("read_wait", wait_start, end)
 
-        self.read_lock.acquire()
-
-        # If we've received the end, we're out of lines.
-        if len(self.read_buffer) == 0 and self._get_finished_pipe_reading():
-            self.read_lock.release()
+    def read_lines(self, timeout=10.0):
+        """
+        Returns every line already read from the simulator, waiting for one like read_line if there are none.
+        Returns None if the simulator has reported that it has finished.
+        """
+        line = self.read_line(timeout)
+        if line is None:
             return None
 
-        # Get the oldest complete line from the buffer if there is one.
-        buffer_has_line = len(self.read_buffer) > 0 and self._is_line_finished(self.read_buffer[0])
-        if buffer_has_line:
-            out = self.read_buffer.pop(0)[:-2]
-            self.read_lock.release()
-            return out
-
-        # Run the read thread if we haven't already.
-        if not (self.read_thread.is_alive() or self._get_finished_pipe_reading()):
-            self._start_read_thread()
-
-        self.read_lock.release()
-        wait_time = 0
-
-        # Polling for next line. Need to poll in case event is triggered after
-        # lock release but before this line.
-        while True:
-            self._read_block_thread_event.wait(wait_step)
-            self.read_lock.acquire()
-            received_line = len(self.read_buffer) > 0 and self._is_line_finished(self.read_buffer[0])
-            missed_end = self._get_finished_pipe_reading()
-            self.read_lock.release()
-            if received_line or missed_end:
-                break
-            wait_time += wait_step
-            if (wait_time > timeout) and (timeout >= 0) and not self.get_meta_arg("no_timeout"):
-                raise Exception(f"Timeout for {timeout} seconds when reading line.")
-
-        return self.read_line()
+        with self.read_lock:
+            lines = [line]
+            lines.extend(self.read_buffer)
+            self.read_buffer.clear()
+        return lines
 
     def write_line(self, to_write):
-        # TODO: Check state of pipe
-        ret, length = win32file.WriteFile(self.pipe_handle, f"{to_write}\n".encode())
-        # TODO: Check ret and length
+        self.writer.write_line(to_write)
+
+    def write_record(self, message_type: MessageType, index: int, values):
+        self.writer.write_bytes(pack_record(message_type, index, values))
 
     def flush(self):
-        # TODO: Check state of pipe
-        win32file.FlushFileBuffers(self.pipe_handle)
+        self.writer.flush()
 
     def get_meta_arg(self, arg_name: str):
         if arg_name in self.meta_args:
@@ -212,6 +332,10 @@ class IdleTask(SimulationTask):
     def get_task_type(self):
         return SimulationTaskType.IDLE
 
+    def _get_finished_pipe_reading(self):
+        # Nothing is expected from the simulator.
+        return True
+
 
 class ExperimentTask(SimulationTask):
     """
@@ -219,14 +343,21 @@ class ExperimentTask(SimulationTask):
     Otherwise, includes methods for running experiments, and waiting for an acknowledgement that an experiment environment
     has been opened.
     """
-    def __init__(self, pipe_handle, overlap, experiment_name, **kwargs):
-        SimulationTask.__init__(self, pipe_handle, overlap, **kwargs)
+    def __init__(self, transport: Transport, writer: LineWriter, experiment_name, request_binary=False, **kwargs):
+        SimulationTask.__init__(self, transport, writer, **kwargs)
         # Whether we've signaled the end to the list of simulation session initialization data.
         self.has_sent_end = False
         # Whether we've received the signal that all the simulation sessions have been run.
         self.has_received_end = False
         # Type of experiment to run. Disambiguated by Unity simulation settings.
         self.experiment_name = experiment_name
+        # Whether to ask the simulator to send frames and receive commands as binary records (see binary_protocol).
+        self.request_binary = request_binary
+        # Whether the simulator has answered the run command, and whether it accepted binary mode.
+        self.has_received_run_response = False
+        self.is_binary = False
+        # Writes the sessions given to submit_sessions.
+        self.submit_thread = None
 
     def get_task_type(self):
         return SimulationTaskType.SIMULATING
@@ -237,6 +368,39 @@ class ExperimentTask(SimulationTask):
     def get_has_sent_end(self):
         return self.has_sent_end
 
+    def submit_sessions(self, session_init_data, chunk_size: int):
+        """
+        Starts writing session_init_data followed by END on the submit thread.
+        """
+        self.on_has_sent_end()
+        self.submit_thread = threading.Thread(target=self._submit_sessions, args=[iter(session_init_data), chunk_size])
+        self.submit_thread.start()
+
+    def _submit_sessions(self, session_init_data, chunk_size: int):
+        """
+        Runs on the submit thread. Takes chunk_size sessions at a time from session_init_data and writes them, so
+        sessions are only generated as fast as the simulator reads them.
+        """
+        try:
+            while True:
+                chunk = list(islice(session_init_data, chunk_size))
+                if len(chunk) == 0:
+                    break
+                # Written right away, even if the reader is batching commands.
+                self.writer.write_lines(chunk)
+                self.writer.write_pending()
+
+            self.write_line("END")
+            self.writer.write_pending()
+            self.flush()
+        except Exception as e:
+            self._set_exception(e)
+
+    def wait_for_submit(self):
+        if not (self.submit_thread is None):
+            self.submit_thread.join()
+            self.submit_thread = None
+
     def _on_read_line_from_pipe(self, line):
         if not SimulationTask._on_read_line_from_pipe(self, line):
             return False
@@ -245,28 +409,74 @@ class ExperimentTask(SimulationTask):
             self.has_received_end = True
             return False
 
+        if not self.has_received_run_response:
+            self.has_received_run_response = True
+            self.is_binary = self.request_binary and line == f"SUCCESS {BINARY_MODE_ARGUMENT}"
+            return True
+
+        # Count the sessions started (<index>) and scored (<index> <score>) for the metrics.
+        space = line.find(" ")
+        if space < 0:
+            self.metrics.sessions_started += 1
+        elif not line.startswith(_FRAME_PREFIXES, space + 1):
+            self.metrics.sessions_scored += 1
         return True
 
+    def _add_messages_to_buffer(self, framer: LineFramer):
+        if not self.request_binary or (self.has_received_run_response and not self.is_binary):
+            SimulationTask._add_messages_to_buffer(self, framer)
+            return
+
+        # Everything after the response to the run command could be records, so frame one message at a time.
+        while not self._get_finished_pipe_reading():
+            if self.is_binary:
+                record = framer.next_record()
+                if record is None:
+                    return
+                self._add_record_to_buffer(record)
+            else:
+                line = framer.next_line()
+                if line is None:
+                    return
+                self._add_line_to_buffer(line)
+
+    def _add_record_to_buffer(self, record: Record):
+        """
+        Adds a record read in binary mode to the buffer. Text records are handled like lines.
+        """
+        if record.type == MessageType.TEXT:
+            self._add_line_to_buffer(record.payload.decode())
+        elif record.type == MessageType.END:
+            self.has_received_end = True
+        else:
+            if record.type == MessageType.START:
+                self.metrics.sessions_started += 1
+            elif record.type == MessageType.SCORE:
+                self.metrics.sessions_scored += 1
+            self.read_buffer.append(record)
+
     def _get_finished_pipe_reading(self):
         return self.has_received_end
 
     def signal_run_experiment(self):
-        self.write_line(f"run {self.experiment_name}")
+        if self.request_binary:
+            self.write_line(f"run {self.experiment_name} {BINARY_MODE_ARGUMENT}")
+        else:
+            self.write_line(f"run {self.experiment_name}")
 
     def wait_run_experiment_response(self):
-        assert(self.read_line() == "SUCCESS")
+        response = self.read_line()
+        assert(response == "SUCCESS" or (self.request_binary and response == f"SUCCESS {BINARY_MODE_ARGUMENT}"))
 
 
 class QuitTask(SimulationTask):
     """
     The class for when Unity is closing. Includes a method to wait for the quitting protocol to have finished.
     """
-    def __init__(self, pipe_handle, overlap, **kwargs):
-        SimulationTask.__init__(self, pipe_handle, overlap, **kwargs)
+    def __init__(self, transport: Transport, writer: LineWriter, **kwargs):
+        SimulationTask.__init__(self, transport, writer, **kwargs)
         self.has_received_quit = False
 
-        self._start_read_thread()
-
     def _on_read_line_from_pipe(self, line: str):
         if not SimulationTask._on_read_line_from_pipe(self, line):
             return False
@@ -292,38 +502,46 @@ class UnityInstance:
     """
     A class that wraps an instance of Unity set up for performing reinforcement learning experiments.
     """
-    def __init__(self, pipe_path_and_name:str, executable_args:dict=None, **kwargs):
+    def __init__(self, pipe_path_and_name:str, executable_args:dict=None, transport:Transport=None,
+                 recording_path:str=None, **kwargs):
         """
         pipe_and_path_name = name + path of pipe to use for communication
         executable_args = {simulator_path:str, simulator_args:list[str]}
+        transport = connection to use instead of the default for this platform (see pipe_transport.create_transport),
+        e.g. a recording_transport.ReplayTransport to replay a recording instead of running a simulator.
+        recording_path = if not None, record everything read from and written to the simulator to this file (see
+        recording_transport.RecordingTransport).
 
         If executable_args is not None, a Unity build with be executed using the provided args.
         Otherwise, no executable will be run. Useful for when running directly in the Unity editor.
         """
-        # From https://www.codeproject.com/Questions/5340484/How-to-send-back-data-through-Python-to-Csharp-thr
-        self.pipe_handle = win32pipe.CreateNamedPipe(
-            pipe_path_and_name,
-            win32pipe.PIPE_ACCESS_DUPLEX | win32file.FILE_FLAG_OVERLAPPED,
-            win32pipe.PIPE_TYPE_MESSAGE | win32pipe.PIPE_READMODE_MESSAGE | win32pipe.PIPE_WAIT,
-            1, 65536, 65536,
-            0,
-            None)
+        self.transport = create_transport(pipe_path_and_name) if transport is None else transport
+        if not (recording_path is None):
+            self.transport = RecordingTransport(self.transport, recording_path)
 
         self.simulation_exec = None
         if not (executable_args is None):
             # Run on a different thread. run waits until the process has finished.
             self.simulation_exec = subprocess.Popen([executable_args['simulator_path']] + executable_args['simulator_args'])
 
-        self.overlap = pywintypes.OVERLAPPED()
-        self.overlap.hEvent = win32event.CreateEvent(None, 0, 0, None)
-        win32pipe.ConnectNamedPipe(self.pipe_handle, self.overlap)
-        win32file.GetOverlappedResult(self.pipe_handle, self.overlap, True)
+        self.transport.accept()
+        # Counters, histograms and gauges of the communication with the simulator (see get_metrics).
+        self.metrics = InstanceMetrics()
+        # Buffers writes while batching (see begin_batch).
+        self.writer = LineWriter(self.transport, metrics=self.metrics)
+        # Reads from the simulator for every task.
+        self.reader = ConnectionReader(self.transport, metrics=self.metrics)
 
         # Extra arguments for controlling behaviour. e.g. no_timeout.
         self.meta_args = kwargs
 
         # Current (assumed) state of the simulator executable.
-        self.task: SimulationTask = IdleTask(self.pipe_handle, self.overlap, **self.meta_args)
+        self.task: SimulationTask = self._start_task(IdleTask)
+
+        # Seconds spent running experiments (from run_experiment to reading their END), to tell how long the
+        # simulator was idle.
+        self.experiment_time = 0.0
+        self._experiment_start = None
 
     def set_property(self, property_name, value):
         if self.task.get_task_type() != SimulationTaskType.IDLE:
@@ -331,14 +549,19 @@ class UnityInstance:
 
         # TODO: Write to pipe
 
-    def run_experiment(self, experiment_name:str):
+    def run_experiment(self, experiment_name:str, binary:bool=False):
         """
         Open an environment corresponding to the given experiment name.
+
+        If binary is True, ask the simulator to use the binary frame protocol for this experiment (see
+        binary_protocol). If it accepts (see is_binary_mode), read_line returns binary_protocol.Record objects for
+        starts, frames and scores, and commands should be sent with write_record.
         """
         if self.task.get_task_type() != SimulationTaskType.IDLE:
             raise Exception(f"Cannot start another task while task {self.task.get_task_type()} is running.")
 
-        self.task = ExperimentTask(self.pipe_handle, self.overlap, experiment_name, **self.meta_args)
+        self._experiment_start = time.perf_counter()
+        self.task = self._start_task(ExperimentTask, experiment_name, binary)
 
         self.task.signal_run_experiment()
         self.task.wait_run_experiment_response()
@@ -356,10 +579,12 @@ class UnityInstance:
         if type(session_init_data) == str or not hasattr(session_init_data, "__iter__"):
             session_init_data = [session_init_data]
 
-        for init_data in session_init_data:
-            self.write_line(init_data)
-
-        self.flush_pipe()
+        # Coalesce the lines into as few writes as possible.
+        self.writer.begin_batch()
+        try:
+            self.writer.write_lines(session_init_data)
+        finally:
+            self.writer.commit()
 
     def end_send_session_initialization_data(self):
         """
@@ -375,6 +600,28 @@ class UnityInstance:
         self.flush_pipe()
         self.task.on_has_sent_end()
 
+    def submit_sessions(self, session_init_data, chunk_size: int = 256):
+        """
+        Sends session_init_data (an iterable of json strings, e.g. a generator) followed by END from another thread,
+        and returns right away: call read_line / read_lines meanwhile to handle the sessions as they are simulated.
+        Sessions are taken from session_init_data chunk_size at a time as the pipe accepts them, so generating the
+        sessions overlaps with sending them, and a generator doesn't run ahead of the simulator.
+
+        Replaces send_session_initialization_data and end_send_session_initialization_data. Unity only starts the
+        sessions once END has been read (its json parser takes every line until then); to also simulate the first
+        sessions while the last ones are generated, split the sessions across instances with a UnityInstancePool.
+        """
+        if self.task.get_task_type() != SimulationTaskType.SIMULATING:
+            raise Exception("Cannot simulate sessions before starting an experiment.")
+
+        if self.task.get_has_sent_end():
+            raise Exception("Cannot send sessions. Already sent END for this simulation.")
+
+        if type(session_init_data) == str or not hasattr(session_init_data, "__iter__"):
+            session_init_data = [session_init_data]
+
+        self.task.submit_sessions(session_init_data, chunk_size)
+
     def quit(self):
         """
         Call to close the Unity instance and communication pipe.
@@ -382,7 +629,7 @@ class UnityInstance:
         if self.task.get_task_type() != SimulationTaskType.IDLE:
             raise Exception("Cannot set quit whilst simulation is running.")
 
-        self.task = QuitTask(self.pipe_handle, self.overlap, **self.meta_args)
+        self.task = self._start_task(QuitTask)
         self.task.signal_quit()
         self.task.wait_for_quit_response()
         self.task = None
@@ -393,21 +640,214 @@ class UnityInstance:
     def write_line(self, to_write):
         self.task.write_line(to_write)
 
+    def write_record(self, index: int, values):
+        """
+        Sends a command to a session in binary mode. values = the command's float32 values, laid out as in
+        binary_protocol.COMMAND_LAYOUTS.
+        """
+        self.task.write_record(MessageType.COMMAND, index, values)
+
+    def is_binary_mode(self) -> bool:
+        """
+        Whether the running experiment uses the binary frame protocol.
+        """
+        return self.task.get_task_type() == SimulationTaskType.SIMULATING and self.task.is_binary
+
     def flush_pipe(self):
         self.task.flush()
 
+    def begin_batch(self):
+        """
+        Start coalescing written lines and flushes. They are sent in one write when commit is called, when the batch
+        is full, or when read_line would wait for the simulator (e.g. once every frame of a physics step was read).
+        """
+        self.writer.begin_batch()
+
+    def commit(self):
+        """
+        Send everything written since begin_batch and end the batch.
+        """
+        self.writer.commit()
+
+    def get_write_stats(self) -> dict:
+        """
+        Returns counters of the lines and flushes requested, the writes and flushes performed, and how many were
+        saved by batching.
+        """
+        return self.writer.get_stats()
+
+    def get_metrics(self) -> dict:
+        """
+        Returns a snapshot of the metrics of the communication with the simulator (see instance_metrics): bytes and
+        messages read, lines, bytes, writes and flushes sent, warnings, sessions started, scored and running, the
+        depth of the read buffer, and histograms of the time read_line waited for the simulator and writes took.
+        Can be called from any thread (the values read may be a few messages apart).
+        """
+        read_buffer_depth = 0 if self.task is None else len(self.task.read_buffer)
+        snapshot = self.metrics.get_snapshot(read_buffer_depth)
+        snapshot["lines_out"] = self.writer.lines_written
+        snapshot["write_calls"] = self.writer.write_calls
+        snapshot["flush_calls"] = self.writer.flush_calls
+        return snapshot
+
+    def get_instance_metrics(self) -> list:
+        """
+        Returns the metrics of each instance (see MetricsExporter).
+        """
+        return [self.get_metrics()]
+
     def read_line(self):
         line = self.task.read_line()
 
         if line is None and self.task.get_task_type() == SimulationTaskType.SIMULATING:
-            self.task = IdleTask(self.pipe_handle, self.overlap, **self.meta_args)
+            self._on_experiment_finished()
 
         return line
 
+    def read_lines(self):
+        """
+        Returns every line read from the simulator so far (e.g. every frame of a physics step), waiting for at least
+        one. Returns None once the experiment has finished, like read_line.
+        """
+        lines = self.task.read_lines()
+
+        if lines is None and self.task.get_task_type() == SimulationTaskType.SIMULATING:
+            self._on_experiment_finished()
+
+        return lines
+
+    def get_instance_count(self) -> int:
+        return 1
+
+    def get_experiment_time(self) -> float:
+        """
+        Returns the seconds spent running experiments: the time the simulator was idle is the rest.
+        """
+        return self.experiment_time
+
+    def _on_experiment_finished(self):
+        self.task.wait_for_submit()
+        self.task = self._start_task(IdleTask)
+        self.experiment_time += time.perf_counter() - self._experiment_start
+
+    def _start_task(self, task_type, *args) -> SimulationTask:
+        """
+        Creates a task and makes the reader route what it reads to it.
+        """
+        task = task_type(self.transport, self.writer, *args, metrics=self.metrics, reader=self.reader,
+                         **self.meta_args)
+        self.reader.set_task(task)
+        return task
+
     def close_pipe(self):
-        win32file.FlushFileBuffers(self.pipe_handle)
-        win32pipe.DisconnectNamedPipe(self.pipe_handle)
-        win32file.CloseHandle(self.pipe_handle)
+        self.reader.close()
+        self.transport.close()
+
+
+class Message(NamedTuple):
+    """
+    A message read from a simulator during an experiment (see MessageDecoder).
+    """
+    type: MessageType
+    index: int
+    # None for START, the frame (a dict, or float32 values in binary mode) for FRAME, and the score as read for SCORE.
+    data: object
+
+
+# Creates a Message without going through the keyword handling of Message.__new__ (faster on the hot path).
+_new_message = partial(tuple.__new__, Message)
+
+
+class MessageDecoder:
+    """
+    Decodes what read_line returns during an experiment into START, FRAME and SCORE messages:
+    <index> -> START
+    <index> <json> -> FRAME
+    <index> <score> -> SCORE
+    Binary records (see binary_protocol) are decoded into the same messages.
+
+    Lines are classified by the character after the index, so nothing is raised while decoding valid messages.
+    Scores are kept as they were read and parsed all at once by get_scores.
+    """
+    def __init__(self):
+        self._score_indices = array("i")
+        self._scores = []
+
+    def decode(self, message) -> Message:
+        """
+        Decodes a line or record read with read_line.
+        """
+        if isinstance(message, Record):
+            return self._decode_record(message)
+
+        index, _, data = message.partition(" ")
+        if len(data) == 0:
+            return _new_message((MessageType.START, int(index), None))
+
+        if data[0] in _FRAME_STARTS:
+            return _new_message((MessageType.FRAME, int(index), json.loads(data)))
+
+        index = int(index)
+        self._score_indices.append(index)
+        self._scores.append(data)
+        return _new_message((MessageType.SCORE, index, data))
+
+    def _decode_record(self, record: Record) -> Message:
+        if record.type == MessageType.FRAME:
+            return Message(MessageType.FRAME, record.index, unpack_values(record.payload))
+
+        if record.type == MessageType.SCORE:
+            score = unpack_values(record.payload)[0]
+            self._score_indices.append(record.index)
+            self._scores.append(score)
+            return Message(MessageType.SCORE, record.index, score)
+
+        return Message(record.type, record.index, None)
+
+    def dispatch(self, sim_inst, handlers: dict, on_frames=None):
+        """
+        Reads from sim_inst (a UnityInstance or UnityInstancePool) until the experiment ends, calling
+        handlers[message.type](message) for each message. Messages without a handler are only decoded.
+
+        If on_frames is given, the FRAME messages read together (usually every frame of a physics step) are instead
+        passed to on_frames as one list. Messages are still handled in the order they were read: frames waiting for
+        on_frames are handled before any other message.
+        """
+        frames = []
+
+        while True:
+            lines = sim_inst.read_lines()
+
+            if lines is None:
+                break
+
+            # Decoding is the time of the span not spent in the handlers.
+            with TRACER.span("dispatch", messages=len(lines)):
+                for line in lines:
+                    message = self.decode(line)
+
+                    if message.type == MessageType.FRAME and not (on_frames is None):
+                        frames.append(message)
+                        continue
+
+                    if len(frames) > 0:
+                        on_frames(frames)
+                        frames = []
+
+                    handler = handlers.get(message.type)
+                    if not (handler is None):
+                        handler(message)
+
+                if len(frames) > 0:
+                    on_frames(frames)
+                    frames = []
+
+    def get_scores(self):
+        """
+        Returns the session indices and the scores of every SCORE message decoded so far, as arrays in the order the
+        scores were read.
+        """
+        return self._score_indices, array("d", map(float, self._scores))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,398 @@
+"""
+@author William Erignac
+@version 2026-10-16
+
+This script contains UnityInstancePool, which splits the sessions of an experiment across several Unity instances.
+
+The pool has the same interface as UnityInstance, so the training scripts can use either. Sessions are handed out to
+the instances in chunks from a shared queue (work stealing): an instance asks for another chunk whenever it finishes
+one, and chunks get smaller as the queue empties, so a slow instance doesn't hold up the end of an epoch. Chunks
+don't get smaller than a quarter of an instance's share of the sessions though: every chunk is an experiment of its
+own, and a simulator steps the sessions of an experiment together, so small chunks would take as many steps as large
+ones for a fraction of the sessions (see benchmarks.py pool). Sessions
+can also be streamed from a generator (see submit_sessions), in which case each chunk is generated when an instance
+asks for it, and the first chunks are simulated while the next ones are generated. Lines read
+from the instances are merged into one stream with their indices converted back to the indices of the sessions in the
+order they were sent to the pool, and commands written to the pool are routed to the instance running that session.
+"""
+
+import os
+import queue
+import threading
+from collections import deque
+from itertools import islice
+
+from binary_protocol import Record
+from instance_metrics import merge_snapshots
+from unity_instance import UnityInstance
+
+
+class UnityInstancePool:
+    """
+    A set of Unity instances that are used like a single UnityInstance.
+    """
+    def __init__(self, pipe_path: str, pipe_names: list, executable_args: dict = None, min_chunk_size: int = 1,
+                 **kwargs):
+        """
+        pipe_path = path of the pipes to use for communication (e.g. '\\\\.\\pipe\\')
+        pipe_names = name of the pipe for each instance, one instance is created per name.
+        executable_args = {simulator_path:str, simulator_args:list[str]}
+        min_chunk_size = smallest number of sessions to give an instance at once (see _take_chunk for the actual
+        floor, which grows with the number of sessions).
+
+        If executable_args is not None, a Unity build is executed for each instance with the provided args and
+        -p <pipe name>. Otherwise, no executable will be run.
+        """
+        self.min_chunk_size = min_chunk_size
+        self.instances = [None] * len(pipe_names)
+
+        # Create the instances in parallel; each one waits for its simulator to connect.
+        exceptions = []
+
+        def create_instance(i):
+            try:
+                self.instances[i] = UnityInstance(os.path.join(pipe_path, pipe_names[i]),
+                                                  _with_pipe_name(executable_args, pipe_names[i]),
+                                                  **_with_recording_path(kwargs, pipe_names[i]))
+            except Exception as e:
+                exceptions.append(e)
+
+        threads = [threading.Thread(target=create_instance, args=[i]) for i in range(len(pipe_names))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if len(exceptions) > 0:
+            raise exceptions[0]
+
+        self.experiment_name = None
+        # Whether the experiment requested / got the binary frame protocol (see binary_protocol).
+        self.request_binary = False
+        self.is_binary = False
+        self.has_sent_end = False
+        # Initialization data for the sessions of the current experiment, in the order they were sent.
+        self._session_init_data = []
+        # Indices of the sessions that haven't been given to an instance yet.
+        self._unassigned = deque()
+        self._unassigned_lock = threading.Lock()
+        # Smallest chunk of the current experiment (see _take_chunk).
+        self._chunk_floor = min_chunk_size
+        # Number of chunks handed out to the instances, each of which was run as an experiment.
+        self.chunk_count = 0
+        # Iterator of the sessions that haven't been generated yet when streaming them (see submit_sessions).
+        self._session_stream = None
+        self._stream_chunk_size = 0
+        # Session index -> (instance, index of the session in the instance's current experiment).
+        self._session_locations = dict()
+
+        # Lines read from all instances, with None marking that an instance has run out of sessions.
+        self._merged_lines = queue.Queue()
+        self._workers = []
+        self._running_workers = 0
+
+    def get_instance_count(self) -> int:
+        return len(self.instances)
+
+    def run_experiment(self, experiment_name: str, binary: bool = False):
+        """
+        Prepare to run the given experiment. The instances open the experiment when they are given sessions.
+        """
+        if not (self.experiment_name is None):
+            raise Exception(f"Cannot start another experiment while {self.experiment_name} is running.")
+
+        self.experiment_name = experiment_name
+        self.request_binary = binary
+        self.is_binary = False
+        self.has_sent_end = False
+        self._session_init_data = []
+        self._session_stream = None
+        self._session_locations = dict()
+
+    def send_session_initialization_data(self, session_init_data):
+        """
+        session_init_data = iterable list of json strings representing session initialization data.
+        """
+        if self.experiment_name is None:
+            raise Exception("Cannot simulate sessions before starting an experiment.")
+
+        if self.has_sent_end:
+            raise Exception("Cannot send sessions. Already sent END for this simulation.")
+
+        if type(session_init_data) == str or not hasattr(session_init_data, "__iter__"):
+            session_init_data = [session_init_data]
+
+        self._session_init_data.extend(session_init_data)
+
+    def end_send_session_initialization_data(self):
+        """
+        Call once all initialization data has finished sending to start session simulation on all instances.
+        """
+        if self.experiment_name is None:
+            raise Exception("Cannot end simulation. No simulations have started.")
+
+        if self.has_sent_end:
+            raise Exception("Cannot send end. Already sent end for this simulation.")
+
+        self.has_sent_end = True
+        self._unassigned = deque(range(len(self._session_init_data)))
+        self._chunk_floor = max(self.min_chunk_size, len(self._unassigned) // (4 * len(self.instances)))
+        self._start_workers()
+
+    def submit_sessions(self, session_init_data, chunk_size: int = 64):
+        """
+        Simulates session_init_data (an iterable of json strings, e.g. a generator) on the instances, and returns
+        right away: call read_line / read_lines meanwhile to handle the sessions as they are simulated.
+        Replaces send_session_initialization_data and end_send_session_initialization_data.
+
+        If session_init_data has a length (e.g. a list), it is split like sessions sent with
+        send_session_initialization_data. Otherwise, chunk_size sessions are taken from it each time an instance needs
+        more, so the first chunks are simulated while the next ones are generated, and generation is paced by the
+        instances. Exceptions raised by the generator are raised by read_line.
+        """
+        if self.experiment_name is None:
+            raise Exception("Cannot simulate sessions before starting an experiment.")
+
+        if self.has_sent_end:
+            raise Exception("Cannot send sessions. Already sent END for this simulation.")
+
+        if type(session_init_data) == str or not hasattr(session_init_data, "__iter__"):
+            session_init_data = [session_init_data]
+
+        if hasattr(session_init_data, "__len__"):
+            self.send_session_initialization_data(session_init_data)
+            self.end_send_session_initialization_data()
+            return
+
+        self.has_sent_end = True
+        self._session_stream = iter(session_init_data)
+        self._stream_chunk_size = chunk_size
+        self._start_workers()
+
+    def _start_workers(self):
+        self._workers = [threading.Thread(target=self._run_instance, args=[instance]) for instance in self.instances]
+        self._running_workers = len(self._workers)
+        for worker in self._workers:
+            worker.start()
+
+    def _take_chunk(self) -> list:
+        """
+        Returns the indices of the next sessions to give to an instance. Chunks shrink as fewer sessions are left, to
+        half of an even split of the rest, but not below a quarter of an even split of all the sessions (or
+        min_chunk_size), so each instance runs a handful of experiments per epoch. When streaming, generates the next
+        chunk instead.
+        """
+        with self._unassigned_lock:
+            if not (self._session_stream is None):
+                start = len(self._session_init_data)
+                self._session_init_data.extend(islice(self._session_stream, self._stream_chunk_size))
+                chunk = list(range(start, len(self._session_init_data)))
+            else:
+                chunk_size = max(self._chunk_floor, len(self._unassigned) // (2 * len(self.instances)))
+                chunk_size = min(chunk_size, len(self._unassigned))
+                chunk = [self._unassigned.popleft() for _ in range(chunk_size)]
+
+            if len(chunk) > 0:
+                self.chunk_count += 1
+            return chunk
+
+    def _run_instance(self, instance: UnityInstance):
+        """
+        Runs on a worker thread per instance. Runs chunks of sessions on the instance until none are left.
+        """
+        try:
+            while True:
+                chunk = self._take_chunk()
+                if len(chunk) == 0:
+                    break
+
+                for local_index, session_index in enumerate(chunk):
+                    self._session_locations[session_index] = (instance, local_index)
+
+                instance.run_experiment(self.experiment_name, self.request_binary)
+                self.is_binary = instance.is_binary_mode()
+                instance.send_session_initialization_data([self._session_init_data[i] for i in chunk])
+                instance.end_send_session_initialization_data()
+
+                while True:
+                    line = instance.read_line()
+                    if line is None:
+                        break
+                    if isinstance(line, Record):
+                        self._merged_lines.put(line._replace(index=chunk[line.index]))
+                    else:
+                        self._merged_lines.put(_replace_index(line, lambda local_index: chunk[local_index]))
+
+            self._merged_lines.put(None)
+        except Exception as e:
+            self._merged_lines.put(e)
+
+    def read_line(self):
+        """
+        Returns a line written by any of the simulators, with the index of the session as sent to the pool.
+        Returns None once every session has finished.
+        """
+        while self._running_workers > 0:
+            try:
+                line = self._merged_lines.get_nowait()
+            except queue.Empty:
+                # About to wait, so send any batched commands first; the simulators might be waiting on them.
+                for instance in self.instances:
+                    instance.writer.write_pending()
+                line = self._merged_lines.get()
+
+            if isinstance(line, Exception):
+                raise line
+
+            if not (line is None):
+                return line
+
+            self._running_workers -= 1
+
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+        self.experiment_name = None
+        return None
+
+    def read_lines(self):
+        """
+        Returns every line read from the simulators so far, waiting for at least one. Returns None once every session
+        has finished, like read_line.
+        """
+        line = self.read_line()
+        if line is None:
+            return None
+
+        lines = [line]
+        while True:
+            try:
+                line = self._merged_lines.get_nowait()
+            except queue.Empty:
+                break
+
+            if isinstance(line, Exception):
+                raise line
+
+            if line is None:
+                self._running_workers -= 1
+            else:
+                lines.append(line)
+
+        return lines
+
+    def write_line(self, to_write):
+        """
+        Writes a line that starts with a session index to the instance running that session.
+        """
+        session_index = int(to_write.split(" ", 1)[0])
+        instance, local_index = self._session_locations[session_index]
+        instance.write_line(_replace_index(to_write, lambda _: local_index))
+
+    def write_record(self, index: int, values):
+        """
+        Sends a command in binary mode to the instance running the session.
+        """
+        instance, local_index = self._session_locations[index]
+        instance.write_record(local_index, values)
+
+    def is_binary_mode(self) -> bool:
+        return self.is_binary
+
+    def flush_pipe(self):
+        for instance in self.instances:
+            instance.flush_pipe()
+
+    def begin_batch(self):
+        for instance in self.instances:
+            instance.begin_batch()
+
+    def commit(self):
+        for instance in self.instances:
+            instance.commit()
+
+    def get_experiment_time(self) -> float:
+        """
+        Returns the seconds spent running experiments, summed over the instances.
+        """
+        return sum(instance.get_experiment_time() for instance in self.instances)
+
+    def get_write_stats(self) -> dict:
+        """
+        Returns the write counters of UnityInstance.get_write_stats summed over the instances.
+        """
+        totals = dict()
+        for instance in self.instances:
+            for name, value in instance.get_write_stats().items():
+                totals[name] = totals.get(name, 0) + value
+        return totals
+
+    def get_metrics(self) -> dict:
+        """
+        Returns the metrics of UnityInstance.get_metrics merged over the instances.
+        """
+        return merge_snapshots(self.get_instance_metrics())
+
+    def get_instance_metrics(self) -> list:
+        return [instance.get_metrics() for instance in self.instances]
+
+    def quit(self):
+        """
+        Call to close all the Unity instances and communication pipes.
+        """
+        if not (self.experiment_name is None):
+            raise Exception("Cannot set quit whilst simulation is running.")
+
+        for instance in self.instances:
+            instance.quit()
+
+
+def _with_pipe_name(executable_args: dict, pipe_name: str) -> dict:
+    """
+    Returns a copy of executable_args that passes -p <pipe_name> to the simulator.
+    """
+    if executable_args is None:
+        return None
+
+    simulator_args = list(executable_args["simulator_args"])
+    if "-p" in simulator_args and simulator_args.index("-p") + 1 < len(simulator_args):
+        simulator_args[simulator_args.index("-p") + 1] = pipe_name
+    else:
+        simulator_args += ["-p", pipe_name]
+
+    return {**executable_args, "simulator_args": simulator_args}
+
+
+def _with_recording_path(kwargs: dict, pipe_name: str) -> dict:
+    """
+    Returns a copy of the arguments of an instance that records to <recording path>_<pipe_name><extension>, if a
+    recording_path is given, so each instance has a recording of its own.
+    """
+    if kwargs.get("recording_path") is None:
+        return kwargs
+
+    root, extension = os.path.splitext(kwargs["recording_path"])
+    return {**kwargs, "recording_path": f"{root}_{pipe_name}{extension}"}
+
+
+def _replace_index(line: str, convert_index) -> str:
+    """
+    Replaces the session index a line starts with using convert_index. Lines that don't start with an index are
+    returned as-is.
+    """
+    split = line.split(" ", 1)
+    if not split[0].isdigit():
+        return line
+    split[0] = str(convert_index(int(split[0])))
+    return " ".join(split)
+
+
+def create_simulator(pipe_path: str, pipe_name: str, executable_args: dict = None, instance_count: int = 1,
+                     **kwargs):
+    """
+    Creates a UnityInstance, or a UnityInstancePool of instance_count instances (using the pipes
+    <pipe_name>0, <pipe_name>1, ...) if instance_count is more than 1.
+    """
+    if instance_count <= 1:
+        return UnityInstance(os.path.join(pipe_path, pipe_name), executable_args, **kwargs)
+    return UnityInstancePool(pipe_path, [f"{pipe_name}{i}" for i in range(instance_count)], executable_args,
+                             **kwargs)
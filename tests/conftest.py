@@ -0,0 +1,8 @@
+"""
+The scripts in src import each other as top-level modules, so src is put on the path for the tests.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
@@ -0,0 +1,92 @@
+import asyncio
+import queue
+
+import pytest
+
+from async_unity_instance import AsyncUnityInstance
+from pipe_transport import Transport
+
+
+class QueuedSimulator(Transport):
+    """
+    A transport whose reads block (on a thread of the event loop's executor) until an answer is queued. A queued
+    exception is raised by the read.
+    """
+    line_delimiter = b"\n"
+
+    def __init__(self):
+        self.answers = queue.Queue()
+        self.written = []
+
+    def read_into(self, buffer) -> int:
+        answer = self.answers.get()
+        if isinstance(answer, Exception):
+            raise answer
+        buffer[:len(answer)] = answer
+        return len(answer)
+
+    def write(self, data: bytes):
+        self.written.append(bytes(data))
+
+    def close(self):
+        pass
+
+
+def test_read_after_timeout_gets_the_pending_read():
+    async def scenario():
+        simulator = QueuedSimulator()
+        instance = AsyncUnityInstance(simulator)
+        simulator.answers.put(b"SUCCESS\n")
+        await instance.run_experiment("prism")
+
+        with pytest.raises(Exception, match="Timeout"):
+            await instance.read_line(timeout=0.05)
+
+        # Read by the read that timed out, which must not be lost nor overwritten by another read.
+        simulator.answers.put(b"0\n0 1.5\n")
+        assert await instance.read_line(timeout=2.0) == "0"
+        assert await instance.read_line(timeout=2.0) == "0 1.5"
+        simulator.answers.put(b"END\n")
+        assert await instance.read_line(timeout=2.0) is None
+
+    asyncio.run(scenario())
+
+
+def test_failed_read_is_only_raised_once():
+    async def scenario():
+        simulator = QueuedSimulator()
+        instance = AsyncUnityInstance(simulator)
+        simulator.answers.put(b"SUCCESS\n")
+        await instance.run_experiment("prism")
+
+        simulator.answers.put(ConnectionError("The read failed."))
+        with pytest.raises(ConnectionError):
+            await instance.read_line(timeout=2.0)
+
+        # The next call starts another read instead of raising the failed one again.
+        simulator.answers.put(b"0\n")
+        assert await instance.read_line(timeout=2.0) == "0"
+
+    asyncio.run(scenario())
+
+
+def test_lines_after_an_error_are_kept():
+    async def scenario():
+        simulator = QueuedSimulator()
+        instance = AsyncUnityInstance(simulator)
+        simulator.answers.put(b"SUCCESS\n")
+        await instance.run_experiment("prism")
+
+        simulator.answers.put(b"0\nError: broken\n0 1.5\nEND\n")
+        with pytest.raises(Exception, match="Got error from simulator"):
+            await instance.read_line(timeout=2.0)
+        assert await instance.read_line(timeout=2.0) == "0"
+        assert await instance.read_line(timeout=2.0) == "0 1.5"
+        assert await instance.read_line(timeout=2.0) is None
+
+    asyncio.run(scenario())
+
+
+def test_tasks_have_no_writer():
+    instance = AsyncUnityInstance(QueuedSimulator())
+    assert instance.task.writer is None
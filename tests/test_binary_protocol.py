@@ -0,0 +1,31 @@
+import numpy as np
+
+from binary_protocol import (FRAME_LAYOUTS, RECORD_HEADER, MessageType, dict_to_layout, layout_to_dict, pack_record,
+                             unpack_values)
+
+
+def test_pack_record_round_trip():
+    record = pack_record(MessageType.COMMAND, 7, (1.0, -0.5))
+    message_type, index, size = RECORD_HEADER.unpack_from(record)
+    assert (message_type, index, size) == (MessageType.COMMAND, 7, 8)
+    assert list(unpack_values(record[RECORD_HEADER.size:])) == [1.0, -0.5]
+
+
+def test_pack_record_from_array_matches_iterable():
+    values = np.array([0.25, 3.0, -2.0], dtype=np.float32)
+    assert pack_record(MessageType.FRAME, 1, values) == pack_record(MessageType.FRAME, 1, values.tolist())
+
+
+def test_pack_record_without_payload():
+    assert len(pack_record(MessageType.END, 0)) == RECORD_HEADER.size
+
+
+def test_layout_dict_round_trip():
+    layout = FRAME_LAYOUTS["cart_pole_3d"]
+    frame = {"State": {"CartVelocityX": 1.0, "PoleAngularPositionX": 2.0, "PoleAngularVelocityX": 3.0,
+                       "CartVelocityZ": 4.0, "PoleAngularPositionZ": 5.0, "PoleAngularVelocityZ": 6.0},
+             "Goal": {"CartVelocityX": 7.0, "CartVelocityZ": 8.0},
+             "Score": 9.0}
+    values = dict_to_layout(layout, frame)
+    assert values == [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0]
+    assert layout_to_dict(layout, values) == frame
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+import torch
+
+from binary_protocol import MessageType
+from cart_pole_training import CartPoleTrainer, create_argument_parser
+from learner_process import LearnerProcess
+from reinforce_learner import ReinforceLearner
+from session_encoder import SessionEncoder
+from unity_instance import Message
+
+COMMANDS = ["left", "right"]
+
+
+def create_trainer() -> CartPoleTrainer:
+    torch.manual_seed(0)
+    model = torch.nn.Sequential(torch.nn.Linear(2, 8), torch.nn.LeakyReLU(), torch.nn.Linear(8, 2),
+                                torch.nn.Softmax(dim=0))
+    return CartPoleTrainer(model, torch.optim.SGD(model.parameters(), lr=0.1), 2, SessionEncoder({"Seed": "Seed"}),
+                           lambda data: ((data["X"], data["Y"]), data["Score"]), COMMANDS,
+                           lambda states, actions, rewards: len(rewards))
+
+
+def create_learner() -> ReinforceLearner:
+    # Called in the learner process with -learner_process, where it creates a trainer of its own.
+    return create_trainer().create_learner()
+
+
+def frame(index: int, step: int) -> Message:
+    return Message(MessageType.FRAME, index, {"X": float(index), "Y": float(step), "Score": 1.0})
+
+
+def test_policy_matches_model_per_state():
+    trainer = create_trainer()
+    states = torch.randn(5, 2)
+    probabilities = trainer.policy(states)
+    for state, row in zip(states, probabilities):
+        assert torch.allclose(trainer.model(state), row)
+
+
+def test_frames_are_answered_and_learned_from():
+    trainer = create_trainer()
+    trainer.configure(create_argument_parser().parse_args([]))
+    for index in range(3):
+        trainer.trajectories.start_session(index)
+    for step in range(4):
+        commands = trainer.process_frames([frame(index, step) for index in range(3)])
+        assert len(commands) == 3 and all(command in COMMANDS for command in commands)
+
+    parameters = [parameter.detach().clone() for parameter in trainer.model.parameters()]
+    trainer.on_session_end(1)
+    # The reward of a step is the score of the next frame, so the last frame isn't a step.
+    assert trainer.scores == [3]
+    assert trainer.learner.episodes_added == 1
+    # Per-episode updates by default (no -episodes), so the model has already learned from the session.
+    assert trainer.learner.updates == 1
+    assert any(not torch.equal(before, after) for before, after in zip(parameters, trainer.model.parameters()))
+
+
+def test_configure_batches_only_with_episodes():
+    trainer = create_trainer()
+    trainer.configure(create_argument_parser().parse_args([]))
+    assert trainer.learner.per_episode
+
+    trainer.configure(create_argument_parser().parse_args(["-episodes", "8", "-compact"]))
+    assert not trainer.learner.per_episode
+    assert trainer.learner.episodes_per_update == 8
+    assert trainer.trajectories.state_dtype == np.float16
+
+
+def test_learner_process_is_opt_in():
+    trainer = create_trainer()
+    trainer.configure(create_argument_parser().parse_args([]))
+    assert isinstance(trainer.learner, ReinforceLearner)
+
+    with pytest.raises(Exception, match="learner process"):
+        trainer.configure(create_argument_parser().parse_args(["-learner_process"]))
+
+    trainer.configure(create_argument_parser().parse_args(["-learner_process", "-episodes", "2"]), create_learner)
+    try:
+        assert isinstance(trainer.learner, LearnerProcess)
+        assert trainer.learner.episodes_per_batch == 2
+    finally:
+        trainer.learner.close()
@@ -0,0 +1,49 @@
+import numpy as np
+
+from fitness_cache import FitnessCache
+
+
+def test_genomes_equal_as_float32_share_a_score():
+    cache = FitnessCache("prism")
+    genomes = np.array([[0.1, 0.2], [0.3, 0.4]])
+    cache.store(cache.get_keys(genomes), [1.0, 2.0])
+
+    # Differs from the first genome only below float32 precision, and from the second one above it.
+    lookups = np.array([[0.1 + 1e-12, 0.2], [0.3, 0.41]])
+    scores = cache.lookup(cache.get_keys(lookups))
+    assert scores[0] == 1.0 and np.isnan(scores[1])
+    assert cache.get_stats()["hits"] == 1 and cache.get_stats()["misses"] == 1
+
+
+def test_resolution():
+    cache = FitnessCache("prism", resolution=0.1)
+    cache.store(cache.get_keys(np.array([[1.0]])), [5.0])
+    assert cache.lookup(cache.get_keys(np.array([[1.04]])))[0] == 5.0
+    assert np.isnan(cache.lookup(cache.get_keys(np.array([[1.06]])))[0])
+
+
+def test_least_recently_used_is_evicted():
+    cache = FitnessCache("prism", capacity=2)
+    keys = cache.get_keys(np.array([[1.0], [2.0], [3.0]]))
+    cache.store(keys[:2], [1.0, 2.0])
+    cache.lookup(keys[:1])
+    cache.store(keys[2:], [3.0])
+    assert np.isnan(cache.lookup(keys[1:2])[0])
+    assert cache.lookup([keys[0], keys[2]]).tolist() == [1.0, 3.0]
+
+
+def test_scores_persist_per_experiment_and_build(tmp_path):
+    path = str(tmp_path / "scores.db")
+    genomes = np.random.default_rng(0).random((1200, 3))
+    cache = FitnessCache("prism", "build1", path)
+    cache.store(cache.get_keys(genomes), np.arange(len(genomes)))
+    cache.close()
+
+    # More keys than fit in one query.
+    cache = FitnessCache("prism", "build1", path)
+    assert cache.lookup(cache.get_keys(genomes)).tolist() == list(range(len(genomes)))
+    cache.close()
+
+    for other in (FitnessCache("prism", "build2", path), FitnessCache("crawler", "build1", path)):
+        assert np.isnan(other.lookup(other.get_keys(genomes[:10]))).all()
+        other.close()
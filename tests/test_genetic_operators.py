@@ -0,0 +1,106 @@
+import random
+
+import numpy as np
+import pytest
+
+from benchmarks_evolution import LegacyRectPrism
+from genetic_operators import multiplicative_mutation, reproduce, select_proportional, swap_mutation
+
+# The genes the legacy operators mutate: the x and y scales (see MUTABLE_GENES in falling_rectangular_prism).
+PRISM_MUTABLE_GENES = np.array([0, 1])
+# Members bred per distribution. The frequencies compared are within 0.02 of each other about 5 standard deviations out.
+SAMPLES = 20000
+
+
+def seed(value: int) -> np.random.Generator:
+    # The legacy operators draw from both random and np.random.
+    random.seed(value)
+    np.random.seed(value)
+    return np.random.default_rng(value)
+
+
+def legacy_mutations(switch_chance: float, modify_chance: float) -> np.ndarray:
+    """
+    Returns the genomes of SAMPLES asexual children of the prism of genes 1 to 6, bred by the legacy operators.
+    """
+    parent = LegacyRectPrism(np.array([1.0, 2.0, 3.0]), np.array([4.0, 5.0, 6.0]))
+    children = [parent.asexual_mutation(switch_chance, modify_chance) for _ in range(SAMPLES)]
+    return np.array([np.concatenate((child.scale, child.rotation)) for child in children])
+
+
+def parent_genomes() -> np.ndarray:
+    return np.tile(np.arange(1.0, 7.0), (SAMPLES, 1))
+
+
+def test_selection_frequencies_match_the_legacy_choice():
+    rng = seed(0)
+    scores = np.array([5.0, 1.0, 0.0, 3.0, 1.0])
+    expected = scores / scores.sum()
+
+    picks = select_proportional(rng, scores, (SAMPLES // 2, 2))
+    assert picks.shape == (SAMPLES // 2, 2)
+    frequencies = np.bincount(picks.ravel(), minlength=len(scores)) / SAMPLES
+    legacy_frequencies = np.bincount(np.random.choice(len(scores), SAMPLES, p=expected),
+                                     minlength=len(scores)) / SAMPLES
+
+    np.testing.assert_allclose(frequencies, expected, atol=0.02)
+    np.testing.assert_allclose(frequencies, legacy_frequencies, atol=0.02)
+    # Members without a score are never picked.
+    assert frequencies[2] == 0
+
+
+def test_selection_is_shuffled():
+    rng = seed(1)
+    picks = select_proportional(rng, np.ones(10), 1000)
+    assert not np.all(np.diff(picks) >= 0)
+
+
+def test_multiplicative_mutation_matches_the_legacy_rate_per_gene():
+    rng = seed(2)
+    genomes = parent_genomes()
+    multiplicative_mutation(rng, genomes, 0.6, PRISM_MUTABLE_GENES)
+    legacy = legacy_mutations(0.0, 0.6)
+
+    changed = (genomes != parent_genomes()).mean(axis=0)
+    legacy_changed = (legacy != parent_genomes()).mean(axis=0)
+    np.testing.assert_allclose(changed, legacy_changed, atol=0.02)
+    # Each gene is left alone when every modification picks the other one: sum of 0.4 * 0.6^k * 0.5^k.
+    np.testing.assert_allclose(changed[:2], 1 - 0.4 / (1 - 0.3), atol=0.02)
+    # Only the mutable genes change.
+    assert np.all(changed[2:] == 0)
+
+    # A gene picked k times is multiplied by k factors, so the spread of the factors matches too.
+    factors = np.log(genomes[:, :2] / parent_genomes()[:, :2])
+    legacy_factors = np.log(legacy[:, :2] / parent_genomes()[:, :2])
+    assert factors.std() == pytest.approx(legacy_factors.std(), rel=0.05)
+
+
+def test_swap_mutation_matches_the_legacy_rate():
+    rng = seed(3)
+    genomes = parent_genomes()
+    swap_mutation(rng, genomes, 0.3, PRISM_MUTABLE_GENES)
+    legacy = legacy_mutations(0.3, 0.0)
+
+    # Swaps only exchange values, so each child is the parent or the parent with its x and y scales swapped.
+    swapped = np.all(genomes[:, :2] == [2.0, 1.0], axis=1)
+    assert np.all(swapped | np.all(genomes == parent_genomes(), axis=1))
+    assert np.all(genomes[:, 2:] == parent_genomes()[:, 2:])
+    legacy_swapped = np.all(legacy[:, :2] == [2.0, 1.0], axis=1)
+    assert swapped.mean() == pytest.approx(legacy_swapped.mean(), abs=0.02)
+
+
+def test_every_mutable_gene_is_mutated():
+    rng = seed(4)
+    genomes = parent_genomes()
+    multiplicative_mutation(rng, genomes, 0.6, np.arange(6))
+    assert np.all((genomes != parent_genomes()).mean(axis=0) > 0)
+
+
+@pytest.mark.parametrize("count", [1, 7, 64, 1001])
+def test_reproduce_returns_the_requested_count(count):
+    rng = seed(5)
+    genomes = rng.random((10, 6))
+    children = reproduce(rng, genomes, rng.random(10), count, mutable_genes=PRISM_MUTABLE_GENES)
+    assert children.shape == (count, 6)
+    # The genes that aren't mutable come from the parents.
+    assert np.all(np.isin(children[:, 2:], genomes[:, 2:]))
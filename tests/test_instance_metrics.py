@@ -0,0 +1,64 @@
+import math
+
+from instance_metrics import HISTOGRAM_BOUNDS, Histogram, InstanceMetrics, diff_snapshots, histogram_quantile, \
+    merge_snapshots, to_prometheus
+
+
+def get_bound(seconds: float) -> float:
+    histogram = Histogram()
+    histogram.observe(seconds)
+    return HISTOGRAM_BOUNDS[histogram.counts.index(1)]
+
+
+def test_observations_go_in_the_smallest_bucket_above_them():
+    assert get_bound(0.0) == HISTOGRAM_BOUNDS[0]
+    assert get_bound(-1.0) == HISTOGRAM_BOUNDS[0]
+    assert get_bound(1e-9) == HISTOGRAM_BOUNDS[0]
+    # Exact powers of 2 are in the bucket they bound (le means <=).
+    assert get_bound(1.0) == 1.0
+    assert get_bound(2.0 ** -20) == 2.0 ** -20
+    assert get_bound(64.0) == 64.0
+    assert get_bound(0.75) == 1.0
+    assert get_bound(1.5) == 2.0
+    assert get_bound(65.0) == math.inf
+
+
+def test_every_observation_is_within_its_bucket():
+    for exponent in range(-24, 9):
+        for seconds in (2.0 ** exponent, 2.0 ** exponent * 1.0001, 2.0 ** exponent * 0.9999):
+            bound = get_bound(seconds)
+            index = HISTOGRAM_BOUNDS.index(bound)
+            assert seconds <= bound
+            assert index == 0 or seconds > HISTOGRAM_BOUNDS[index - 1]
+
+
+def test_quantile_and_prometheus_buckets():
+    metrics = InstanceMetrics()
+    for seconds in (0.001, 0.001, 0.002, 1.0):
+        metrics.read_wait.observe(seconds)
+    snapshot = metrics.get_snapshot()
+    assert histogram_quantile(snapshot["read_wait"], 0.5) == 2.0 ** -9
+    assert histogram_quantile(snapshot["read_wait"], 1.0) == 1.0
+
+    snapshot.update({"lines_out": 0, "write_calls": 0, "flush_calls": 0})
+    text = to_prometheus([snapshot])
+    assert 'unity_instance_read_wait_seconds_bucket{instance="0",le="1.0"} 4' in text
+    assert 'unity_instance_read_wait_seconds_bucket{instance="0",le="0.5"} 3' in text
+
+
+def test_merge_and_diff():
+    first = InstanceMetrics()
+    first.bytes_in = 10
+    first.max_read_buffer_depth = 3
+    first.read_wait.observe(0.5)
+    before = first.get_snapshot()
+    first.bytes_in = 25
+    first.read_wait.observe(0.5)
+
+    difference = diff_snapshots(before, first.get_snapshot())
+    assert difference["bytes_in"] == 15 and difference["read_wait"]["count"] == 1
+
+    second = InstanceMetrics()
+    second.max_read_buffer_depth = 5
+    merged = merge_snapshots([first.get_snapshot(), second.get_snapshot()])
+    assert merged["bytes_in"] == 25 and merged["max_read_buffer_depth"] == 5
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+import torch
+
+from learner_process import LearnerProcess
+from reinforce_learner import ReinforceLearner
+
+
+def create_learner() -> ReinforceLearner:
+    # Same initial parameters every time (the learner process's are replaced by the actor's anyway).
+    torch.manual_seed(0)
+    model = torch.nn.Sequential(torch.nn.Linear(2, 2), torch.nn.Softmax(dim=1))
+    return ReinforceLearner(model, torch.optim.SGD(model.parameters(), lr=0.1), model)
+
+
+def make_episodes(count: int) -> list:
+    rng = np.random.default_rng(0)
+    episodes = []
+    for _ in range(count):
+        length = int(rng.integers(1, 10))
+        episodes.append((rng.random((length, 2)).astype(np.float32), rng.integers(0, 2, size=length),
+                         rng.random(length).astype(np.float32)))
+    return episodes
+
+
+def test_trains_like_the_learner_in_process():
+    episodes = make_episodes(7)
+    in_process = create_learner()
+    in_process.episodes_per_update = 2
+
+    actor_model = create_learner().model
+    learner = LearnerProcess(actor_model, create_learner, episodes_per_update=2)
+    try:
+        for states, actions, rewards in episodes:
+            in_process.add_episode(states, actions, rewards)
+            learner.add_episode(states, actions, rewards)
+        in_process.close()
+        learner.close()
+    finally:
+        learner.close()
+
+    assert learner.get_stats()["updates"] == in_process.updates == 4
+    assert learner.get_stats()["episodes"] == 7
+    for actor_parameter, parameter in zip(actor_model.parameters(), in_process.model.parameters()):
+        torch.testing.assert_close(actor_parameter, parameter)
+
+
+def test_close_after_the_process_stopped():
+    learner = LearnerProcess(create_learner().model, create_learner)
+    learner._process.terminate()
+    learner._process.join()
+
+    with pytest.raises(Exception, match="stopped"):
+        learner.close()
+    # Nothing left to release.
+    learner.close()
+    assert not learner.sync()
@@ -0,0 +1,74 @@
+import io
+
+from binary_protocol import MessageType, pack_record, pack_text_record
+from line_framer import LineFramer
+
+
+def frame_all(data: bytes, read_size: int, buffer_size: int, delimiter: bytes = b"\r\n") -> list:
+    """
+    Feeds data to a framer read_size bytes at a time, the way the read thread does, and returns the lines framed.
+    """
+    framer = LineFramer(delimiter, buffer_size=buffer_size)
+    source = io.BytesIO(data)
+    lines = []
+    while True:
+        view = framer.get_read_view()
+        bytes_read = source.readinto(view[:read_size])
+        if bytes_read == 0:
+            return lines
+        framer.commit(bytes_read)
+        lines.extend(framer.lines())
+
+
+def test_lines_split_across_reads_and_buffer_boundaries():
+    lines = [f"{i} {'x' * (i % 7)}" for i in range(200)]
+    data = b"".join(line.encode() + b"\r\n" for line in lines)
+    # Reads of every size, including ones that cut the delimiter in half, with a buffer smaller than some lines.
+    for read_size in (1, 2, 3, 5, 16, 1024):
+        assert frame_all(data, read_size, buffer_size=8) == lines
+
+
+def test_line_longer_than_buffer_grows_it():
+    line = "y" * 100
+    assert frame_all(line.encode() + b"\n", 7, buffer_size=4, delimiter=b"\n") == [line]
+
+
+def test_utf8_split_across_reads():
+    lines = ["é" * 5, "日本語"]
+    data = b"".join(line.encode() + b"\n" for line in lines)
+    assert frame_all(data, 1, buffer_size=4, delimiter=b"\n") == lines
+
+
+def test_next_line_and_partial_line():
+    framer = LineFramer(b"\n")
+    data = b"first\nsecond\nthi"
+    framer.get_read_view()[:len(data)] = data
+    framer.commit(len(data))
+
+    assert framer.next_line() == "first"
+    assert framer.lines() == ["second"]
+    assert framer.next_line() is None
+    assert framer.get_partial_line() == "thi"
+
+
+def test_lines_and_records_interleaved():
+    framer = LineFramer(b"\n")
+    data = b"SUCCESS binary\n" + pack_record(MessageType.FRAME, 3, (1.0, 2.5)) + pack_text_record("Warning: x") + \
+        pack_record(MessageType.END, 0)
+    # One byte at a time, so every record is incomplete at some point.
+    messages = []
+    reading_records = False
+    for byte in data:
+        framer.get_read_view()[:1] = bytes((byte,))
+        framer.commit(1)
+        while True:
+            message = framer.next_record() if reading_records else framer.next_line()
+            if message is None:
+                break
+            messages.append(message)
+            reading_records = True
+
+    assert messages[0] == "SUCCESS binary"
+    assert [record.type for record in messages[1:]] == [MessageType.FRAME, MessageType.TEXT, MessageType.END]
+    assert messages[1].index == 3
+    assert messages[2].payload == b"Warning: x"
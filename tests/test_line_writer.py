@@ -0,0 +1,73 @@
+from line_writer import LineWriter
+
+
+class RecordingTransport:
+    """
+    Keeps what is written to it, and the number of writes and flushes.
+    """
+    def __init__(self):
+        self.written = bytearray()
+        self.writes = 0
+        self.flushes = 0
+
+    def write(self, data):
+        self.written += data
+        self.writes += 1
+
+    def flush(self):
+        self.flushes += 1
+
+
+def test_lines_are_written_immediately_outside_batches():
+    transport = RecordingTransport()
+    writer = LineWriter(transport)
+    writer.write_line("0 a")
+    writer.flush()
+    writer.write_line("1 b")
+    assert transport.written == b"0 a\n1 b\n"
+    assert (transport.writes, transport.flushes) == (2, 1)
+
+
+def test_batch_is_written_once_on_commit():
+    transport = RecordingTransport()
+    writer = LineWriter(transport)
+    writer.begin_batch()
+    writer.write_lines(["0 a", "1 b"])
+    writer.flush()
+    writer.write_line("2 c")
+    assert transport.writes == 0 and transport.flushes == 0
+
+    writer.commit()
+    assert transport.written == b"0 a\n1 b\n2 c\n"
+    assert (transport.writes, transport.flushes) == (1, 1)
+    assert writer.get_stats()["calls_saved"] == 2
+
+
+def test_nested_commit_keeps_the_outer_batch():
+    transport = RecordingTransport()
+    writer = LineWriter(transport)
+    writer.begin_batch()
+    writer.write_line("0 a")
+    writer.begin_batch()
+    writer.write_line("1 b")
+    writer.commit()
+    # The outer batch is still open, so nothing is written yet.
+    assert writer.is_batching()
+    assert transport.writes == 0 and transport.flushes == 0
+
+    writer.write_line("2 c")
+    writer.commit()
+    assert not writer.is_batching()
+    assert transport.written == b"0 a\n1 b\n2 c\n"
+    assert (transport.writes, transport.flushes) == (1, 1)
+
+
+def test_full_batch_is_written_before_commit():
+    transport = RecordingTransport()
+    writer = LineWriter(transport, max_batch_size=8)
+    writer.begin_batch()
+    writer.write_lines(["0 aaaa", "1 b"])
+    assert transport.written == b"0 aaaa\n1 b\n"
+    assert transport.flushes == 0
+    writer.commit()
+    assert transport.flushes == 1
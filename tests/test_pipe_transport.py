@@ -0,0 +1,80 @@
+import os
+import socket
+import sys
+import tempfile
+import threading
+import uuid
+
+import pytest
+
+from pipe_transport import UnixSocketTransport, connect_to_transport, create_transport, get_unix_socket_path
+from unity_instance import MessageDecoder, UnityInstance
+
+PIPE_PATH = '\\\\.\\pipe\\'
+STAND_IN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "stand_in_simulator.py")
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="Windows uses named pipes.")
+
+
+def unique_pipe_name() -> str:
+    # Tests running at the same time mustn't share a socket.
+    return f"PipeTest{uuid.uuid4().hex[:8]}"
+
+
+def test_socket_path_is_the_dotnet_one():
+    assert get_unix_socket_path(os.path.join(PIPE_PATH, "PipeB")) == \
+        os.path.join(tempfile.gettempdir(), "CoreFxPipe_PipeB")
+    assert get_unix_socket_path("/tmp/some.sock") == "/tmp/some.sock"
+
+
+def test_stand_in_connects_over_the_socket():
+    pipe_name = unique_pipe_name()
+    socket_path = os.path.join(tempfile.gettempdir(), f"CoreFxPipe_{pipe_name}")
+    exec_args = {"simulator_path": sys.executable, "simulator_args": [STAND_IN_PATH, "-p", pipe_name]}
+    instance = UnityInstance(os.path.join(PIPE_PATH, pipe_name), exec_args)
+    try:
+        assert isinstance(instance.transport, UnixSocketTransport)
+        assert os.path.exists(socket_path)
+
+        instance.run_experiment("falling_rectangular_prism")
+        instance.send_session_initialization_data(['{"XScale": 1, "YScale": 1, "ZScale": 1, "XRot": 0, "YRot": 0, '
+                                                   '"ZRot": 0}'] * 3)
+        instance.end_send_session_initialization_data()
+        decoder = MessageDecoder()
+        decoder.dispatch(instance, dict())
+        assert sorted(decoder.get_scores()[0]) == [0, 1, 2]
+    finally:
+        instance.quit()
+        instance.simulation_exec.wait(timeout=10)
+
+    # The socket file is removed with the connection.
+    assert not os.path.exists(socket_path)
+
+
+def test_stale_socket_file_is_replaced():
+    pipe_name = unique_pipe_name()
+    socket_path = get_unix_socket_path(os.path.join(PIPE_PATH, pipe_name))
+    # A socket left behind by a process that didn't close its transport.
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(socket_path)
+    stale.close()
+    assert os.path.exists(socket_path)
+
+    transport = create_transport(os.path.join(PIPE_PATH, pipe_name))
+    try:
+        client = []
+        connecting = threading.Thread(target=lambda: client.extend(connect_to_transport(pipe_name, timeout=5.0)))
+        connecting.start()
+        transport.accept()
+        connecting.join()
+
+        reader, writer = client
+        writer.write(b"SUCCESS\n")
+        buffer = bytearray(16)
+        assert bytes(buffer[:transport.read_into(memoryview(buffer))]) == b"SUCCESS\n"
+        transport.write(b"run prism\n")
+        assert reader.readline() == b"run prism\n"
+        reader.close()
+        writer.close()
+    finally:
+        transport.close()
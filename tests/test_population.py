@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from population import Population
+
+
+def make_population(scores) -> Population:
+    population = Population(len(scores), {"Genome": (np.float64, (2,)), "Seed": (np.int32, ())})
+    population["Genome"] = np.arange(2 * len(scores)).reshape(-1, 2)
+    population["Seed"] = np.arange(len(scores))
+    population.set_scores(np.arange(len(scores)), scores)
+    return population
+
+
+def test_top_k_matches_full_sort():
+    rng = np.random.default_rng(0)
+    population = make_population(rng.permutation(100).astype(float))
+    for k in (1, 5, 50, 100, 200):
+        assert population.top_k(k).tolist() == population.argsort()[:k].tolist()
+
+
+def test_top_k_with_ties():
+    population = make_population(np.random.default_rng(0).integers(0, 10, size=100).astype(float))
+    best = np.sort(population.scores)[::-1][:20]
+    assert population.scores[population.top_k(20)].tolist() == best.tolist()
+
+
+def test_sorted_keeps_rows_together():
+    population = make_population([1.0, 3.0, 2.0]).sorted()
+    assert population.scores.tolist() == [3.0, 2.0, 1.0]
+    assert population["Seed"].tolist() == [1, 2, 0]
+    assert population["Genome"].tolist() == [[2, 3], [4, 5], [0, 1]]
+
+
+def test_concat_and_take():
+    population = make_population([1.0, 2.0]).concat(make_population([3.0]))
+    assert len(population) == 3
+    assert population.take([2, 0])["Seed"].tolist() == [0, 0]
+    assert population.take([2, 0]).scores.tolist() == [3.0, 1.0]
+
+
+def test_from_columns_checks_lengths():
+    with pytest.raises(Exception):
+        Population.from_columns({"A": np.zeros(3), "B": np.zeros(2)})
+
+
+def test_to_dataframe_splits_vector_columns():
+    frame = make_population([1.0, 2.0]).to_dataframe()
+    assert list(frame.columns) == ["Genome[0]", "Genome[1]", "Seed", "Score"]
+    assert frame["Genome[1]"].tolist() == [1, 3]
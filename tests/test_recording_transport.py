@@ -0,0 +1,118 @@
+import queue
+
+import pytest
+
+from pipe_transport import Transport
+from recording_transport import INBOUND, OUTBOUND, RecordingTransport, ReplayTransport, read_recording
+from unity_instance import UnityInstance
+
+
+class ScriptedSimulator(Transport):
+    """
+    A transport answering the commands of a UnityInstance like a simulator whose sessions score 1.5.
+    """
+    line_delimiter = b"\n"
+
+    def __init__(self):
+        self._answers = queue.Queue()
+        self._sessions = 0
+
+    def accept(self):
+        pass
+
+    def read_into(self, buffer) -> int:
+        answer = self._answers.get()
+        buffer[:len(answer)] = answer
+        return len(answer)
+
+    def write(self, data: bytes):
+        for line in bytes(data).decode().splitlines():
+            if line.startswith("run "):
+                self._answers.put(b"SUCCESS\n")
+            elif line == "END":
+                self._answers.put(b"".join(f"{i}\n{i} 1.5\n".encode() for i in range(self._sessions)) + b"END\n")
+                self._sessions = 0
+            elif line == "quit":
+                self._answers.put(b"QUIT\n")
+            else:
+                self._sessions += 1
+
+    def close(self):
+        pass
+
+
+def run_epochs(sim_inst: UnityInstance, epoch_count: int = 2) -> list:
+    lines = []
+    for _ in range(epoch_count):
+        sim_inst.run_experiment("prism")
+        sim_inst.send_session_initialization_data(["{}", "{}"])
+        sim_inst.end_send_session_initialization_data()
+        while True:
+            line = sim_inst.read_line()
+            if line is None:
+                break
+            lines.append(line)
+    sim_inst.quit()
+    return lines
+
+
+def test_record_and_replay(tmp_path):
+    path = str(tmp_path / "recording.gz")
+    recorded = run_epochs(UnityInstance("unused", transport=ScriptedSimulator(), recording_path=path))
+
+    delimiter, entries = read_recording(path)
+    assert delimiter == b"\n"
+    assert {direction for direction, _, _, _ in entries} == {INBOUND, OUTBOUND}
+
+    replay = ReplayTransport(path, strict=True, timeout=5.0)
+    assert run_epochs(UnityInstance("unused", transport=replay)) == recorded
+    assert recorded == ["0", "0 1.5", "1", "1 1.5"] * 2
+    stats = replay.get_stats()
+    assert stats["mismatches"] == 0 and stats["reads_replayed"] == stats["reads_recorded"]
+
+
+def test_replay_counts_and_raises_on_mismatches(tmp_path):
+    path = str(tmp_path / "recording.gz")
+    run_epochs(UnityInstance("unused", transport=ScriptedSimulator(), recording_path=path), epoch_count=1)
+
+    replay = ReplayTransport(path)
+    replay.write(b"run other\n")
+    assert replay.get_stats()["mismatches"] == 1
+
+    with pytest.raises(Exception):
+        ReplayTransport(path, strict=True).write(b"run other\n")
+
+
+def test_replay_waits_for_the_lines_a_read_answers(tmp_path):
+    path = str(tmp_path / "recording.gz")
+    run_epochs(UnityInstance("unused", transport=ScriptedSimulator(), recording_path=path), epoch_count=1)
+
+    # The first read answers the run command, which wasn't written.
+    replay = ReplayTransport(path, timeout=0.1)
+    with pytest.raises(Exception):
+        replay.read_into(memoryview(bytearray(64)))
+
+
+class ImmediateAnswer(ScriptedSimulator):
+    """
+    A simulator whose answer is read (by another thread, in practice) before write returns.
+    """
+    def __init__(self):
+        ScriptedSimulator.__init__(self)
+        self.recording = None
+
+    def write(self, data: bytes):
+        ScriptedSimulator.write(self, data)
+        self.recording.read_into(memoryview(bytearray(64)))
+
+
+def test_answers_read_during_a_write_are_recorded_after_it(tmp_path):
+    path = str(tmp_path / "recording.gz")
+    simulator = ImmediateAnswer()
+    recording = RecordingTransport(simulator, path)
+    simulator.recording = recording
+    recording.write(b"run prism\n")
+    recording.close()
+
+    _, entries = read_recording(path)
+    assert [(direction, lines_written) for direction, _, lines_written, _ in entries] == [(OUTBOUND, 1), (INBOUND, 1)]
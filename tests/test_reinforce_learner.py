@@ -0,0 +1,82 @@
+import numpy as np
+import torch
+
+from cart_pole_training import CartPoleTrainer
+from reinforce_learner import ReinforceLearner, normalize_returns
+
+
+def create_learner(per_episode: bool) -> ReinforceLearner:
+    torch.manual_seed(0)
+    # The network of the training scripts, whose softmax is over dim 0 as it takes one state at a time.
+    model = torch.nn.Sequential(torch.nn.Linear(3, 16), torch.nn.LeakyReLU(), torch.nn.Linear(16, 2),
+                                torch.nn.Softmax(dim=0))
+    optimizer = torch.optim.SGD(model.parameters(), lr=1.0)
+    trainer = CartPoleTrainer(model, optimizer, 3, None, None, ["0", "1"], None)
+    learner = trainer.create_learner()
+    learner.episodes_per_update = 1
+    learner.per_episode = per_episode
+    return learner
+
+
+def create_episode(rewards):
+    rng = np.random.default_rng(1)
+    states = rng.standard_normal((len(rewards), 3)).astype(np.float32)
+    actions = rng.integers(0, 2, len(rewards))
+    return states, actions, np.asarray(rewards, dtype=np.float32)
+
+
+def parameters_after(per_episode: bool, episode) -> list:
+    learner = create_learner(per_episode)
+    learner.add_episode(*episode)
+    learner.flush()
+    assert learner.updates == 1
+    return [parameter.detach().clone() for parameter in learner.model.parameters()]
+
+
+def assert_same_step(episode):
+    for per_episode, batched in zip(parameters_after(True, episode), parameters_after(False, episode)):
+        assert torch.allclose(per_episode, batched, atol=1e-6)
+
+
+def test_paths_agree_on_positive_rewards():
+    assert_same_step(create_episode([1.0] * 6))
+
+
+def test_paths_agree_on_negative_rewards():
+    assert_same_step(create_episode([-1.0, -0.5, -2.0, -1.0]))
+
+
+def test_paths_agree_on_mixed_rewards():
+    assert_same_step(create_episode([1.0, -3.0, 0.5, 2.0, -1.0]))
+
+
+def test_per_episode_uses_the_probabilities_of_each_state():
+    # With the model's softmax over the steps, the gradient would differ from one taken with the policy.
+    episode = create_episode([1.0] * 6)
+    learner = create_learner(True)
+    model = learner.model
+    reference = [parameter.detach().clone() for parameter in model.parameters()]
+    state_batch = torch.from_numpy(episode[0])
+    probs = torch.softmax(model[:-1](state_batch), dim=1).gather(1, torch.from_numpy(episode[1]).view(-1, 1))
+    disc_returns = torch.pow(0.99, torch.arange(6).float())
+    loss = -torch.sum(disc_returns / disc_returns.max() * torch.log(probs.squeeze(1)))
+    gradients = torch.autograd.grad(loss, list(model.parameters()))
+
+    learner.add_episode(*episode)
+    for before, gradient, after in zip(reference, gradients, model.parameters()):
+        assert torch.allclose(before - gradient, after.detach(), atol=1e-6)
+
+
+def test_normalize_returns_divides_by_the_largest_return():
+    returns = torch.tensor([[1.0, 4.0, 2.0], [-2.0, -1.0, -4.0]])
+    normalized = normalize_returns(returns)
+    assert torch.equal(normalized[0], returns[0] / 4.0)
+    assert torch.equal(normalized[1], returns[1] / -1.0)
+
+
+def test_normalize_returns_ignores_padding():
+    returns = torch.tensor([[-2.0, -1.0, 0.0], [1.0, 4.0, 2.0]])
+    mask = torch.tensor([[True, True, False], [True, True, True]])
+    normalized = normalize_returns(returns, mask)
+    assert torch.equal(normalized[0, :2], torch.tensor([-2.0, -1.0]) / -1.0)
+    assert torch.equal(normalized[1], returns[1] / 4.0)
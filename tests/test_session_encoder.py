@@ -0,0 +1,80 @@
+import json
+
+import numpy as np
+import pytest
+
+import session_encoder
+from population import Population
+from session_encoder import Constant, SessionEncoder, format_values
+
+# Values json.dumps writes in unusual ways: special floats, and floats it writes in scientific notation.
+FLOATS = [0.0, -0.0, 1.0, 0.1, -2.5, 1e-4, 9.99e-5, 1e-5, 1.5e-300, 1e15, 1e16, 1.2345e17, -3e20, 5e-324,
+          1.7976931348623157e308, float("nan"), float("inf"), float("-inf"), 123456789.123]
+
+
+@pytest.fixture(params=[True, False], ids=["orjson", "json"])
+def with_orjson(request, monkeypatch):
+    """
+    Runs a test with and without orjson.
+    """
+    if request.param and session_encoder.orjson is None:
+        pytest.skip("orjson isn't installed.")
+    if not request.param:
+        monkeypatch.setattr(session_encoder, "orjson", None)
+    return request.param
+
+
+def test_floats_match_json_dumps(with_orjson):
+    values = np.array(FLOATS)
+    assert format_values(values) == [json.dumps(value) for value in FLOATS]
+
+
+def test_finite_floats_match_json_dumps(with_orjson):
+    # Without special values, orjson formats the column.
+    finite = [value for value in FLOATS if np.isfinite(value)]
+    assert format_values(np.array(finite)) == [json.dumps(value) for value in finite]
+
+
+def test_float32_written_as_float64(with_orjson):
+    values = np.array([0.1, 1e-5, 3.4e38], dtype=np.float32)
+    assert format_values(values) == [json.dumps(float(value)) for value in values]
+
+
+def test_integers_and_bools_match_json_dumps(with_orjson):
+    integers = np.array([0, -1, 2 ** 31 - 1, -2 ** 31], dtype=np.int32)
+    assert format_values(integers) == [json.dumps(value) for value in integers.tolist()]
+    bools = np.array([True, False])
+    assert format_values(bools) == ["true", "false"]
+
+
+def test_encoder_matches_json_dumps(with_orjson):
+    rng = np.random.default_rng(0)
+    size = 50
+    population = Population(size, {"Scale": (np.float64, (3,)), "Seed": (np.int32, ()), "Alive": (np.bool_, ())})
+    population["Scale"] = rng.normal(size=(size, 3)) * 10.0 ** rng.integers(-8, 20, size=(size, 3))
+    population["Scale"][0] = [float("nan"), float("inf"), -1e-7]
+    population["Seed"] = rng.integers(-1000, 1000, size=size)
+    population["Alive"] = rng.random(size) < 0.5
+
+    layout = {"Scale": {"x": ("Scale", 0), "y": ("Scale", 1), "z": ("Scale", 2)}, "Seed": "Seed", "Alive": "Alive",
+              "Name": Constant("100% \"quoted\"")}
+    expected = [json.dumps({"Scale": {"x": float(scale[0]), "y": float(scale[1]), "z": float(scale[2])},
+                            "Seed": int(seed), "Alive": bool(alive), "Name": "100% \"quoted\""})
+                for scale, seed, alive in zip(population["Scale"], population["Seed"], population["Alive"])]
+
+    encoder = SessionEncoder(layout)
+    assert encoder.encode(population) == expected
+    # Memoized strings are the same as freshly formatted ones.
+    assert encoder.encode(population) == expected
+    assert SessionEncoder(layout, memoize=False).encode(population) == expected
+
+
+def test_encoder_only_formats_changed_members():
+    population = Population(4, {"Seed": (np.int32, ())})
+    population["Seed"] = [1, 2, 3, 4]
+    encoder = SessionEncoder({"Seed": "Seed"})
+    encoder.encode(population)
+
+    population["Seed"] = [1, 2, 3, 5]
+    assert encoder.encode(population) == [json.dumps({"Seed": seed}) for seed in (1, 2, 3, 5)]
+    assert encoder.get_stats() == {"members_encoded": 8, "members_formatted": 5, "members_reused": 3}
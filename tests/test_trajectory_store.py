@@ -0,0 +1,59 @@
+import numpy as np
+
+from trajectory_store import TrajectoryStore
+
+
+def test_episodes_match_steps_added():
+    rng = np.random.default_rng(0)
+    # Small segments and arrays, so segments are moved and the arrays reallocated.
+    store = TrajectoryStore(2, initial_steps=2, initial_capacity=4)
+    session_count = 5
+    expected = {index: ([], [], []) for index in range(session_count)}
+    last = dict()
+    for index in range(session_count):
+        store.start_session(index)
+
+    for step in range(30):
+        # A different subset of the sessions every step, in a shuffled order.
+        indices = rng.permutation(session_count)[:rng.integers(1, session_count + 1)]
+        states = rng.random((len(indices), 2)).astype(np.float32)
+        actions = rng.integers(0, 2, size=len(indices))
+        scores = rng.random(len(indices)).astype(np.float32)
+        store.add_frames(indices, states, actions, scores)
+
+        for index, state, action, score in zip(indices.tolist(), states, actions, scores):
+            if index in last:
+                expected[index][0].append(last[index][0])
+                expected[index][1].append(last[index][1])
+                expected[index][2].append(score)
+            last[index] = (state, action)
+
+    assert store.get_stats()["segments_moved"] > 0 and store.get_stats()["reallocations"] > 0
+    for index, (states, actions, rewards) in expected.items():
+        episode_states, episode_actions, episode_rewards = store.get_episode(index)
+        assert store.get_length(index) == len(rewards)
+        np.testing.assert_array_equal(episode_states, np.array(states).reshape(-1, 2))
+        np.testing.assert_array_equal(episode_actions, actions)
+        np.testing.assert_array_equal(episode_rewards, rewards)
+
+
+def test_episodes_stay_valid_after_reallocation():
+    store = TrajectoryStore(1, initial_steps=2, initial_capacity=2)
+    store.start_session(0)
+    for step in range(3):
+        store.add_frames([0], [[step]], [step % 2], [step])
+    states, _, _ = store.get_episode(0)
+
+    store.start_session(1)
+    store.start_session(2)
+    np.testing.assert_array_equal(states, [[0], [1]])
+
+
+def test_compact_states():
+    store = TrajectoryStore(1, compact=True)
+    store.start_session(0)
+    store.add_frames([0], [[0.1]], [1], [0.0])
+    store.add_frames([0], [[0.2]], [0], [1.0])
+    states, actions, rewards = store.get_episode(0)
+    assert states.dtype == np.float16
+    assert actions.tolist() == [1] and rewards.tolist() == [1.0]
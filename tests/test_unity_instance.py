@@ -0,0 +1,245 @@
+import queue
+import threading
+import time
+
+import pytest
+
+from binary_protocol import BINARY_MODE_ARGUMENT, MessageType, pack_record
+from pipe_transport import Transport
+from unity_instance import ExperimentTask, Message, MessageDecoder, UnityInstance
+
+
+class QueuedSimulator(Transport):
+    """
+    A transport whose reads block until an answer is queued, each answer being returned by one read. An empty answer
+    closes the connection.
+    """
+    line_delimiter = b"\n"
+
+    def __init__(self):
+        self.answers = queue.Queue()
+        self.written = bytearray()
+        self.closed = False
+
+    def accept(self):
+        pass
+
+    def read_into(self, buffer) -> int:
+        answer = self.answers.get()
+        if len(answer) == 0:
+            raise ConnectionError("The simulator closed the connection.")
+        buffer[:len(answer)] = answer
+        return len(answer)
+
+    def write(self, data: bytes):
+        self.written += data
+
+    def close(self):
+        self.closed = True
+
+
+def create_instance() -> tuple[UnityInstance, QueuedSimulator]:
+    simulator = QueuedSimulator()
+    return UnityInstance("test", transport=simulator), simulator
+
+
+def run_experiment(instance: UnityInstance, simulator: QueuedSimulator, experiment_name: str = "prism"):
+    simulator.answers.put(b"SUCCESS\n")
+    instance.run_experiment(experiment_name)
+
+
+def read_all(instance: UnityInstance) -> list:
+    lines = []
+    while True:
+        line = instance.read_line()
+        if line is None:
+            return lines
+        lines.append(line)
+
+
+def test_lines_are_routed_to_the_current_task():
+    instance, simulator = create_instance()
+    reader_thread = instance.reader._thread
+
+    run_experiment(instance, simulator)
+    first_task = instance.task
+    simulator.answers.put(b"0\n0 1.5\nEND\n")
+    assert read_all(instance) == ["0", "0 1.5"]
+
+    run_experiment(instance, simulator)
+    simulator.answers.put(b"1\n1 2.5\nEND\n")
+    assert read_all(instance) == ["1", "1 2.5"]
+    # Nothing of the second experiment went to the first one, and the same thread read both.
+    assert len(first_task.read_buffer) == 0
+    assert instance.reader._thread is reader_thread and reader_thread.is_alive()
+
+
+def test_lines_read_with_the_end_are_kept_for_the_next_task():
+    instance, simulator = create_instance()
+    run_experiment(instance, simulator)
+    # The answer to the next run command arrives in the same read as the END of this experiment.
+    simulator.answers.put(b"0 1.5\nEND\nSUCCESS\n1\n")
+    assert read_all(instance) == ["0 1.5"]
+    assert list(instance.reader.held_lines) == ["SUCCESS", "1"]
+
+    instance.run_experiment("prism")
+    assert len(instance.reader.held_lines) == 0
+    simulator.answers.put(b"END\n")
+    assert read_all(instance) == ["1"]
+
+
+def test_partial_line_is_kept_for_the_next_task():
+    instance, simulator = create_instance()
+    run_experiment(instance, simulator)
+    simulator.answers.put(b"END\nSUCC")
+
+    assert read_all(instance) == []
+    simulator.answers.put(b"ESS\n")
+    instance.run_experiment("prism")
+    simulator.answers.put(b"END\n")
+    assert read_all(instance) == []
+
+
+def test_nothing_is_read_between_tasks():
+    instance, simulator = create_instance()
+    run_experiment(instance, simulator)
+    simulator.answers.put(b"END\n")
+    assert read_all(instance) == []
+
+    # The idle task expects nothing, so the reader doesn't wait on the simulator.
+    simulator.answers.put(b"SUCCESS\n")
+    time.sleep(0.1)
+    assert simulator.answers.qsize() == 1
+
+    instance.run_experiment("prism")
+    assert simulator.answers.qsize() == 0
+
+
+def test_quit_stops_the_reader():
+    instance, simulator = create_instance()
+    reader_thread = instance.reader._thread
+    simulator.answers.put(b"QUIT\n")
+    instance.quit()
+
+    reader_thread.join(timeout=2.0)
+    assert not reader_thread.is_alive()
+    assert simulator.closed
+    assert simulator.written.endswith(b"quit\n")
+
+
+def test_end_of_connection_stops_the_reader_and_is_raised():
+    instance, simulator = create_instance()
+    reader_thread = instance.reader._thread
+    run_experiment(instance, simulator)
+    simulator.answers.put(b"0\n")
+    simulator.answers.put(b"")
+
+    assert instance.read_line() == "0"
+    with pytest.raises(ConnectionError):
+        instance.read_line()
+    reader_thread.join(timeout=2.0)
+    assert not reader_thread.is_alive()
+
+    # Tasks started after the connection closed raise it too.
+    task = instance._start_task(ExperimentTask, "prism", False)
+    with pytest.raises(ConnectionError):
+        task.read_line()
+
+
+def test_stalled_read_times_out_after_timeout():
+    instance, simulator = create_instance()
+    run_experiment(instance, simulator)
+    stop = threading.Event()
+
+    def wake_readers():
+        # Notifications that don't bring a line (e.g. a task change) must not restart the timeout.
+        while not stop.wait(0.02):
+            with instance.reader.lock:
+                instance.reader.changed.notify_all()
+
+    waker = threading.Thread(target=wake_readers)
+    waker.start()
+    start = time.monotonic()
+    try:
+        with pytest.raises(Exception, match="Timeout"):
+            instance.task.read_line(timeout=0.3)
+    finally:
+        stop.set()
+        waker.join()
+    # Well under twice the timeout.
+    assert 0.3 <= time.monotonic() - start < 0.5
+
+
+def test_line_arriving_mid_wait_wakes_the_reader():
+    instance, simulator = create_instance()
+    run_experiment(instance, simulator)
+    timer = threading.Timer(0.1, simulator.answers.put, args=[b"0\n"])
+
+    start = time.monotonic()
+    timer.start()
+    assert instance.task.read_line(timeout=5.0) == "0"
+    assert 0.1 <= time.monotonic() - start < 1.0
+
+
+def dispatch_all(instance: UnityInstance) -> tuple[list, MessageDecoder]:
+    """
+    Dispatches the messages of the running experiment, and returns them as (type, index, data) in the order they were
+    handled, with frames passed in batches to on_frames.
+    """
+    handled = []
+    decoder = MessageDecoder()
+
+    def on_message(message: Message):
+        handled.append((message.type, message.index, message.data))
+
+    def on_frames(messages: list):
+        handled.extend((message.type, message.index, message.data) for message in messages)
+
+    decoder.dispatch(instance, {MessageType.START: on_message, MessageType.SCORE: on_message}, on_frames)
+    return handled, decoder
+
+
+def test_dispatch_decodes_lines():
+    instance, simulator = create_instance()
+    run_experiment(instance, simulator)
+    simulator.answers.put(b'0\n1\n0 {"X": 1.5}\n1 [2.0, 3.0]\n0 3.5\n1 {"X"')
+    # The rest of a frame split across two reads.
+    simulator.answers.put(b': 2.5}\n1 4\nEND\n')
+
+    handled, decoder = dispatch_all(instance)
+    assert handled == [(MessageType.START, 0, None), (MessageType.START, 1, None),
+                       (MessageType.FRAME, 0, {"X": 1.5}), (MessageType.FRAME, 1, [2.0, 3.0]),
+                       (MessageType.SCORE, 0, "3.5"), (MessageType.FRAME, 1, {"X": 2.5}),
+                       (MessageType.SCORE, 1, "4")]
+    indices, scores = decoder.get_scores()
+    assert list(indices) == [0, 1] and list(scores) == [3.5, 4.0]
+
+
+def test_dispatch_decodes_records():
+    instance, simulator = create_instance()
+    simulator.answers.put(f"SUCCESS {BINARY_MODE_ARGUMENT}\n".encode())
+    instance.run_experiment("cart_pole", binary=True)
+    assert instance.is_binary_mode()
+
+    frame = pack_record(MessageType.FRAME, 0, [0.5, 1.0, -0.25, 2.0, 1.0])
+    simulator.answers.put(pack_record(MessageType.START, 0) + frame[:7])
+    # The rest of the frame record, whose header was split too.
+    simulator.answers.put(frame[7:] + pack_record(MessageType.SCORE, 0, [3.5]) + pack_record(MessageType.END, -1))
+
+    handled, decoder = dispatch_all(instance)
+    assert [(message_type, index) for message_type, index, _ in handled] == \
+        [(MessageType.START, 0), (MessageType.FRAME, 0), (MessageType.SCORE, 0)]
+    assert list(handled[1][2]) == [0.5, 1.0, -0.25, 2.0, 1.0]
+    assert handled[2][2] == 3.5
+    indices, scores = decoder.get_scores()
+    assert list(indices) == [0] and list(scores) == [3.5]
+
+
+@pytest.mark.parametrize("line", [b"0 {broken\n", b"first 1.5\n"])
+def test_dispatch_raises_on_malformed_lines(line):
+    instance, simulator = create_instance()
+    run_experiment(instance, simulator)
+    simulator.answers.put(b"0\n" + line + b"END\n")
+
+    with pytest.raises(ValueError):
+        dispatch_all(instance)
@@ -0,0 +1,39 @@
+from unity_instance_pool import UnityInstancePool
+
+
+def take_chunks(session_count: int, instance_count: int) -> list:
+    # A pool without simulators, whose chunks are taken here instead of by its workers.
+    pool = UnityInstancePool("unused", [])
+    pool.instances = [None] * instance_count
+    pool._start_workers = lambda: None
+    pool.run_experiment("prism")
+    pool.send_session_initialization_data(["{}"] * session_count)
+    pool.end_send_session_initialization_data()
+
+    chunks = []
+    while True:
+        chunk = pool._take_chunk()
+        if len(chunk) == 0:
+            break
+        chunks.append(chunk)
+    assert pool.chunk_count == len(chunks)
+    return chunks
+
+
+def test_chunks_cover_every_session_once():
+    chunks = take_chunks(1000, 3)
+    assert sorted(index for chunk in chunks for index in chunk) == list(range(1000))
+
+
+def test_chunks_shrink_to_a_floor():
+    chunks = take_chunks(256, 4)
+    sizes = [len(chunk) for chunk in chunks]
+    assert sizes[0] == 256 // (2 * 4)
+    assert sizes == sorted(sizes, reverse=True)
+    # Only the last chunk can be smaller than a quarter of an instance's share.
+    assert min(sizes[:-1]) >= 256 // (4 * 4)
+    assert len(chunks) <= 4 * 4
+
+
+def test_min_chunk_size_applies_to_few_sessions():
+    assert [len(chunk) for chunk in take_chunks(10, 4)] == [1] * 10